@@ -0,0 +1,92 @@
+# Hidden admin pages, rendered by app.py when opened with ?admin=<page>
+from datetime import datetime
+
+import streamlit as st
+
+METRIC_LABELS = {
+    "model_setup_seconds": "Model setup (s)",
+    "time_to_first_token_seconds": "Time to first token (s)",
+    "generation_seconds": "Total generation (s)",
+    "render_seconds": "Render (s)",
+    "prompt_tokens": "Prompt tokens",
+    "response_tokens": "Response tokens",
+}
+
+
+def render_metrics_page(recorder):
+    st.title("📊 Interview Metrics")
+    st.caption(f"Last {recorder.capacity} observations held in this process. Refresh the page to update.")
+
+    summary = recorder.summary()
+    if summary:
+        st.dataframe(
+            [
+                {
+                    "Metric": METRIC_LABELS.get(name, name),
+                    "Count": stats["count"],
+                    "Mean": round(stats["mean"], 4),
+                    "p50": round(stats["p50"], 4),
+                    "p95": round(stats["p95"], 4),
+                    "p99": round(stats["p99"], 4),
+                }
+                for name, stats in summary.items()
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No observations recorded yet.")
+
+    counters = recorder.counters()
+    if counters:
+        st.subheader("Counters")
+        st.dataframe(
+            [
+                {"Counter": name, "Labels": ", ".join(f"{k}={v}" for k, v in labels), "Value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("📥 Prometheus text", data=recorder.to_prometheus(), file_name=f"metrics_{current_time}.prom",
+                           mime="text/plain", use_container_width=True)
+    with col2:
+        st.download_button("📥 JSONL events", data=recorder.to_jsonl(), file_name=f"metrics_{current_time}.jsonl",
+                           mime="application/x-ndjson", use_container_width=True)
+
+
+def render_memory_page(store):
+    st.title("🧠 Interview Memory")
+    stats = store.stats()
+    st.caption(f"Interviews shown by sessions in this process, stored once each. Bodies beyond "
+               f"{store.max_bytes / 1024 / 1024:.0f} MB are spilled to {store.spill_path}. Refresh the page to update.")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Sessions", stats["sessions"])
+    col2.metric("Interviews", stats["interviews"], f"{stats['references']} references", delta_color="off")
+    col3.metric("Resident", f"{stats['memory_bytes'] / 1024:.1f} KB", f"{stats['memory_interviews']} in memory", delta_color="off")
+    col4.metric("Spilled", stats["spilled_interviews"], f"{stats['loads']} loads", delta_color="off")
+
+    report = store.session_report()
+    if report:
+        st.subheader("Per session")
+        st.dataframe(
+            [
+                {
+                    "Session": row["session"][:12],
+                    "Interviews": row["slots"],
+                    "Referenced (KB)": round(row["referenced_bytes"] / 1024, 1),
+                    "Resident share (KB)": round(row["resident_bytes"] / 1024, 1),
+                    "Idle (s)": row["idle_seconds"],
+                }
+                for row in report
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        st.info("No session is showing an interview.")
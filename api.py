@@ -0,0 +1,354 @@
+# Async HTTP JSON API for generating interviews without the Streamlit UI.
+#
+#   python api.py --port 8080
+#   curl -s localhost:8080/v1/interviews -d '{"character1": "Socrates", "character2": "Steve Jobs"}'
+#   curl -N localhost:8080/v1/interviews -H 'Accept: text/event-stream' -d '{"character1": ...}'
+#
+# A POST to /v1/interviews returns the finished interview as JSON, or streams
+# it line by line as server-sent events when the client asks for
+# text/event-stream. Everything runs on one asyncio event loop and upstream
+# calls go through async_gemini, so a generation in flight holds a socket
+# rather than a thread. Prompts, line splitting and dialogue parsing are the
+# same ones app.py uses, and results share the app's interview cache.
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from async_gemini import AsyncGeminiClient
+from budget import estimator_from_env, reserve_tokens, streamed_tokens
+from dialogue import SpeakerIndex, parse_dialogue
+from exports import interview_id
+from interview import (DEFAULT_LENGTH, LENGTHS, MODEL_NAME, PROMPT_VERSION, SOFT_DEADLINE_SECONDS, SYSTEM_INSTRUCTION,
+                       aiter_lines, build_prompt)
+from interview_cache import cache_from_env, make_key
+from metrics import METRICS
+from policy import (CircuitOpenError, GenerationError, GenerationTimeoutError, InvalidRequestError, RateLimitedError,
+                    UpstreamUnavailableError, policy_from_env)
+from scheduler import INTERACTIVE, QueueTimeoutError, scheduler_from_env
+from validation import DialogueValidator, turn_limits
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+
+# HTTP status for each kind of generation failure; anything else is a 502
+ERROR_STATUSES = {
+    RateLimitedError: 429,
+    GenerationTimeoutError: 504,
+    UpstreamUnavailableError: 503,
+    CircuitOpenError: 503,
+    QueueTimeoutError: 503,
+    InvalidRequestError: 400,
+}
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 429: "Too Many Requests", 502: "Bad Gateway", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+
+# Raised while reading a request to answer it with an error status
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def error_status(error):
+    for kind, status in ERROR_STATUSES.items():
+        if isinstance(error, kind):
+            return status
+    return 502
+
+
+def error_body(error_type, message):
+    return {"error": {"type": error_type, "message": message}}
+
+
+# Generates interviews for the HTTP handlers: cache first, then the upstream
+# stream. With a scheduler, every upstream attempt waits for its turn; each
+# client address counts as one session for fair sharing. With an estimator
+# (see budget.py), fresh generations are recorded and sized by it.
+class InterviewService:
+    def __init__(self, client, policy, cache=None, default_api_key="", max_inflight=1000, scheduler=None, estimator=None):
+        self.client = client
+        self.policy = policy
+        self.cache = cache
+        self.scheduler = scheduler
+        self.estimator = estimator
+        self.default_api_key = default_api_key
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    # Lines of the interview as they become available; `state["cached"]` says whether it came from the cache
+    async def lines(self, character1, character2, topic, tone, api_key, state, session="api", length=DEFAULT_LENGTH):
+        loop = asyncio.get_running_loop()
+        cache_key = make_key(character1, character2, topic, tone, MODEL_NAME, PROMPT_VERSION, length)
+        if self.cache is not None:
+            # SQLite lookups are quick but blocking, so they run off the event loop
+            text = await loop.run_in_executor(None, self.cache.get, cache_key)
+            METRICS.increment("cache_lookups", result="hit" if text is not None else "miss")
+            if text is not None:
+                state["cached"] = True
+                for line in text.split("\n"):
+                    yield line
+                return
+
+        state["cached"] = False
+        prompt = build_prompt(character1, character2, topic, tone, length=length)
+        usage = {}
+        reserve = None
+        if self.estimator is not None:
+            # The estimator reads its counters from the state backend, SQLite included, so off the event loop too
+            estimate = await loop.run_in_executor(None, self.estimator.estimate, character1, character2, tone, length)
+            reserve = reserve_tokens(estimate, prompt)
+
+        async def attempt(options):
+            ticket = None
+            if self.scheduler is not None:
+                ticket = await self.scheduler.acquire_async(api_key, session, INTERACTIVE, tokens=reserve)
+                METRICS.record("queue_wait_seconds", ticket.dispatched - ticket.enqueued, priority="api")
+            usage.clear()
+            chars = 0
+            try:
+                started = time.perf_counter()
+                first = True
+                async for piece in self.client.stream_text(api_key, MODEL_NAME, prompt, timeout=options["timeout"], usage=usage,
+                                                           system_instruction=SYSTEM_INSTRUCTION,
+                                                           max_output_tokens=LENGTHS[length]["max_output_tokens"]):
+                    if first:
+                        METRICS.record("time_to_first_token_seconds", time.perf_counter() - started, tone=tone, source="api")
+                        first = False
+                    chars += len(piece)
+                    yield piece
+            finally:
+                if ticket is not None:
+                    # Usage only arrives with the last chunk; a reply cut short settles on the text so far
+                    used = sum(usage.values()) if usage or not chars else streamed_tokens(prompt, chars)
+                    self.scheduler.settle(ticket, used)
+            METRICS.record("generation_seconds", time.perf_counter() - started, tone=tone, stream=True, source="api")
+
+        # Lines already sent cannot be taken back, so an off-format reply is cut off and reported rather than retried
+        validator = DialogueValidator(character1, character2, **turn_limits(length))
+        lines = []
+        started = time.perf_counter()
+        # Past the soft deadline, counted from the first line so queueing and
+        # backoff do not use it up, the script ends at the line just sent
+        deadline = None
+        truncated = False
+        async with self._slots:
+            pieces = aiter_lines(self.policy.stream_async(attempt))
+            try:
+                async for line in pieces:
+                    if deadline is None:
+                        deadline = time.monotonic() + SOFT_DEADLINE_SECONDS
+                    validator.feed(line)
+                    lines.append(line)
+                    yield line
+                    if validator.turns >= validator.min_turns and time.monotonic() > deadline:
+                        METRICS.increment("truncated_replies", reason="deadline")
+                        truncated = True
+                        break
+            finally:
+                await pieces.aclose()
+        validator.finish()
+        for name, count in usage.items():
+            METRICS.record(name, count, tone=tone)
+        # A reply cut at the deadline is neither a full sample for the estimator nor a script to cache
+        if truncated:
+            return
+        if self.estimator is not None:
+            await loop.run_in_executor(None, self.estimator.record, character1, character2, tone, length,
+                                       usage.get("response_tokens", 0), time.perf_counter() - started)
+        if self.cache is not None:
+            await loop.run_in_executor(None, self.cache.put, cache_key, "\n".join(lines))
+
+
+# Read one request: (method, path, headers, body)
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise RequestError(400, "Too many headers")
+
+    length = headers.get("content-length") or "0"
+    if not length.isascii() or not length.isdigit():
+        raise RequestError(400, "Content-Length must be a non-negative integer")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+# Validated generation parameters from a JSON request body
+def parse_interview_request(body, headers, default_api_key):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise RequestError(400, "Request body must be JSON")
+    if not isinstance(payload, dict):
+        raise RequestError(400, "Request body must be a JSON object")
+
+    fields = {name: str(payload.get(name) or "").strip() for name in ("character1", "character2", "topic", "tone")}
+    if not fields["character1"] or not fields["character2"]:
+        raise RequestError(400, "Both character1 and character2 are required")
+    fields["tone"] = fields["tone"] or "Funny"
+    fields["length"] = str(payload.get("length") or DEFAULT_LENGTH).strip().capitalize()
+    if fields["length"] not in LENGTHS:
+        raise RequestError(400, f"length must be one of {', '.join(LENGTHS)}")
+    fields["api_key"] = str(payload.get("api_key") or headers.get("x-goog-api-key") or default_api_key)
+    if not fields["api_key"]:
+        raise RequestError(401, "No API key: send api_key or an x-goog-api-key header")
+    stream = bool(payload.get("stream")) or "text/event-stream" in headers.get("accept", "")
+    return fields, stream
+
+
+def write_head(writer, status, content_type, length=None):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    else:
+        lines.append("Cache-Control: no-cache")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+async def send_json(writer, status, payload):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    write_head(writer, status, "application/json", len(data))
+    writer.write(data)
+    await writer.drain()
+
+
+async def send_event(writer, event, payload):
+    writer.write(f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+    await writer.drain()
+
+
+async def handle_interview(service, writer, fields, stream):
+    character1, character2, topic, tone = (fields[k] for k in ("character1", "character2", "topic", "tone"))
+    state = {}
+    peer = writer.get_extra_info("peername")
+    session = f"api:{peer[0]}" if peer else "api"
+    lines = service.lines(character1, character2, topic, tone, fields["api_key"], state, session, fields["length"])
+    try:
+        await send_interview(writer, lines, state, character1, character2, topic, tone, stream, fields["length"])
+    finally:
+        # Releases the upstream connection and in-flight slot promptly if the client disconnected
+        await lines.aclose()
+
+
+async def send_interview(writer, lines, state, character1, character2, topic, tone, stream, length=DEFAULT_LENGTH):
+    if not stream:
+        try:
+            text = "\n".join([line async for line in lines])
+        except GenerationError as e:
+            await send_json(writer, error_status(e), error_body(type(e).__name__, e.user_message))
+            return
+        turns = [turn._asdict() for turn in parse_dialogue(text, character1, character2)]
+        await send_json(writer, 200, {
+            "id": interview_id(character1, character2, topic, tone, text),
+            "character1": character1, "character2": character2, "topic": topic, "tone": tone, "length": length,
+            "model": MODEL_NAME, "cached": state["cached"], "interview": text, "turns": turns,
+        })
+        return
+
+    # Headers go out with the first line: a failure before it gets a plain error
+    # status, one after it arrives as an `error` event
+    speakers = SpeakerIndex(character1, character2)
+    received = []
+    try:
+        async for line in lines:
+            if not received:
+                write_head(writer, 200, "text/event-stream")
+            received.append(line)
+            turn = speakers.parse_line(line)
+            if turn is not None:
+                await send_event(writer, "turn", {"line": line, **turn._asdict()})
+    except GenerationError as e:
+        if received:
+            await send_event(writer, "error", error_body(type(e).__name__, e.user_message)["error"])
+        else:
+            await send_json(writer, error_status(e), error_body(type(e).__name__, e.user_message))
+        return
+    if not received:
+        write_head(writer, 200, "text/event-stream")
+    text = "\n".join(received)
+    await send_event(writer, "done", {"id": interview_id(character1, character2, topic, tone, text),
+                                      "length": length, "model": MODEL_NAME, "cached": state["cached"]})
+
+
+def make_handler(service):
+    async def handle(reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is None:
+                return
+            method, path, headers, body = request
+            if path == "/healthz":
+                await send_json(writer, 200, {"status": "ok", "circuit": service.policy.breaker.state})
+            elif path != "/v1/interviews":
+                await send_json(writer, 404, error_body("NotFound", f"No route for {path}"))
+            elif method != "POST":
+                await send_json(writer, 405, error_body("MethodNotAllowed", "Use POST"))
+            else:
+                fields, stream = parse_interview_request(body, headers, service.default_api_key)
+                with METRICS.timer("api_request_seconds", stream=stream):
+                    await handle_interview(service, writer, fields, stream)
+        except RequestError as e:
+            await send_json(writer, e.status, error_body("BadRequest", str(e)))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The client went away mid-request or mid-stream
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+# Build a service from the same GEMINI_*, INTERVIEW_CACHE_* and STATE_* variables the app reads
+def service_from_env():
+    cache = cache_from_env()
+    return InterviewService(
+        AsyncGeminiClient(os.environ.get("GEMINI_API_ENDPOINT") or None),
+        policy_from_env(),
+        cache=cache,
+        default_api_key=os.environ.get("GEMINI_API_KEY", ""),
+        max_inflight=int(os.environ.get("API_MAX_INFLIGHT", "1000")),
+        scheduler=scheduler_from_env(),
+        estimator=estimator_from_env(cache.state),
+    )
+
+
+async def serve(host, port, service=None):
+    server = await asyncio.start_server(make_handler(service or service_from_env()), host, port, backlog=1024)
+    print(f"Interview API listening on http://{host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the interview generator as an HTTP JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,34 @@
 import streamlit as st
-import google.generativeai as genai
+import html
 import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from admin import render_memory_page, render_metrics_page
+from archive import MATCH_END, MATCH_START, archive_from_env
+from assets import CUSTOM_CSS, EXAMPLE_CARDS, EXAMPLE_ROWS, TONE_CARDS, TONE_TAB_LABELS
+from budget import estimator_from_env, reserve_tokens, streamed_tokens
+from clients import registry_from_env
+from dialogue import SpeakerIndex, render_dialogue, render_turn
+from exports import BULK_LIMIT, FORMATS, export_cache_from_env, export_filename, export_record, zip_bytes
+from interview import (DEFAULT_LENGTH, LENGTHS, MODEL_NAME, PROMPT_VERSION, SOFT_DEADLINE_SECONDS, SYSTEM_INSTRUCTION, TONES,
+                       build_prompt, generation_config, iter_lines, iter_text, iter_until, reply_text)
+from interview_cache import cache_from_env, make_key
+from longform import iter_long_form
+from metrics import METRICS, start_exporter, usage_counts
+from persona import build_persona_prompt, persona_store_from_env
+from policy import GenerationError, policy_from_env
+from prefetch import prefetcher_from_env
+from routing import router_from_env
+from scheduler import BATCH, INTERACTIVE, scheduler_from_env
+from script_store import store_from_env
+from singleflight import SingleFlight
+from state import state_from_env
+from validation import call_validated, iter_validated, turn_limits
+
+app_run_started = time.perf_counter()
 
 # Configure page settings
 st.set_page_config(
@@ -11,183 +38,450 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main {
-        background-color: #f9f9f9;
-    }
-    h1 {
-        color: #1E3A8A;
-        font-size: 42px !important;
-        text-align: center;
-        margin-bottom: 10px !important;
-    }
-    h2 {
-        color: #2563EB;
-    }
-    h3 {
-        color: #3B82F6;
-    }
-    .stButton>button {
-        background-color: #3B82F6;
-        color: white;
-        border-radius: 8px;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        border: none;
-        transition: all 0.3s;
-    }
-    .stButton>button:hover {
-        background-color: #2563EB;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    }
-    .example-card {
-        background-color: white;
-        border-radius: 10px;
-        padding: 15px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
-        margin-bottom: 15px;
-        transition: all 0.3s;
-        border: 1px solid #e5e7eb;
-    }
-    .example-card:hover {
-        box-shadow: 0 10px 15px rgba(0, 0, 0, 0.1);
-        transform: translateY(-5px);
-    }
-    .stTextInput>div>div>input {
-        border-radius: 8px;
-        border: 1px solid #d1d5db;
-        padding: 10px;
-    }
-    .generated-interview {
-        background-color: white;
-        border-radius: 10px;
-        padding: 20px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
-        margin-top: 20px;
-        border: 1px solid #e5e7eb;
-    }
-    .interview-header {
-        background-color: #EFF6FF;
-        padding: 10px 15px;
-        border-radius: 8px;
-        margin-bottom: 15px;
-        color: #1E40AF;
-        font-weight: 600;
-    }
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 10px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        background-color: #EFF6FF;
-        border-radius: 8px;
-        padding: 10px 20px;
-        color: #3B82F6;
-    }
-    .stTabs [aria-selected="true"] {
-        background-color: #3B82F6;
-        color: white;
-    }
-    .sidebar .css-6qob1r {
-        background-color: #F3F4F6;
-    }
-    .css-1d391kg {
-        background-color: #F3F4F6;
-    }
-    .stTextArea > div > div > textarea {
-        background-color: #f8fafc;
-        border-radius: 8px;
-        border: 1px solid #e2e8f0;
-    }
-    .css-1cypcdb {
-        background-color: #2563EB;
-        color: white;
-    }
-    .divider {
-        border-top: 1px solid #e5e7eb;
-        margin: 20px 0;
-    }
-    .primary-button {
-        background-color: #2563EB;
-        color: white;
-        padding: 10px 20px;
-        border-radius: 8px;
-        border: none;
-        font-weight: 500;
-        width: 100%;
-    }
-    .download-button {
-        background-color: #10B981;
-        color: white;
-        padding: 10px 20px;
-        border-radius: 8px;
-        border: none;
-        font-weight: 500;
-        width: 100%;
-    }
-    .tone-option {
-        background-color: white;
-        padding: 10px;
-        border-radius: 8px;
-        text-align: center;
-        margin-bottom: 10px;
-        cursor: pointer;
-        border: 1px solid #e5e7eb;
-        transition: all 0.2s;
-    }
-    .tone-option:hover {
-        border-color: #3B82F6;
-        transform: translateY(-2px);
-    }
-    .tone-option.selected {
-        border-color: #3B82F6;
-        background-color: #EFF6FF;
-    }
-    .tone-icon {
-        font-size: 24px;
-        margin-bottom: 5px;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+# Process-wide registry of configured Gemini clients, one per API key and model
+@st.cache_resource
+def get_client_registry():
+    return registry_from_env()
 
 # Function to setup the Google Gemini Pro model
-def setup_model(api_key):
+def setup_model(api_key, model_name=MODEL_NAME):
     if not api_key:
         st.error("⚠️ Please enter your Google API Key in the sidebar.")
         st.stop()
     
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.0-flash')
+    with METRICS.timer("model_setup_seconds"):
+        return get_client_registry().get(api_key, model_name)
 
-# Function to generate interview
-def generate_interview(character1, character2, topic, tone, api_key):
-    model = setup_model(api_key)
+# State shared with the other replicas of the app: counters and browser sessions
+@st.cache_resource
+def get_state():
+    return state_from_env()
+
+# Token and latency estimates from past runs, pooled across replicas through the shared state
+@st.cache_resource
+def get_budget_estimator():
+    return estimator_from_env(get_state())
+
+# Shared interview cache, one per server process
+@st.cache_resource
+def get_interview_cache():
+    return cache_from_env(get_state())
+
+# Searchable archive of every generated interview, shared by all sessions
+@st.cache_resource
+def get_interview_archive():
+    return archive_from_env()
+
+# Encoded downloads keyed by interview ID and format, shared by all sessions
+@st.cache_resource
+def get_export_cache():
+    return export_cache_from_env()
+
+# Interviews shown by sessions, stored once per process; session state only holds their IDs
+@st.cache_resource
+def get_script_store():
+    return store_from_env()
+
+# Voice profiles of the characters, built once each and kept on disk
+@st.cache_resource
+def get_persona_store():
+    return persona_store_from_env(get_state())
+
+# Coalesces identical generations that are in flight at the same time, across all sessions
+@st.cache_resource
+def get_single_flight():
+    return SingleFlight()
+
+# Retry, timeout and circuit-breaker policy shared by every Gemini call in the process
+@st.cache_resource
+def get_call_policy():
+    return policy_from_env()
+
+# Routes each call to the first of the configured models, hedging to the next one when it is slow
+@st.cache_resource
+def get_router():
+    return router_from_env()
+
+# Fair-share scheduler every Gemini call in the process waits on: per-key and global rate limits, interactive first
+@st.cache_resource
+def get_scheduler():
+    return scheduler_from_env()
+
+# Speculative background generations, budgeted per session, shared by all sessions
+@st.cache_resource
+def get_prefetcher():
+    return prefetcher_from_env()
+
+# Optional local scrape endpoint for the metrics (/metrics and /metrics.jsonl), started once per process
+@st.cache_resource
+def get_metrics_exporter():
+    port = os.environ.get("METRICS_PORT")
+    return start_exporter(METRICS, int(port)) if port else None
+
+# Save a freshly generated interview to the archive
+def archive_interview(character1, character2, topic, tone, interview, seconds=None, first_line_seconds=None):
+    get_interview_archive().add(character1, character2, topic, tone, MODEL_NAME, interview,
+                                seconds=seconds, first_line_seconds=first_line_seconds)
+
+# Export record for one archived interview
+def archived_export_record(archive, archive_id):
+    record = archive.get(archive_id)
+    return export_record(record["character1"], record["character2"], record["topic"], record["tone"], record["text"],
+                         turns=record["turns"], created_at=record["created_at"])
+
+# Zip of the archived interviews matching a history search, built when its download is clicked
+def bulk_export(query, tone, fmt):
+    archive = get_interview_archive()
     
-    # Create a prompt for the model
-    prompt = f"""
-    Generate a creative dialogue interview between {character1} and {character2}.
-    
-    Guidelines:
-    - The interview should be about {topic if topic else "any relevant topic that would be interesting for these characters"}.
-    - The tone should be {tone}.
-    - Include 8-10 exchanges between the characters.
-    - Each character should have distinct personality traits and speaking styles that reflect who they are.
-    - Format the output as a dialogue script with clear speaker indicators.
-    - Make it entertaining, insightful, and reflect the known characteristics/knowledge of these figures.
-    
-    Output format example:
-    {character1}: [First line of dialogue]
-    {character2}: [Response]
-    {character1}: [Reply]
-    ...and so on.
+    def build():
+        with METRICS.timer("export_seconds", format="zip"):
+            ids = archive.matching_ids(query, tone=tone, limit=BULK_LIMIT)
+            return zip_bytes((archived_export_record(archive, archive_id) for archive_id in ids), fmt)
+    
+    return build
+
+# Look up the cache and record the hit or miss
+def cached_interview(cache, cache_key, exclude=None):
+    interview = cache.get(cache_key, exclude=exclude)
+    METRICS.increment("cache_lookups", result="hit" if interview is not None else "miss")
+    return interview
+
+# Progress banner shown while an interview is generated, or while it waits for its turn
+def progress_banner(title, text):
+    return f"""
+    <div style="text-align: center; padding: 20px; background-color: #EFF6FF; border-radius: 10px; margin: 20px 0;">
+        <h3 style="color: #1E40AF; margin-bottom: 10px;">{title}</h3>
+        <p>{text}</p>
+        <div style="margin-top: 10px; width: 100%; height: 4px; background-color: #E0E7FF; border-radius: 2px; overflow: hidden;">
+            <div id="progress-bar" style="width: 0%; height: 100%; background-color: #3B82F6; border-radius: 2px;"></div>
+        </div>
+    </div>
     """
+
+GENERATING_BANNER = progress_banner("🧠 Creating Your Interview", "Using Gemini 1.5 Pro to generate a creative dialogue between your characters...")
+
+# Wait for the scheduler to let one Gemini call through. With a `status_box`,
+# the session's place in line replaces the progress banner while it waits.
+def acquire_slot(api_key, session_id, status_box=None, tokens=None):
+    queued = []
+    
+    def on_wait(position):
+        queued.append(position)
+        ahead = "You're next" if position == 1 else f"{position - 1} requests ahead of you"
+        status_box.markdown(progress_banner(f"⏳ Waiting for a free slot (#{position} in line)",
+                                            f"{ahead}. Requests are shared fairly between everyone using the app."),
+                            unsafe_allow_html=True)
+    
+    ticket = get_scheduler().acquire(api_key, session_id, INTERACTIVE, on_wait=on_wait if status_box is not None else None, tokens=tokens)
+    METRICS.record("queue_wait_seconds", ticket.dispatched - ticket.enqueued, priority="interactive")
+    if queued:
+        status_box.markdown(GENERATING_BANNER, unsafe_allow_html=True)
+    return ticket
+
+def total_tokens(response):
+    return sum(usage_counts(response).values())
+
+# Scheduler ticket for one model of a routed request: the first model uses the
+# slot the request already waited for, a hedge or fallback waits for its own
+def route_slot(scheduler, route, ticket, api_key, session_id):
+    if route.tier == 0:
+        return ticket
+    ticket = scheduler.acquire(api_key, session_id, INTERACTIVE)
+    route.sent()
+    return ticket
+
+# One non-streaming model call through the scheduler, router and call policy, with its timing and token counts recorded.
+# The scheduler reserves `reserve` tokens for it; observe(response_tokens, seconds) is called once it succeeds.
+def call_model(prompt, tone, api_key, session_id, length=DEFAULT_LENGTH, reserve=None, observe=None):
+    # Resolved here: the router runs each model's call in a thread without session context
+    registry = get_client_registry()
+    scheduler = get_scheduler()
+    router = get_router()
+    
+    def attempt(options):
+        ticket = acquire_slot(api_key, session_id, tokens=reserve)
+        
+        def start(route):
+            slot = route_slot(scheduler, route, ticket, api_key, session_id)
+            used = 0
+            try:
+                # A hedge that lost while still waiting for its slot never goes upstream
+                if route.cancelled.is_set():
+                    return None
+                started = time.perf_counter()
+                response = registry.get(api_key, route.model, SYSTEM_INSTRUCTION).generate_content(
+                    prompt, generation_config=generation_config(length), request_options=options)
+                text = reply_text(response)
+                used = total_tokens(response)
+            finally:
+                scheduler.settle(slot, used)
+            # A blocking call cannot be stopped midway, so a hedge that lost ran to the end;
+            # its tokens are settled above, but its timing would skew the latency and budget figures
+            if route.cancelled.is_set():
+                return None
+            seconds = time.perf_counter() - started
+            METRICS.record("generation_seconds", seconds, tone=tone, stream=False, model=route.model)
+            usage = usage_counts(response)
+            for name, count in usage.items():
+                METRICS.record(name, count, tone=tone)
+            if observe is not None:
+                observe(usage.get("response_tokens", 0), seconds)
+            return text
+        
+        return router.call(start)
     
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error generating interview: {str(e)}"
+    return get_call_policy().call(attempt)
+
+# Voice profiles for the two characters that exist so far; missing ones are
+# built in the background, at batch priority, for the next interview
+def character_personas(character1, character2, api_key, session_id):
+    store = get_persona_store()
+    registry = get_client_registry()
+    scheduler = get_scheduler()
+    policy = get_call_policy()
+    
+    def build(name):
+        def attempt(options):
+            ticket = scheduler.acquire(api_key, session_id, BATCH)
+            used = 0
+            try:
+                response = registry.get(api_key, MODEL_NAME).generate_content(build_persona_prompt(name), request_options=options)
+                used = total_tokens(response)
+                return response.text
+            finally:
+                scheduler.settle(ticket, used)
+        
+        return policy.call(attempt)
+    
+    for name in (character1, character2):
+        store.ensure(name, build)
+    return store.profiles([character1, character2])
+
+# Function to generate interview without streaming; raises GenerationError when the model call fails.
+# Takes the session ID and voice profiles as arguments, since it also runs in worker threads.
+def generate_interview(character1, character2, topic, tone, api_key, session_id, personas, length=DEFAULT_LENGTH):
+    # Create a prompt for the model
+    prompt = build_prompt(character1, character2, topic, tone, personas, length)
+    estimator = get_budget_estimator()
+    reserve = reserve_tokens(estimator.estimate(character1, character2, tone, length), prompt)
+    
+    def observe(tokens, seconds):
+        estimator.record(character1, character2, tone, length, tokens, seconds)
+    
+    return call_validated(lambda: call_model(prompt, tone, api_key, session_id, length, reserve, observe), character1, character2,
+                          **turn_limits(length))
+
+# Function to stream the interview one complete line at a time; `status_box` shows the place in line if it has to wait.
+# Yields None when the lines so far were off-format and a new reply follows. A reply
+# still streaming at the soft deadline ends at the line in progress, a whole turn,
+# and sets status["truncated"].
+def stream_interview(character1, character2, topic, tone, api_key, status_box=None, length=DEFAULT_LENGTH, status=None):
+    setup_model(api_key)
+    session_id = st.session_state.session_id
+    prompt = build_prompt(character1, character2, topic, tone, character_personas(character1, character2, api_key, session_id), length)
+    registry = get_client_registry()
+    scheduler = get_scheduler()
+    router = get_router()
+    estimator = get_budget_estimator()
+    reserve = reserve_tokens(estimator.estimate(character1, character2, tone, length), prompt)
+    
+    def attempt(options):
+        ticket = acquire_slot(api_key, session_id, status_box, tokens=reserve)
+        
+        def start(route):
+            slot = route_slot(scheduler, route, ticket, api_key, session_id)
+            used = 0
+            chars = 0
+            try:
+                if route.cancelled.is_set():
+                    return
+                started = time.perf_counter()
+                response = registry.get(api_key, route.model, SYSTEM_INSTRUCTION).generate_content(
+                    prompt, stream=True, generation_config=generation_config(length), request_options=options)
+                # Upstream is generating now; None until its usage arrives with the last chunk
+                used = None
+                first = True
+                for text in iter_text(response):
+                    if first:
+                        METRICS.record("time_to_first_token_seconds", time.perf_counter() - started, tone=tone, model=route.model)
+                        first = False
+                    chars += len(text)
+                    yield text
+                used = total_tokens(response)
+            finally:
+                scheduler.settle(slot, streamed_tokens(prompt, chars) if used is None else used)
+            seconds = time.perf_counter() - started
+            METRICS.record("generation_seconds", seconds, tone=tone, stream=True, model=route.model)
+            usage = usage_counts(response)
+            for name, count in usage.items():
+                METRICS.record(name, count, tone=tone)
+            estimator.record(character1, character2, tone, length, usage.get("response_tokens", 0), seconds)
+        
+        return router.stream(start)
+    
+    limits = turn_limits(length)
+    
+    # An off-format reply is cut off and asked for again; None tells the reader to start over
+    def open_lines():
+        if status is not None:
+            status.pop("truncated", None)
+        return iter_until(iter_lines(get_call_policy().stream(attempt)), SOFT_DEADLINE_SECONDS, limits["min_turns"], status)
+    
+    yield from iter_validated(open_lines, character1, character2, **limits)
+
+# New file for a long-form episode. Names keep only characters that are safe
+# in a file name ("AC/DC" becomes "AC_DC"), and a random suffix keeps two
+# episodes of the same pair started in the same second apart.
+def episode_path(character1, character2):
+    episodes_dir = os.environ.get("LONGFORM_DIR", "episodes")
+    os.makedirs(episodes_dir, exist_ok=True)
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    names = "_".join(re.sub(r"[^\w-]+", "_", name).strip("_")[:40] or "character" for name in (character1, character2))
+    return os.path.join(episodes_dir, f"episode_{names}_{current_time}_{uuid.uuid4().hex[:6]}.txt")
+
+# Function to stream a long-form episode segment by segment, also saving it to `path` as it arrives
+def stream_long_interview(character1, character2, topic, tone, api_key, exchanges, path, status_box=None):
+    model = setup_model(api_key)
+    session_id = st.session_state.session_id
+    
+    with open(path, "w", encoding="utf-8") as out:
+        yield from iter_long_form(model, character1, character2, topic, tone, exchanges, out=out, policy=get_call_policy(),
+                                  before_call=lambda: acquire_slot(api_key, session_id, status_box),
+                                  after_call=get_scheduler().settle)
+
+# Function to generate one character pair in several tones at once, yielding (tone, interview, error) as each finishes
+def generate_all_tones(character1, character2, topic, api_key, length=DEFAULT_LENGTH, tones=TONES):
+    setup_model(api_key)
+    cache = get_interview_cache()
+    flight = get_single_flight()
+    # Read here: the worker threads below have no access to session state
+    session_id = st.session_state.session_id
+    personas = character_personas(character1, character2, api_key, session_id)
+    
+    def run(tone):
+        cache_key = make_key(character1, character2, topic, tone, MODEL_NAME, PROMPT_VERSION, length)
+        interview = cached_interview(cache, cache_key)
+        if interview is None:
+            # Only the session that actually calls the model archives the result
+            def generate():
+                started = time.perf_counter()
+                text = generate_interview(character1, character2, topic, tone, api_key, session_id, personas, length)
+                archive_interview(character1, character2, topic, tone, text, seconds=time.perf_counter() - started)
+                return text
+            
+            try:
+                interview = flight.do(cache_key, generate)
+            except GenerationError as e:
+                return tone, None, e
+            except Exception:
+                # The session leading it gave up (an abandoned stream or a cancelled prefetch); generate our own copy
+                try:
+                    interview = generate()
+                except GenerationError as e:
+                    return tone, None, e
+            cache.put(cache_key, interview)
+        return tone, interview, None
+    
+    with ThreadPoolExecutor(max_workers=len(tones)) as pool:
+        futures = [pool.submit(run, t) for t in tones]
+        for future in as_completed(futures):
+            yield future.result()
+
+# Background job that generates one interview into the cache before Generate
+# is clicked. It waits behind interactive requests in the scheduler, stops
+# between lines once cancelled, and lets a Generate click for the same inputs
+# join it through single-flight, which promotes it if it is still queued. Everything is resolved here, since the
+# prefetch thread has no access to session state.
+def prefetch_job(character1, character2, topic, tone, api_key, session_id, length=DEFAULT_LENGTH):
+    model = get_client_registry().get(api_key, MODEL_NAME, SYSTEM_INSTRUCTION)
+    cache = get_interview_cache()
+    archive = get_interview_archive()
+    flight = get_single_flight()
+    policy = get_call_policy()
+    scheduler = get_scheduler()
+    estimator = get_budget_estimator()
+    cache_key = make_key(character1, character2, topic, tone, MODEL_NAME, PROMPT_VERSION, length)
+    prompt = build_prompt(character1, character2, topic, tone, character_personas(character1, character2, api_key, session_id), length)
+    reserve = reserve_tokens(estimator.estimate(character1, character2, tone, length), prompt)
+    
+    def job(prefetch):
+        if cache.peek(cache_key):
+            return
+        future, leader = flight.begin(cache_key)
+        if not leader:
+            # Already being generated, by a click or another session's prefetch
+            return
+        
+        # A Generate click that joins this job while it is still queued moves it up to interactive priority
+        def enqueued(ticket):
+            prefetch.on_claim = lambda: scheduler.promote(ticket)
+            if prefetch.claimed.is_set():
+                scheduler.promote(ticket)
+        
+        def attempt(options):
+            ticket = scheduler.acquire(api_key, session_id, BATCH, tokens=reserve, on_enqueue=enqueued)
+            used = 0
+            chars = 0
+            try:
+                # Cancelled while queued: end with no output and never call the model
+                if prefetch.cancelled.is_set():
+                    return
+                prefetch.called = True
+                started = time.perf_counter()
+                response = model.generate_content(prompt, stream=True, generation_config=generation_config(length),
+                                                  request_options=options)
+                # Usage only arrives with the last chunk; a cancelled prefetch settles on the text so far
+                used = None
+                for text in iter_text(response):
+                    chars += len(text)
+                    yield text
+                used = total_tokens(response)
+            finally:
+                scheduler.settle(ticket, streamed_tokens(prompt, chars) if used is None else used)
+            seconds = time.perf_counter() - started
+            METRICS.record("generation_seconds", seconds, tone=tone, stream=True, source="prefetch")
+            usage = usage_counts(response)
+            for name, count in usage.items():
+                METRICS.record(name, count, tone=tone)
+            estimator.record(character1, character2, tone, length, usage.get("response_tokens", 0), seconds)
+        
+        interview = None
+        error = RuntimeError("prefetch abandoned")
+        try:
+            started = time.perf_counter()
+            lines = []
+            for line in iter_validated(lambda: iter_lines(policy.stream(attempt)), character1, character2, **turn_limits(length)):
+                # Raising here closes the stream, and with it the upstream response
+                prefetch.check()
+                if line is None:
+                    lines = []
+                    continue
+                lines.append(line)
+            prefetch.check()
+            interview = "\n".join(lines)
+            cache.put(cache_key, interview)
+            archive.add(character1, character2, topic, tone, MODEL_NAME, interview, seconds=time.perf_counter() - started)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if interview is not None:
+                flight.complete(cache_key, interview)
+            else:
+                flight.fail(cache_key, error)
+    
+    return job
+
+# Hidden admin pages: latency and token metrics with ?admin=metrics, per-session interview memory with ?admin=memory
+get_metrics_exporter()
+if st.query_params.get("admin") == "metrics":
+    render_metrics_page(METRICS)
+    st.stop()
+if st.query_params.get("admin") == "memory":
+    render_memory_page(get_script_store())
+    st.stop()
 
 # Sidebar for API Key with enhanced styling
 with st.sidebar:
@@ -210,7 +504,8 @@ with st.sidebar:
     api_key = st.text_input(
         "Google API Key", 
         type="password", 
-        help="Get your API key from Google AI Studio (https://makersuite.google.com/)"
+        help="Get your API key from Google AI Studio (https://makersuite.google.com/)",
+        key="api_key"
     )
     
     # Show status based on whether API key is provided
@@ -219,6 +514,14 @@ with st.sidebar:
     else:
         st.warning("⚠️ API Key required to generate interviews")
     
+    # Speculative mode: generate the interview in the background once the inputs are complete
+    st.toggle("⚡ Prefetch interviews", key="prefetch_enabled",
+              help="Start generating as soon as both characters are filled in, so Generate often returns instantly. "
+                   "Uses API quota for interviews you may not ask for.")
+    
+    # Interview cache counters, filled in at the end of the run so they include this run's lookups
+    cache_stats_box = st.empty()
+    
     st.markdown("<hr style='margin: 30px 0; border-color: #E5E7EB;'>", unsafe_allow_html=True)
     
     # About section with improved styling
@@ -254,363 +557,667 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Store the current selected character pair
-if 'char1' not in st.session_state:
-    st.session_state.char1 = ""
-if 'char2' not in st.session_state:
-    st.session_state.char2 = ""
-if 'topic' not in st.session_state:
-    st.session_state.topic = ""
+# Store the current selected character pair and tone
+if 'char1_input' not in st.session_state:
+    st.session_state.char1_input = ""
+if 'char2_input' not in st.session_state:
+    st.session_state.char2_input = ""
+if 'topic_input' not in st.session_state:
+    st.session_state.topic_input = ""
 if 'tone' not in st.session_state:
     st.session_state.tone = "Funny"
+if 'length' not in st.session_state:
+    st.session_state.length = DEFAULT_LENGTH
 
-# Functions for button clicks to update state
-def set_example(char1, char2, topic):
-    st.session_state.char1 = char1
-    st.session_state.char2 = char2
-    st.session_state.topic = topic
-    st.rerun()
+# The interview on screen, as its ID in the shared script store
+if 'interview_id' not in st.session_state:
+    st.session_state.interview_id = None
+# Tone comparison results, tone -> script store ID
+if 'tone_results' not in st.session_state:
+    st.session_state.tone_results = None
+# Why a tone failed, tone -> message, until it is tried again
+if 'tone_errors' not in st.session_state:
+    st.session_state.tone_errors = {}
+if 'tone_chars' not in st.session_state:
+    st.session_state.tone_chars = {"char1": "", "char2": "", "topic": ""}
 
-# Container for character pair examples
-st.markdown("""
-<h3 style="margin-bottom: 20px; color: #3B82F6; text-align: center;">
-    Select from popular character combinations
-</h3>
-<p style="text-align: center; color: #6B7280; margin-bottom: 20px;">
-    Featuring combinations from world history, pop culture, and Indian mythology
-</p>
-""", unsafe_allow_html=True)
+# History paging: the `before` id of each page visited so far, newest page first
+if 'history_pages' not in st.session_state:
+    st.session_state.history_pages = [None]
 
-# First row of examples
-example_pairs = [
-    ("Socrates", "Steve Jobs", "Innovation and Ethics"),
-    ("Nikola Tesla", "Tony Stark", "Future of Technology"),
-    ("Marie Curie", "Wonder Woman", "Female Empowerment")
-]
+# The parts of a browser session worth keeping: form inputs and the IDs of the interviews shown
+def session_snapshot():
+    return {"char1": st.session_state.char1_input, "char2": st.session_state.char2_input,
+            "topic": st.session_state.topic_input, "tone": st.session_state.tone, "length": st.session_state.length,
+            "interview": st.session_state.interview_id, "tone_chars": dict(st.session_state.tone_chars),
+            # Copied: the comparison fills this dict in place
+            "tone_results": None if st.session_state.tone_results is None else dict(st.session_state.tone_results)}
 
-example_col1, example_col2, example_col3 = st.columns(3)
+# Save the session to the shared state when it has changed since the last
+# save. Called at the end of every section that can change it, since fragment
+# reruns do not reach the end of the script. The interviews it shows are saved
+# too when other replicas share the state; with state in this process only,
+# the script store already holds them, and a second copy would only get
+# around its memory ceiling.
+def save_session():
+    snapshot = session_snapshot()
+    if snapshot == st.session_state.get("saved_snapshot"):
+        return
+    state = get_state()
+    store = get_script_store()
+    if state.shared:
+        for record_id in [snapshot["interview"], *(snapshot["tone_results"] or {}).values()]:
+            record = store.get(record_id) if record_id else None
+            if record is not None:
+                state.set(f"interview:{record_id}", record, ttl=store.session_ttl)
+    state.set(f"session:{st.session_state.session_id}", snapshot, ttl=store.session_ttl)
+    st.session_state.saved_snapshot = snapshot
 
-# Display example cards with enhanced styling
-with example_col1:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{example_pairs[0][0]} & {example_pairs[0][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {example_pairs[0][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn1"):
-        set_example(*example_pairs[0])
-
-with example_col2:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{example_pairs[1][0]} & {example_pairs[1][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {example_pairs[1][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn2"):
-        set_example(*example_pairs[1])
-
-with example_col3:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{example_pairs[2][0]} & {example_pairs[2][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {example_pairs[2][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn3"):
-        set_example(*example_pairs[2])
+# Bring back a saved session into this one, e.g. after a reload or on another
+# replica; interviews that expired meanwhile are simply not shown
+def restore_session(linked_id):
+    state = get_state()
+    snapshot = state.get(f"session:{linked_id}")
+    if snapshot is None:
+        return
+    store = get_script_store()
+    
+    def load(slot, record_id):
+        if not record_id:
+            return None
+        record = store.get(record_id) or state.get(f"interview:{record_id}")
+        return store.put(st.session_state.session_id, slot, record) if record is not None else None
+    
+    st.session_state.char1_input = snapshot["char1"]
+    st.session_state.char2_input = snapshot["char2"]
+    st.session_state.topic_input = snapshot["topic"]
+    st.session_state.tone = snapshot["tone"]
+    st.session_state.length = snapshot.get("length", DEFAULT_LENGTH)
+    st.session_state.interview_id = load("interview", snapshot["interview"])
+    if snapshot["tone_results"] is not None:
+        loaded = {t: load(f"tone:{t}", record_id) for t, record_id in snapshot["tone_results"].items()}
+        st.session_state.tone_results = {t: record_id for t, record_id in loaded.items() if record_id}
+        st.session_state.tone_chars = snapshot["tone_chars"]
+    # Saved under this session's own ID, so reloading its new URL finds it too
+    save_session()
 
-# Second row of examples
-more_example_pairs = [
-    ("Krishna", "Arjuna", "Duty and Dharma"),
-    ("Rama", "Ravana", "Ethics of Leadership"),
-    ("Leonardo da Vinci", "Elon Musk", "Future of Art and Technology")
-]
+# Identifies this browser session to the scheduler, which takes turns between
+# sessions. It is kept in the page URL, so a reload or a reconnect to another
+# replica restores the session from the shared state. Every new browser
+# session gets an ID of its own and copies the linked one, so opening a
+# copied or shared link never takes over the session it came from.
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    linked = st.query_params.get("session", "")
+    if re.fullmatch(r"[0-9a-f]{32}", linked):
+        restore_session(linked)
+    st.query_params["session"] = st.session_state.session_id
+get_script_store().touch(st.session_state.session_id)
 
-example_col4, example_col5, example_col6 = st.columns(3)
+# The session's interview as {char1, char2, topic, tone, length, text}, or None
+def current_interview():
+    interview_id = st.session_state.interview_id
+    return get_script_store().get(interview_id) if interview_id else None
 
-with example_col4:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{more_example_pairs[0][0]} & {more_example_pairs[0][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {more_example_pairs[0][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn4"):
-        set_example(*more_example_pairs[0])
+# True if `current` (char1, char2, topic, tone, length) is the request behind the interview on screen.
+# Records saved before length presets existed are Standard ones.
+def is_current_interview(current):
+    record = current_interview()
+    return record is not None and all(record.get(k, DEFAULT_LENGTH) == v for k, v in current.items())
 
-with example_col5:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{more_example_pairs[1][0]} & {more_example_pairs[1][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {more_example_pairs[1][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn5"):
-        set_example(*more_example_pairs[1])
-
-with example_col6:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{more_example_pairs[2][0]} & {more_example_pairs[2][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {more_example_pairs[2][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn6"):
-        set_example(*more_example_pairs[2])
+# Show an interview; the text goes to the shared store and only its ID into session state
+def show_interview(character1, character2, topic, tone, text, length=DEFAULT_LENGTH):
+    record = {"char1": character1, "char2": character2, "topic": topic, "tone": tone, "length": length, "text": text}
+    st.session_state.interview_id = get_script_store().put(st.session_state.session_id, "interview", record)
 
-# Third row of examples from Indian history and mythology
-st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
-example_col7, example_col8, example_col9 = st.columns(3)
+# Functions for button clicks to update state
+def set_example(char1, char2, topic):
+    st.session_state.char1_input = char1
+    st.session_state.char2_input = char2
+    st.session_state.topic_input = topic
 
-indian_examples = [
-    ("Emperor Akbar", "Birbal", "Wit and Wisdom"),
-    ("Shiva", "Parvati", "Divine Partnership"),
-    ("Chanakya", "Chandragupta Maurya", "Statecraft and Politics")
-]
+def set_tone(tone):
+    st.session_state.tone = tone
 
-with example_col7:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{indian_examples[0][0]} & {indian_examples[0][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {indian_examples[0][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn7"):
-        set_example(*indian_examples[0])
+def clear_interview():
+    get_script_store().release(st.session_state.session_id, ["interview"])
+    st.session_state.interview_id = None
 
-with example_col8:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{indian_examples[1][0]} & {indian_examples[1][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {indian_examples[1][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn8"):
-        set_example(*indian_examples[1])
+def close_comparison():
+    get_script_store().release(st.session_state.session_id, [f"tone:{t}" for t in TONES])
+    st.session_state.tone_results = None
+    st.session_state.tone_errors = {}
 
-with example_col9:
-    st.markdown(f"""
-    <div class="example-card">
-        <h4 style="color: #2563EB; margin-bottom: 5px;">{indian_examples[2][0]} & {indian_examples[2][1]}</h4>
-        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {indian_examples[2][2]}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    if st.button(f"Select Pair", key=f"btn9"):
-        set_example(*indian_examples[2])
+def retry_tone(tone):
+    st.session_state.tone_retry = tone
 
-# Divider with styling
-st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+def reset_history_pages():
+    st.session_state.history_pages = [None]
 
-# Custom Interview Creation section
-st.markdown("""
-<h3 style="margin-bottom: 20px; color: #3B82F6; text-align: center;">
-    Create Your Custom Interview
-</h3>
-""", unsafe_allow_html=True)
+def older_history_page(before):
+    st.session_state.history_pages.append(before)
 
-# Enhanced character input section
-input_col1, input_col2 = st.columns(2)
+def newer_history_page():
+    st.session_state.history_pages.pop()
 
-with input_col1:
-    st.markdown("""
-    <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
-        <h4 style="color: #1E40AF; margin: 0;">Character 1</h4>
-    </div>
-    """, unsafe_allow_html=True)
-    character1 = st.text_input("Enter name", value=st.session_state.char1, placeholder="e.g., Albert Einstein", key="char1_input")
+# Prefetch the interview the form inputs describe, or cancel the session's
+# prefetch when there is nothing worth generating ahead of time
+def maybe_prefetch():
+    prefetcher = get_prefetcher()
+    session_id = st.session_state.session_id
+    character1 = st.session_state.char1_input
+    character2 = st.session_state.char2_input
+    topic = st.session_state.topic_input
+    tone = st.session_state.tone
+    length = st.session_state.length
+    api_key = st.session_state.get("api_key")
+    current = {"char1": character1, "char2": character2, "topic": topic, "tone": tone, "length": length}
+    # Long-form episodes bypass the cache, and asking again for the interview on screen means "regenerate"
+    if (not st.session_state.get("prefetch_enabled") or not character1 or not character2 or not api_key
+            or st.session_state.get("long_form") or is_current_interview(current)):
+        prefetcher.cancel(session_id)
+        return
+    
+    cache_key = make_key(character1, character2, topic, tone, MODEL_NAME, PROMPT_VERSION, length)
+    if prefetcher.covers(session_id, cache_key):
+        return
+    if get_interview_cache().peek(cache_key):
+        prefetcher.cancel(session_id)
+        return
+    prefetcher.request(session_id, cache_key, prefetch_job(character1, character2, topic, tone, api_key, session_id, length))
 
-with input_col2:
-    st.markdown("""
-    <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
-        <h4 style="color: #1E40AF; margin: 0;">Character 2</h4>
-    </div>
-    """, unsafe_allow_html=True)
-    character2 = st.text_input("Enter name", value=st.session_state.char2, placeholder="e.g., Cleopatra", key="char2_input")
+def open_archived(archive_id):
+    record = get_interview_archive().get(archive_id)
+    if record is not None:
+        show_interview(record["character1"], record["character2"], record["topic"], record["tone"], record["text"])
 
-# Topic input with styling
-st.markdown("""
-<div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
-    <h4 style="color: #1E40AF; margin: 0;">Interview Topic</h4>
-</div>
-""", unsafe_allow_html=True)
-topic = st.text_input("What should they discuss? (Optional)", value=st.session_state.topic, placeholder="e.g., Power & Leadership")
+# Pair picker. Selecting a pair changes the inputs in the generation form, so
+# it is the one interaction that still reruns the whole app.
+@st.fragment
+def pair_picker():
+    with METRICS.timer("rerun_seconds", scope="pair_picker"):
+        st.markdown("""
+        <h3 style="margin-bottom: 20px; color: #3B82F6; text-align: center;">
+            Select from popular character combinations
+        </h3>
+        <p style="text-align: center; color: #6B7280; margin-bottom: 20px;">
+            Featuring combinations from world history, pop culture, and Indian mythology
+        </p>
+        """, unsafe_allow_html=True)
+        
+        selected = False
+        for row_index, row in enumerate(EXAMPLE_ROWS):
+            if row_index:
+                st.markdown("<div style='height: 20px;'></div>", unsafe_allow_html=True)
+            for col_index, (example_col, pair) in enumerate(zip(st.columns(3), row)):
+                # Display example cards with enhanced styling
+                with example_col:
+                    st.markdown(EXAMPLE_CARDS[pair], unsafe_allow_html=True)
+                    if st.button("Select Pair", key=f"btn{row_index * 3 + col_index + 1}", on_click=set_example, args=pair):
+                        selected = True
+    
+    if selected:
+        st.rerun()
 
-# Tone selection with visual options
-st.markdown("""
-<div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
-    <h4 style="color: #1E40AF; margin: 0;">Conversation Tone</h4>
-</div>
-""", unsafe_allow_html=True)
+# Tone selector; a click only reruns this section
+@st.fragment
+def tone_selector():
+    with METRICS.timer("rerun_seconds", scope="tone_selector"):
+        tone = st.session_state.tone
+        for t_col, t_option in zip(st.columns(4), TONES):
+            with t_col:
+                # Pick the card with the selected class for the current tone
+                st.markdown(TONE_CARDS[t_option, tone == t_option], unsafe_allow_html=True)
+                
+                st.button(t_option, key=f"tone_{t_option}", on_click=set_tone, args=(t_option,))
+        
+        # What the interview is likely to cost, from past runs of this pair and tone once there are enough of them.
+        # Shown here so a tone click, which reruns only this section, updates it.
+        character1 = st.session_state.char1_input
+        character2 = st.session_state.char2_input
+        length = st.session_state.length
+        if character1 and character2:
+            estimate = get_budget_estimator().estimate(character1, character2, tone, length)
+            basis = {"pair": f"from {estimate['runs']} past runs of this pair and tone",
+                     "tone": f"from {estimate['runs']} past {tone.lower()} interviews",
+                     "length": f"from {estimate['runs']} past {length.lower()} interviews",
+                     "default": "typical for this length"}[estimate["basis"]]
+            st.caption(f"About {estimate['tokens']:,} tokens and {estimate['seconds']:.0f} s, {basis}")
+        
+        # Runs with every rerun of the form too, since the selector is part of it
+        maybe_prefetch()
+        save_session()
 
-# Initialize tone with session state or default
-tone = st.session_state.tone
-
-# Visual tone selector
-tone_cols = st.columns(4)
-tone_options = ["Funny", "Dramatic", "Philosophical", "Creative"]
-tone_icons = ["😂", "😲", "🧠", "✨"]
-tone_descriptions = [
-    "Humorous dialogue", 
-    "Emotional exchanges", 
-    "Deep conversations", 
-    "Imaginative ideas"
-]
-
-# Set the selected class based on the current tone
-for i, (t_col, t_option, t_icon, t_desc) in enumerate(zip(tone_cols, tone_options, tone_icons, tone_descriptions)):
-    with t_col:
-        is_selected = tone == t_option
-        selected_class = "selected" if is_selected else ""
+# Result viewer; its buttons only rerun this section
+@st.fragment
+def result_viewer():
+    # Its buttons clear the interview before this reruns
+    save_session()
+    shown = current_interview()
+    if shown is None:
+        return
+    
+    with METRICS.timer("rerun_seconds", scope="result_viewer"):
+        interview = shown["text"]
+        character1 = shown["char1"]
+        character2 = shown["char2"]
+        topic = shown["topic"]
+        tone = shown["tone"]
         
+        # Create a stylish header for the interview results
         st.markdown(f"""
-        <div class="tone-option {selected_class}">
-            <div class="tone-icon">{t_icon}</div>
-            <div><strong>{t_option}</strong></div>
-            <div style="font-size: 0.8rem; color: #6B7280;">{t_desc}</div>
+        <div class="interview-header" style="text-align: center; margin: 30px 0 20px 0;">
+            <h2 style="color: #1E40AF; margin-bottom: 5px;">🎬 Interview between {character1} and {character2}</h2>
+            <p style="color: #4B5563; font-size: 0.9rem;">
+                <span style="margin-right: 15px;"><strong>Topic:</strong> {topic if topic else "General conversation"}</span>
+                <span><strong>Tone:</strong> {tone}</span>
+            </p>
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button(t_option, key=f"tone_{t_option}"):
-            tone = t_option
-            st.session_state.tone = tone
-
-# Generate button with a more attractive styling
-st.markdown("<div style='margin: 30px 0;'></div>", unsafe_allow_html=True)
-generate_col1, generate_col2, generate_col3 = st.columns([1, 2, 1])
+        # Display the interview in a nicely formatted box
+        with st.container():
+            st.markdown('<div class="generated-interview">', unsafe_allow_html=True)
+            
+            # Parsed and rendered once per interview; reruns from other widgets reuse the cached HTML
+            with METRICS.timer("render_seconds"):
+                formatted_text = render_dialogue(interview, character1, character2)
+                st.markdown(formatted_text, unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            # Create action buttons with better styling
+            st.markdown("<div style='margin: 30px 0 20px 0;'>", unsafe_allow_html=True)
+            
+            button_col1, button_col2, button_col3 = st.columns([1, 1, 1])
+            
+            # Download button; the file is encoded only when clicked, and at most once per interview and format
+            record = export_record(character1, character2, topic, tone, interview)
+            export_cache = get_export_cache()
+            
+            with button_col1:
+                fmt = st.selectbox("Format", list(FORMATS), format_func=lambda f: FORMATS[f][0],
+                                   key="export_format", label_visibility="collapsed")
+                
+                def encode():
+                    with METRICS.timer("export_seconds", format=fmt):
+                        return export_cache.get(record, fmt)
+                
+                st.download_button(
+                    label="📥 Download Script",
+                    data=encode,
+                    file_name=export_filename(record, fmt),
+                    mime=FORMATS[fmt][2],
+                    on_click="ignore",
+                    use_container_width=True
+                )
+            
+            # Generate new interview button
+            with button_col2:
+                st.button("🔄 Create New Interview", key="new_interview", on_click=clear_interview, use_container_width=True)
+                    
+            # Try different tone button; keeps the same characters but clears the interview
+            with button_col3:
+                st.button("🎭 Try Different Tone", key="diff_tone", on_click=clear_interview, use_container_width=True)
+                    
+            st.markdown("</div>", unsafe_allow_html=True)
 
-with generate_col2:
-    st.markdown("""
-    <div style="text-align: center; margin-bottom: 10px;">
-        <p style="color: #6B7280;">Ready to create your fictional interview?</p>
-    </div>
-    """, unsafe_allow_html=True)
-    generate_interview_clicked = st.button("✨ Generate Interview", type="primary", use_container_width=True)
-
-# Create a container for the interview result
-interview_container = st.container()
-
-# Store the interview in session state
-if 'interview' not in st.session_state:
-    st.session_state.interview = None
-if 'current_chars' not in st.session_state:
-    st.session_state.current_chars = {"char1": "", "char2": "", "topic": "", "tone": ""}
-
-# Display validation messages or process the interview generation
-if generate_interview_clicked:
-    if not character1 or not character2:
-        st.error("Please provide both character names.")
-    elif not api_key:
-        st.error("Please enter your Google API Key in the sidebar.")
+# Generate the interview for the form inputs and store it in session state
+def run_generation(character1, character2, topic, tone, api_key, long_form, long_exchanges, length=DEFAULT_LENGTH):
+    # Show a styled progress message; it turns into the place in line if the request has to wait
+    progress_message = st.empty()
+    progress_message.markdown(GENERATING_BANNER, unsafe_allow_html=True)
+    
+    current = {"char1": character1, "char2": character2, "topic": topic, "tone": tone, "length": length}
+    generation_error = None
+    stream_box = st.empty()
+    # Timings of a fresh generation, archived with it; stays empty when the script comes from the cache
+    timings = {}
+    started = time.perf_counter()
+    
+    if long_form:
+        # Long-form episodes bypass the cache. Only the segment being written is
+        # kept and shown while it streams; the lines go straight to the episode
+        # file, which is read back once for the finished episode.
+        path = episode_path(character1, character2)
+        speakers = SpeakerIndex(character1, character2)
+        current_segment = None
+        rendered = []
+        try:
+            for segment, line in stream_long_interview(character1, character2, topic, tone, api_key, long_exchanges, path, progress_message):
+                if current_segment is None:
+                    timings["first_line_seconds"] = time.perf_counter() - started
+                if segment != current_segment:
+                    # A call that had to queue between segments puts the banner back up
+                    progress_message.empty()
+                    current_segment = segment
+                    rendered = []
+                turn = speakers.parse_line(line)
+                if turn is not None:
+                    rendered.append(render_turn(turn))
+                    stream_box.markdown(f'<p style="color: #6B7280;">Part {segment + 1} of the episode</p>'
+                                        f'<div class="generated-interview">{"".join(rendered)}</div>', unsafe_allow_html=True)
+        except GenerationError as e:
+            # Keep whatever part of the episode already arrived
+            generation_error = e
+        with open(path, encoding="utf-8") as episode:
+            interview = episode.read().rstrip("\n") or None
+        timings["seconds"] = time.perf_counter() - started
     else:
-        # Show a styled progress message
-        progress_message = st.empty()
-        progress_message.markdown("""
-        <div style="text-align: center; padding: 20px; background-color: #EFF6FF; border-radius: 10px; margin: 20px 0;">
-            <h3 style="color: #1E40AF; margin-bottom: 10px;">🧠 Creating Your Interview</h3>
-            <p>Using Gemini 1.5 Pro to generate a creative dialogue between your characters...</p>
-            <div style="margin-top: 10px; width: 100%; height: 4px; background-color: #E0E7FF; border-radius: 2px; overflow: hidden;">
-                <div id="progress-bar" style="width: 0%; height: 100%; background-color: #3B82F6; border-radius: 2px;"></div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Generate the interview
-        with st.spinner(""):
-            interview = generate_interview(character1, character2, topic, tone, api_key)
-            st.session_state.interview = interview
-            st.session_state.current_chars = {"char1": character1, "char2": character2, "topic": topic, "tone": tone}
+        # Serve from the cache when possible; asking again for the interview on screen means "regenerate"
+        cache = get_interview_cache()
+        cache_key = make_key(character1, character2, topic, tone, MODEL_NAME, PROMPT_VERSION, length)
+        exclude = current_interview()["text"] if is_current_interview(current) else None
+        if st.session_state.get("prefetch_enabled"):
+            # A running prefetch is joined through single-flight below, a finished one is in the cache
+            prefetched = get_prefetcher().claim(st.session_state.session_id, cache_key)
+            METRICS.increment("generate_requests", prefetch="hit" if prefetched else "miss")
+        interview = cached_interview(cache, cache_key, exclude=exclude)
         
-        # Clear the progress message
-        progress_message.empty()
+        future = None
+        if interview is None:
+            # Join an identical generation already running in another session instead of starting a new one
+            flight = get_single_flight()
+            future, leader = flight.begin(cache_key) if exclude is None else (None, True)
+            if not leader:
+                try:
+                    interview = future.result()
+                except GenerationError as e:
+                    generation_error = e
+                except Exception:
+                    # The other session gave up; generate our own copy below
+                    pass
+                future = None
         
-        # Rerun to show the result in a cleaner way
-        st.rerun()
+        if interview is None and generation_error is None:
+            try:
+                # Stream the interview into the result box line by line
+                speakers = SpeakerIndex(character1, character2)
+                lines = []
+                rendered = []
+                status = {}
+                for line in stream_interview(character1, character2, topic, tone, api_key, progress_message, length, status):
+                    if line is None:
+                        # The reply so far was not a proper dialogue; its replacement streams into a clean box
+                        lines = []
+                        rendered = []
+                        timings.pop("first_line_seconds", None)
+                        stream_box.empty()
+                        progress_message.markdown(progress_banner("🔁 Trying Again", "The first reply did not follow the interview format, so it was cut short and requested again..."), unsafe_allow_html=True)
+                        continue
+                    if not lines:
+                        # First line is in, the banner is no longer needed
+                        progress_message.empty()
+                        timings["first_line_seconds"] = time.perf_counter() - started
+                    lines.append(line)
+                    turn = speakers.parse_line(line)
+                    if turn is not None:
+                        rendered.append(render_turn(turn))
+                        stream_box.markdown(f'<div class="generated-interview">{"".join(rendered)}</div>', unsafe_allow_html=True)
+                
+                interview = "\n".join(lines)
+                if status.get("truncated"):
+                    # Cut short at the soft deadline: shown, but neither cached nor archived as the script for these inputs
+                    timings = {}
+                else:
+                    timings["seconds"] = time.perf_counter() - started
+                    cache.put(cache_key, interview)
+            except GenerationError as e:
+                generation_error = e
+            finally:
+                # Hand the outcome to any sessions waiting on this generation
+                if future is not None:
+                    if interview is not None:
+                        flight.complete(cache_key, interview)
+                    elif generation_error is not None:
+                        flight.fail(cache_key, generation_error)
+                    else:
+                        flight.fail(cache_key, RuntimeError("generation abandoned"))
+    
+    # Clear the progress message and the streaming preview; the result block below renders the final script
+    progress_message.empty()
+    stream_box.empty()
+    
+    # Failures are shown on their own and never stored or offered for download as a script
+    if generation_error is not None:
+        st.error(f"⚠️ {generation_error.user_message}")
+        with st.expander("Error details"):
+            st.code(str(generation_error))
+    if interview:
+        show_interview(character1, character2, topic, tone, interview, length)
+        if timings:
+            archive_interview(character1, character2, topic, tone, interview, **timings)
 
-# Display the interview if it exists in session state
-if st.session_state.interview:
-    interview = st.session_state.interview
-    character1 = st.session_state.current_chars["char1"]
-    character2 = st.session_state.current_chars["char2"]
-    topic = st.session_state.current_chars["topic"]
-    tone = st.session_state.current_chars["tone"]
+# Tone comparison tabs; the tones in `pending` are requested at once and fill their tabs as they finish.
+# A tone that failed, or whose script expired, keeps its tab with the reason and a button to try it again.
+def tone_comparison(api_key, pending):
+    tone_results = st.session_state.tone_results
+    tone_errors = st.session_state.tone_errors
+    compare_chars = st.session_state.tone_chars
+    store = get_script_store()
     
-    # Create a stylish header for the interview results
     st.markdown(f"""
     <div class="interview-header" style="text-align: center; margin: 30px 0 20px 0;">
-        <h2 style="color: #1E40AF; margin-bottom: 5px;">🎬 Interview between {character1} and {character2}</h2>
+        <h2 style="color: #1E40AF; margin-bottom: 5px;">🎭 Tone comparison: {compare_chars["char1"]} and {compare_chars["char2"]}</h2>
         <p style="color: #4B5563; font-size: 0.9rem;">
-            <span style="margin-right: 15px;"><strong>Topic:</strong> {topic if topic else "General conversation"}</span>
-            <span><strong>Tone:</strong> {tone}</span>
+            <strong>Topic:</strong> {compare_chars["topic"] if compare_chars["topic"] else "General conversation"}
         </p>
     </div>
     """, unsafe_allow_html=True)
     
-    # Display the interview in a nicely formatted box
-    with st.container():
-        st.markdown('<div class="generated-interview">', unsafe_allow_html=True)
-        
-        # Process the interview to add better formatting
-        lines = interview.split('\n')
-        formatted_text = ""
-        
-        for line in lines:
-            if line.strip():
-                if ":" in line:
-                    parts = line.split(":", 1)
-                    speaker = parts[0].strip()
-                    dialogue = parts[1].strip()
-                    
-                    # Determine which character is speaking
-                    if speaker == character1:
-                        color = "#2563EB"
-                    elif speaker == character2:
-                        color = "#DB2777"
-                    else:
-                        color = "#4B5563"
-                        
-                    formatted_text += f'<p><span style="color: {color}; font-weight: 600;">{speaker}:</span> {dialogue}</p>\n'
-                else:
-                    formatted_text += f'<p style="font-style: italic; color: #6B7280;">{line}</p>\n'
+    def show_error(t_option):
+        with tone_boxes[t_option].container():
+            st.error(f"⚠️ {tone_errors.get(t_option, 'This version is no longer available.')}")
+            st.button("🔁 Try Again", key=f"retry_{t_option}", on_click=retry_tone, args=(t_option,))
+    
+    # Tabs switch in the browser, so every tone stays rendered and nothing is regenerated
+    tone_boxes = {}
+    tone_tabs = st.tabs(TONE_TAB_LABELS)
+    for tone_tab, t_option in zip(tone_tabs, TONES):
+        with tone_tab:
+            tone_boxes[t_option] = st.empty()
+            tone_record = store.get(tone_results[t_option]) if t_option in tone_results else None
+            if tone_record is not None:
+                tone_boxes[t_option].markdown(f'<div class="generated-interview">{render_dialogue(tone_record["text"], compare_chars["char1"], compare_chars["char2"])}</div>', unsafe_allow_html=True)
+            elif t_option in pending:
+                tone_boxes[t_option].info(f"Generating the {t_option.lower()} version...")
             else:
-                formatted_text += '<br>\n'
-        
-        st.markdown(formatted_text, unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Create action buttons with better styling
-        st.markdown("<div style='margin: 30px 0 20px 0;'>", unsafe_allow_html=True)
-        
-        button_col1, button_col2, button_col3 = st.columns([1, 1, 1])
-        
-        # Create download button
-        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"interview_{character1}_{character2}_{current_time}.txt"
-        
-        with button_col1:
-            st.download_button(
-                label="📥 Download Script",
-                data=interview,
-                file_name=filename,
-                mime="text/plain",
-                use_container_width=True
-            )
-        
-        # Generate new interview button
-        with button_col2:
-            if st.button("🔄 Create New Interview", key="new_interview", use_container_width=True):
-                st.session_state.interview = None
-                st.rerun()
-                
-        # Try different tone button
-        with button_col3:
-            if st.button("🎭 Try Different Tone", key="diff_tone", use_container_width=True):
-                # Keep the same characters but clear the interview
-                st.session_state.interview = None
-                st.rerun()
-                
-        st.markdown("</div>", unsafe_allow_html=True)
+                show_error(t_option)
+    
+    if pending:
+        for t_option, tone_interview, tone_error in generate_all_tones(compare_chars["char1"], compare_chars["char2"], compare_chars["topic"], api_key,
+                                                                     compare_chars.get("length", DEFAULT_LENGTH), pending):
+            if tone_error is not None:
+                tone_errors[t_option] = tone_error.user_message
+                show_error(t_option)
+                continue
+            tone_record = {"char1": compare_chars["char1"], "char2": compare_chars["char2"], "topic": compare_chars["topic"],
+                           "tone": t_option, "length": compare_chars.get("length", DEFAULT_LENGTH), "text": tone_interview}
+            tone_results[t_option] = store.put(st.session_state.session_id, f"tone:{t_option}", tone_record)
+            tone_errors.pop(t_option, None)
+            tone_boxes[t_option].markdown(f'<div class="generated-interview">{render_dialogue(tone_interview, compare_chars["char1"], compare_chars["char2"])}</div>', unsafe_allow_html=True)
+    
+    st.button("✖️ Close Comparison", key="close_compare", on_click=close_comparison)
+
+# Generation form: inputs, tone selector, generate buttons and results. Typing
+# or toggling options only reruns this section.
+@st.fragment
+def generation_form():
+    run_started = time.perf_counter()
+    
+    # Custom Interview Creation section
+    st.markdown("""
+    <h3 style="margin-bottom: 20px; color: #3B82F6; text-align: center;">
+        Create Your Custom Interview
+    </h3>
+    """, unsafe_allow_html=True)
+    
+    # Enhanced character input section
+    input_col1, input_col2 = st.columns(2)
+    
+    with input_col1:
+        st.markdown("""
+        <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
+            <h4 style="color: #1E40AF; margin: 0;">Character 1</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        character1 = st.text_input("Enter name", placeholder="e.g., Albert Einstein", key="char1_input")
+    
+    with input_col2:
+        st.markdown("""
+        <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
+            <h4 style="color: #1E40AF; margin: 0;">Character 2</h4>
+        </div>
+        """, unsafe_allow_html=True)
+        character2 = st.text_input("Enter name", placeholder="e.g., Cleopatra", key="char2_input")
+    
+    # Topic input with styling
+    st.markdown("""
+    <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
+        <h4 style="color: #1E40AF; margin: 0;">Interview Topic</h4>
+    </div>
+    """, unsafe_allow_html=True)
+    topic = st.text_input("What should they discuss? (Optional)", placeholder="e.g., Power & Leadership", key="topic_input")
+    
+    # Tone selection with visual options
+    st.markdown("""
+    <div style="background-color: #EFF6FF; padding: 10px 15px; border-radius: 8px; margin-bottom: 10px;">
+        <h4 style="color: #1E40AF; margin: 0;">Conversation Tone</h4>
+    </div>
+    """, unsafe_allow_html=True)
+    tone_selector()
+    
+    # Generate button with a more attractive styling
+    st.markdown("<div style='margin: 30px 0;'></div>", unsafe_allow_html=True)
+    generate_col1, generate_col2, generate_col3 = st.columns([1, 2, 1])
+    
+    with generate_col2:
+        st.markdown("""
+        <div style="text-align: center; margin-bottom: 10px;">
+            <p style="color: #6B7280;">Ready to create your fictional interview?</p>
+        </div>
+        """, unsafe_allow_html=True)
+        length = st.radio("Length", list(LENGTHS), key="length", horizontal=True,
+                          help="Short, standard or long interview; long-form episodes set their own length below")
+        generate_interview_clicked = st.button("✨ Generate Interview", type="primary", key="generate", use_container_width=True)
+        compare_tones_clicked = st.button("🎭 Compare All Tones", key="compare_tones", use_container_width=True)
+        long_form = st.checkbox("📚 Long-form episode", help="Generate a much longer episode in segments", key="long_form")
+        long_exchanges = st.slider("Exchanges", min_value=20, max_value=200, value=100, step=10, disabled=not long_form)
+    
+    api_key = st.session_state.api_key
+    
+    # Display validation messages or process the interview generation
+    compare_pending = []
+    retry = st.session_state.pop("tone_retry", None)
+    if retry is not None and st.session_state.tone_results is not None:
+        if not api_key:
+            st.error("Please enter your Google API Key in the sidebar.")
+        else:
+            compare_pending = [retry]
+    elif generate_interview_clicked or compare_tones_clicked:
+        if not character1 or not character2:
+            st.error("Please provide both character names.")
+        elif not api_key:
+            st.error("Please enter your Google API Key in the sidebar.")
+        elif generate_interview_clicked:
+            # The tone selector writes the chosen tone straight to session state
+            run_generation(character1, character2, topic, st.session_state.tone, api_key, long_form, long_exchanges, length)
+        else:
+            close_comparison()
+            st.session_state.tone_results = {}
+            st.session_state.tone_chars = {"char1": character1, "char2": character2, "topic": topic, "length": length}
+            compare_pending = list(TONES)
+    else:
+        # Generation time is not rerun overhead, so only plain reruns are timed
+        METRICS.record("rerun_seconds", time.perf_counter() - run_started, scope="generation_form")
+    
+    # Display the interview if it exists in session state
+    result_viewer()
+    
+    # Display the tone comparison if one exists in session state
+    if st.session_state.tone_results is not None:
+        tone_comparison(api_key, compare_pending)
+    
+    save_session()
+
+# Interview history with full-text search. Only one page of results is
+# fetched per run; opening an interview reruns the app to show it above.
+@st.fragment
+def history_panel():
+    opened = False
+    with METRICS.timer("rerun_seconds", scope="history_panel"):
+        archive = get_interview_archive()
+        with st.expander(f"📚 Interview History ({archive.count()} archived)"):
+            search_col, tone_col = st.columns([3, 1])
+            with search_col:
+                query = st.text_input("Search characters, topics and dialogue", placeholder="e.g., Socrates innovation",
+                                      key="history_query", on_change=reset_history_pages)
+            with tone_col:
+                tone_filter = st.selectbox("Tone", ["All"] + TONES, key="history_tone", on_change=reset_history_pages)
+            
+            pages = st.session_state.history_pages
+            tone_value = None if tone_filter == "All" else tone_filter
+            with METRICS.timer("history_search_seconds"):
+                rows, has_more = archive.search(query, tone=tone_value, before=pages[-1])
+            
+            if not rows:
+                st.info("No archived interviews match." if query or tone_filter != "All" else "Generated interviews will appear here.")
+            for row in rows:
+                snippet = html.escape(row["snippet"]).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+                created = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M")
+                row_col, open_col = st.columns([5, 1])
+                with row_col:
+                    st.markdown(f"""
+                    <div style="padding: 5px 0;">
+                        <strong>{html.escape(row["character1"])} &amp; {html.escape(row["character2"])}</strong>
+                        <span style="color: #6B7280; font-size: 0.85rem;">
+                            &middot; {html.escape(row["topic"] or "General conversation")} &middot; {row["tone"]} &middot; {created}
+                        </span>
+                        <p style="color: #4B5563; font-size: 0.85rem; margin: 2px 0 0 0;">{snippet}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                with open_col:
+                    if st.button("Open", key=f"history_open_{row['id']}", on_click=open_archived, args=(row["id"],)):
+                        opened = True
+            
+            if rows:
+                bulk_col, bulk_format_col = st.columns([3, 1])
+                with bulk_format_col:
+                    bulk_format = st.selectbox("Bulk format", list(FORMATS), index=list(FORMATS).index("md"),
+                                               format_func=lambda f: FORMATS[f][0], key="bulk_export_format",
+                                               label_visibility="collapsed")
+                with bulk_col:
+                    st.download_button(
+                        label=f"📦 Download matching interviews (.zip, up to {BULK_LIMIT})",
+                        data=bulk_export(query, tone_value, bulk_format),
+                        file_name=f"interviews_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                        mime="application/zip",
+                        on_click="ignore",
+                        use_container_width=True
+                    )
+            
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if len(pages) > 1:
+                    st.button("← Newer", key="history_newer", on_click=newer_history_page, use_container_width=True)
+            with page_col:
+                st.markdown(f"<p style='text-align: center; color: #6B7280;'>Page {len(pages)}</p>", unsafe_allow_html=True)
+            with next_col:
+                if has_more:
+                    st.button("Older →", key="history_older", on_click=older_history_page, args=(rows[-1]["id"],),
+                              use_container_width=True)
+    
+    if opened:
+        st.rerun()
+
+# Main page sections
+pair_picker()
+
+# Divider with styling
+st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+generation_form()
+
+history_panel()
 
 # Footer with enhanced styling
 st.markdown("<div style='margin-top: 50px;'>", unsafe_allow_html=True)
@@ -621,3 +1228,26 @@ st.markdown("""
     <p style="color: #9CA3AF; font-size: 0.8rem; margin-top: 5px;">© 2025 AI Fictional Interview Generator</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Interview cache counters in the sidebar
+cache_stats = get_interview_cache().stats()
+flight_stats = get_single_flight().stats()
+queue_stats = get_scheduler().stats()
+prefetch_stats = get_prefetcher().stats()
+route_stats = get_router().stats()
+cache_stats_box.markdown(f"""
+<div style="background-color: #EFF6FF; padding: 15px; border-radius: 10px; margin-top: 20px;">
+    <h4 style="color: #1E40AF; margin-top: 0;">Interview Cache</h4>
+    <p style="font-size: 0.9rem; color: #4B5563; margin-bottom: 0;">
+        Hits: <strong>{cache_stats["hits"]}</strong> &middot; Misses: <strong>{cache_stats["misses"]}</strong><br>
+        Stored scripts: {cache_stats["disk"]}<br>
+        Upstream calls saved by coalescing: <strong>{flight_stats["saved"]}</strong><br>
+        Requests waiting for a Gemini slot: {queue_stats["queued"]}<br>
+        Prefetch hit rate: <strong>{prefetch_stats["hit_rate"]:.0%}</strong> &middot; Wasted calls: {prefetch_stats["wasted"]}<br>
+        Hedged requests: {route_stats["hedged"]} (won {route_stats["hedge_wins"]}) &middot; Fallbacks: {route_stats["fallbacks"]}<br>
+        Gemini circuit: {get_call_policy().breaker.state}
+    </p>
+</div>
+""", unsafe_allow_html=True)
+
+METRICS.record("rerun_seconds", time.perf_counter() - app_run_started, scope="app")
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+
+from dialogue import parse_dialogue
+from state import connect
+
+# Markers around matched terms in search snippets; callers escape the snippet and then swap these for markup
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+# Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+# Quoting each word keeps punctuation and FTS operators in user input from being parsed.
+def fts_query(text):
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if not words:
+        return None
+    words[-1] += "*"
+    return " ".join(words)
+
+
+# Persistent archive of every generated interview, with a full-text index
+# over the characters, topic and dialogue. Listing and search page by id
+# (newest first) instead of OFFSET, so every page is an index range scan
+# however many interviews are stored.
+class InterviewArchive:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS archive (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                character1 TEXT NOT NULL,
+                character2 TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                tone TEXT NOT NULL,
+                model TEXT NOT NULL,
+                seconds REAL,
+                first_line_seconds REAL,
+                text TEXT NOT NULL,
+                turns TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS archive_tone ON archive (tone, id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS archive_fts USING fts5 (
+                character1, character2, topic, text,
+                content='archive', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+        """)
+        self._db.commit()
+
+    # Store one interview with its parsed turns; returns its archive id
+    def add(self, character1, character2, topic, tone, model, text, seconds=None, first_line_seconds=None):
+        turns = [turn._asdict() for turn in parse_dialogue(text, character1, character2)]
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO archive (created_at, character1, character2, topic, tone, model, seconds, first_line_seconds, text, turns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), character1, character2, topic or "", tone, model, seconds, first_line_seconds,
+                 text, json.dumps(turns, ensure_ascii=False)),
+            )
+            archive_id = cursor.lastrowid
+            self._db.execute(
+                "INSERT INTO archive_fts (rowid, character1, character2, topic, text) VALUES (?, ?, ?, ?, ?)",
+                (archive_id, character1, character2, topic or "", text),
+            )
+            self._db.commit()
+            return archive_id
+
+    # One page of interviews, newest first, without their full text.
+    # `query` is free text matched against characters, topic and dialogue;
+    # pass the last id of the previous page as `before` for the next one.
+    # Returns (rows, has_more).
+    def search(self, query="", tone=None, before=None, limit=10):
+        match = fts_query(query or "")
+        if match:
+            columns = f"snippet(archive_fts, 3, '{MATCH_START}', '{MATCH_END}', '…', 16)"
+        else:
+            columns = "substr(a.text, 1, 160)"
+        sql, params = self._select(
+            "a.id, a.created_at, a.character1, a.character2, a.topic, a.tone, a.seconds, " + columns,
+            match, tone, before, limit + 1,
+        )
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        names = ("id", "created_at", "character1", "character2", "topic", "tone", "seconds", "snippet")
+        return [dict(zip(names, row)) for row in rows[:limit]], len(rows) > limit
+
+    # Ids of up to `limit` matching interviews, newest first, for bulk export
+    def matching_ids(self, query="", tone=None, limit=500):
+        sql, params = self._select("a.id", fts_query(query or ""), tone, None, limit)
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql, params)]
+
+    # The full record for one interview, including its text and parsed turns, or None
+    def get(self, archive_id):
+        with self._lock:
+            cursor = self._db.execute("SELECT * FROM archive WHERE id = ?", (archive_id,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        record = dict(zip(columns, row))
+        record["turns"] = json.loads(record["turns"])
+        return record
+
+    # Rows are never deleted, so the largest id is the count, read from the end of the index instead of a full scan
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(MAX(id), 0) FROM archive").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Filtered, newest-first query over the archive, driven by the full-text index when there is a match expression
+    def _select(self, columns, match, tone, before, limit):
+        params = []
+        if match:
+            sql = f"SELECT {columns} FROM archive_fts JOIN archive a ON a.id = archive_fts.rowid WHERE archive_fts MATCH ?"
+            params.append(match)
+            id_column = "archive_fts.rowid"
+        else:
+            sql = f"SELECT {columns} FROM archive a WHERE 1"
+            id_column = "a.id"
+        if tone:
+            sql += " AND a.tone = ?"
+            params.append(tone)
+        if before is not None:
+            sql += f" AND {id_column} < ?"
+            params.append(before)
+        sql += f" ORDER BY {id_column} DESC LIMIT ?"
+        params.append(limit)
+        return sql, params
+
+
+# Build an archive from INTERVIEW_ARCHIVE_PATH
+def archive_from_env():
+    return InterviewArchive(os.environ.get("INTERVIEW_ARCHIVE_PATH", "interview_archive.sqlite3"))
@@ -0,0 +1,199 @@
+# Static page assets: CSS and card markup built once per process at import
+# time, instead of being re-formatted on every Streamlit script run.
+from interview import TONES
+
+CUSTOM_CSS = """
+<style>
+    .main {
+        background-color: #f9f9f9;
+    }
+    h1 {
+        color: #1E3A8A;
+        font-size: 42px !important;
+        text-align: center;
+        margin-bottom: 10px !important;
+    }
+    h2 {
+        color: #2563EB;
+    }
+    h3 {
+        color: #3B82F6;
+    }
+    .stButton>button {
+        background-color: #3B82F6;
+        color: white;
+        border-radius: 8px;
+        padding: 0.5rem 1rem;
+        font-weight: 500;
+        border: none;
+        transition: all 0.3s;
+    }
+    .stButton>button:hover {
+        background-color: #2563EB;
+        transform: translateY(-2px);
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    .example-card {
+        background-color: white;
+        border-radius: 10px;
+        padding: 15px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
+        margin-bottom: 15px;
+        transition: all 0.3s;
+        border: 1px solid #e5e7eb;
+    }
+    .example-card:hover {
+        box-shadow: 0 10px 15px rgba(0, 0, 0, 0.1);
+        transform: translateY(-5px);
+    }
+    .stTextInput>div>div>input {
+        border-radius: 8px;
+        border: 1px solid #d1d5db;
+        padding: 10px;
+    }
+    .generated-interview {
+        background-color: white;
+        border-radius: 10px;
+        padding: 20px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
+        margin-top: 20px;
+        border: 1px solid #e5e7eb;
+    }
+    .interview-header {
+        background-color: #EFF6FF;
+        padding: 10px 15px;
+        border-radius: 8px;
+        margin-bottom: 15px;
+        color: #1E40AF;
+        font-weight: 600;
+    }
+    .stTabs [data-baseweb="tab-list"] {
+        gap: 10px;
+    }
+    .stTabs [data-baseweb="tab"] {
+        background-color: #EFF6FF;
+        border-radius: 8px;
+        padding: 10px 20px;
+        color: #3B82F6;
+    }
+    .stTabs [aria-selected="true"] {
+        background-color: #3B82F6;
+        color: white;
+    }
+    .sidebar .css-6qob1r {
+        background-color: #F3F4F6;
+    }
+    .css-1d391kg {
+        background-color: #F3F4F6;
+    }
+    .stTextArea > div > div > textarea {
+        background-color: #f8fafc;
+        border-radius: 8px;
+        border: 1px solid #e2e8f0;
+    }
+    .css-1cypcdb {
+        background-color: #2563EB;
+        color: white;
+    }
+    .divider {
+        border-top: 1px solid #e5e7eb;
+        margin: 20px 0;
+    }
+    .primary-button {
+        background-color: #2563EB;
+        color: white;
+        padding: 10px 20px;
+        border-radius: 8px;
+        border: none;
+        font-weight: 500;
+        width: 100%;
+    }
+    .download-button {
+        background-color: #10B981;
+        color: white;
+        padding: 10px 20px;
+        border-radius: 8px;
+        border: none;
+        font-weight: 500;
+        width: 100%;
+    }
+    .tone-option {
+        background-color: white;
+        padding: 10px;
+        border-radius: 8px;
+        text-align: center;
+        margin-bottom: 10px;
+        cursor: pointer;
+        border: 1px solid #e5e7eb;
+        transition: all 0.2s;
+    }
+    .tone-option:hover {
+        border-color: #3B82F6;
+        transform: translateY(-2px);
+    }
+    .tone-option.selected {
+        border-color: #3B82F6;
+        background-color: #EFF6FF;
+    }
+    .tone-icon {
+        font-size: 24px;
+        margin-bottom: 5px;
+    }
+</style>
+"""
+
+# Example character pairs, shown three per row
+EXAMPLE_ROWS = [
+    [
+        ("Socrates", "Steve Jobs", "Innovation and Ethics"),
+        ("Nikola Tesla", "Tony Stark", "Future of Technology"),
+        ("Marie Curie", "Wonder Woman", "Female Empowerment")
+    ],
+    [
+        ("Krishna", "Arjuna", "Duty and Dharma"),
+        ("Rama", "Ravana", "Ethics of Leadership"),
+        ("Leonardo da Vinci", "Elon Musk", "Future of Art and Technology")
+    ],
+    # Examples from Indian history and mythology
+    [
+        ("Emperor Akbar", "Birbal", "Wit and Wisdom"),
+        ("Shiva", "Parvati", "Divine Partnership"),
+        ("Chanakya", "Chandragupta Maurya", "Statecraft and Politics")
+    ]
+]
+
+# Visual tone selector options, in the same order as TONES
+TONE_ICONS = ["😂", "😲", "🧠", "✨"]
+TONE_DESCRIPTIONS = [
+    "Humorous dialogue", 
+    "Emotional exchanges", 
+    "Deep conversations", 
+    "Imaginative ideas"
+]
+
+# Example card markup for each pair
+EXAMPLE_CARDS = {
+    pair: f"""
+    <div class="example-card">
+        <h4 style="color: #2563EB; margin-bottom: 5px;">{pair[0]} & {pair[1]}</h4>
+        <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 10px;">Topic: {pair[2]}</p>
+    </div>
+    """
+    for row in EXAMPLE_ROWS
+    for pair in row
+}
+
+# Tone card markup, keyed by (tone, is_selected)
+TONE_CARDS = {
+    (t_option, is_selected): f"""
+    <div class="tone-option {"selected" if is_selected else ""}">
+        <div class="tone-icon">{t_icon}</div>
+        <div><strong>{t_option}</strong></div>
+        <div style="font-size: 0.8rem; color: #6B7280;">{t_desc}</div>
+    </div>
+    """
+    for t_option, t_icon, t_desc in zip(TONES, TONE_ICONS, TONE_DESCRIPTIONS)
+    for is_selected in (False, True)
+}
+
+TONE_TAB_LABELS = [f"{t_icon} {t_option}" for t_icon, t_option in zip(TONE_ICONS, TONES)]
@@ -0,0 +1,176 @@
+# Non-blocking Gemini client for the HTTP API, on plain asyncio streams.
+#
+# The SDK's REST transport is synchronous and its async client only speaks
+# gRPC, so this talks to the REST endpoint directly: one connection per
+# request, `streamGenerateContent?alt=sse`, and the server-sent events parsed
+# as they arrive. Thousands of these can wait on the network in one thread.
+import asyncio
+import json
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from interview import hit_token_limit
+from metrics import METRICS
+
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com"
+
+
+# Non-200 answer from an HTTP upstream; `code` is what policy.classify() looks at
+class UpstreamHTTPError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+# Response to one request; the body is read from `reader` as it arrives
+class HTTPResponse:
+    def __init__(self, status, headers, reader, writer):
+        self.status = status
+        self.headers = headers
+        self.reader = reader
+        self.writer = writer
+
+    # Body bytes as they arrive, undoing chunked transfer encoding; closes the connection at the end
+    async def chunks(self, deadline=None):
+        try:
+            if self.headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size = int((await _within(self.reader.readline(), deadline)).split(b";")[0], 16)
+                    if size == 0:
+                        break
+                    data = await _within(self.reader.readexactly(size + 2), deadline)
+                    yield data[:-2]
+            elif "content-length" in self.headers:
+                yield await _within(self.reader.readexactly(int(self.headers["content-length"])), deadline)
+            else:
+                while True:
+                    data = await _within(self.reader.read(65536), deadline)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            self.close()
+
+    async def read(self, deadline=None):
+        return b"".join([chunk async for chunk in self.chunks(deadline)])
+
+    def close(self):
+        self.writer.close()
+
+
+# Send one HTTP/1.1 request and return its HTTPResponse once the headers are
+# in. `deadline` is a time.monotonic() value bounding every network wait.
+async def open_request(url, method="GET", body=b"", headers=None, deadline=None):
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    try:
+        reader, writer = await _within(
+            asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None),
+            deadline,
+        )
+    except OSError as e:
+        # Refused or unreachable: the same retryable outage as a 503
+        raise ConnectionError(str(e)) from e
+
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", f"Content-Length: {len(body)}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await _within(writer.drain(), deadline)
+
+        status_line = await _within(reader.readline(), deadline)
+        if not status_line:
+            raise ConnectionError("connection closed before the response")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await _within(reader.readline(), deadline)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+    except BaseException:
+        writer.close()
+        raise
+    return HTTPResponse(status, response_headers, reader, writer)
+
+
+# The `data:` payload of each server-sent event in a byte stream
+async def iter_sse(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk.replace(b"\r\n", b"\n")
+        while b"\n\n" in buffer:
+            event, buffer = buffer.split(b"\n\n", 1)
+            data = [line[5:].lstrip() for line in event.split(b"\n") if line.startswith(b"data:")]
+            if data:
+                yield b"\n".join(data).decode("utf-8")
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+async def _within(awaitable, deadline):
+    return await asyncio.wait_for(awaitable, _remaining(deadline))
+
+
+# Streams generateContent responses for one model over REST
+class AsyncGeminiClient:
+    def __init__(self, endpoint=None):
+        self.endpoint = (endpoint or DEFAULT_ENDPOINT).rstrip("/")
+
+    # Text pieces of the response as they stream in. If `usage` is a dict it
+    # is filled with the prompt and response token counts from the last event.
+    # Like interview.iter_text, a reply cut off at `max_output_tokens` ends at its last complete line.
+    async def stream_text(self, api_key, model_name, prompt, timeout=None, usage=None, system_instruction=None,
+                          max_output_tokens=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        url = f"{self.endpoint}/v1beta/models/{model_name}:streamGenerateContent?alt=sse"
+        request = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if system_instruction:
+            request["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        if max_output_tokens:
+            request["generationConfig"] = {"maxOutputTokens": max_output_tokens}
+        body = json.dumps(request).encode("utf-8")
+        headers = {"Content-Type": "application/json", "x-goog-api-key": api_key, "Accept": "text/event-stream"}
+
+        response = await open_request(url, "POST", body, headers, deadline)
+        if response.status != 200:
+            text = (await response.read(deadline)).decode("utf-8", "replace")
+            try:
+                message = json.loads(text)["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                message = text[:200]
+            raise UpstreamHTTPError(response.status, message)
+
+        tail = ""
+        finish_reason = None
+        async for data in iter_sse(response.chunks(deadline)):
+            event = json.loads(data)
+            for candidate in event.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        text = tail + part["text"]
+                        cut = text.rfind("\n") + 1
+                        tail = text[cut:]
+                        if cut:
+                            yield text[:cut]
+                finish_reason = candidate.get("finishReason") or finish_reason
+            metadata = event.get("usageMetadata")
+            if metadata and usage is not None:
+                usage["prompt_tokens"] = metadata.get("promptTokenCount", 0)
+                usage["response_tokens"] = metadata.get("candidatesTokenCount", 0)
+        if tail:
+            if hit_token_limit(finish_reason):
+                METRICS.increment("truncated_replies", reason="max_tokens")
+            else:
+                yield tail
@@ -0,0 +1,173 @@
+# Headless batch generation: python batch.py jobs.csv results.jsonl --concurrency 8
+#
+# The job file is CSV or JSONL with character1, character2, and optional id,
+# topic, tone, length (Short, Standard or Long) and api_key columns. Results are appended to the output JSONL as
+# each job finishes, and rerunning the same command skips IDs already done.
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from budget import estimator_from_env, reserve_tokens
+from clients import registry_from_env
+from interview import (DEFAULT_LENGTH, LENGTHS, MODEL_NAME, PROMPT_VERSION, SYSTEM_INSTRUCTION, build_prompt, generation_config,
+                       reply_text)
+from interview_cache import cache_from_env, make_key
+from metrics import usage_counts
+from policy import policy_from_env
+from scheduler import BATCH, scheduler_from_env
+from validation import call_validated, turn_limits
+
+
+def read_jobs(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for row in rows:
+        job = {
+            "character1": (row.get("character1") or "").strip(),
+            "character2": (row.get("character2") or "").strip(),
+            "topic": (row.get("topic") or "").strip(),
+            "tone": (row.get("tone") or "Funny").strip(),
+            "length": (row.get("length") or DEFAULT_LENGTH).strip().capitalize(),
+            "api_key": (row.get("api_key") or "").strip(),
+        }
+        job["id"] = str(row.get("id") or make_key(
+            job["character1"], job["character2"], job["topic"], job["tone"], MODEL_NAME, PROMPT_VERSION, job["length"]
+        ))
+        yield job
+
+
+# IDs that already have a successful result in the output file
+def completed_ids(path):
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a half-written last line behind
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def run_batch(jobs_path, output_path, concurrency=4, per_minute=60, default_api_key="", use_cache=True):
+    registry = registry_from_env()
+    policy = policy_from_env()
+    # Batch jobs queue behind any interactive work and wait as long as it takes
+    scheduler = scheduler_from_env(key_rpm=per_minute, max_wait=float("inf"))
+    cache = cache_from_env() if use_cache else None
+    estimator = estimator_from_env(cache.state if cache else None)
+    write_lock = threading.Lock()
+    # Bounds how many jobs are queued ahead of the workers, so huge job files stay cheap
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def run_job(job, out):
+        try:
+            api_key = job["api_key"] or default_api_key
+            cache_key = make_key(job["character1"], job["character2"], job["topic"], job["tone"], MODEL_NAME, PROMPT_VERSION,
+                                 job["length"])
+            started = time.monotonic()
+            record = {k: job[k] for k in ("id", "character1", "character2", "topic", "tone", "length")}
+            record["model"] = MODEL_NAME
+            try:
+                text = cache.get(cache_key) if cache else None
+                if text is None:
+                    model = registry.get(api_key, MODEL_NAME, SYSTEM_INSTRUCTION)
+                    prompt = build_prompt(job["character1"], job["character2"], job["topic"], job["tone"], length=job["length"])
+                    estimate = estimator.estimate(job["character1"], job["character2"], job["tone"], job["length"])
+
+                    # Every attempt, retries included, waits for its turn under the rate limits
+                    def attempt(options):
+                        ticket = scheduler.acquire(api_key, "batch", BATCH, tokens=reserve_tokens(estimate, prompt))
+                        used = 0
+                        try:
+                            called = time.monotonic()
+                            response = model.generate_content(prompt, generation_config=generation_config(job["length"]),
+                                                              request_options=options)
+                            usage = usage_counts(response)
+                            used = sum(usage.values())
+                            text = reply_text(response)
+                        finally:
+                            scheduler.settle(ticket, used)
+                        estimator.record(job["character1"], job["character2"], job["tone"], job["length"],
+                                         usage.get("response_tokens", 0), time.monotonic() - called)
+                        return text
+
+                    text = call_validated(lambda: policy.call(attempt), job["character1"], job["character2"],
+                                          **turn_limits(job["length"]))
+                    if cache:
+                        cache.put(cache_key, text)
+                record.update(status="ok", interview=text)
+            except Exception as e:
+                # Anything else (a cache or client failure, a bug) is reported too, instead of
+                # vanishing into a future that is never read and leaving the job unaccounted for
+                record.update(status="error", error_type=type(e).__name__, error=str(e) or type(e).__name__)
+            record["seconds"] = round(time.monotonic() - started, 3)
+
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[record["status"]] += 1
+        finally:
+            slots.release()
+
+    done = completed_ids(output_path)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for job in read_jobs(jobs_path):
+            if job["id"] in done:
+                counts["skipped"] += 1
+                continue
+            if not job["character1"] or not job["character2"]:
+                print(f"Skipping job {job['id']}: both character names are required", file=sys.stderr)
+                continue
+            if job["length"] not in LENGTHS:
+                print(f"Skipping job {job['id']}: length must be one of {', '.join(LENGTHS)}", file=sys.stderr)
+                continue
+            if not (job["api_key"] or default_api_key):
+                print(f"Skipping job {job['id']}: no API key", file=sys.stderr)
+                continue
+            done.add(job["id"])
+            slots.acquire()
+            pool.submit(run_job, job, out)
+
+    registry.close()
+    if cache:
+        cache.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many interviews from a CSV or JSONL job file.")
+    parser.add_argument("jobs", help="job file (.csv or .jsonl)")
+    parser.add_argument("output", help="results file (.jsonl), appended to and used to resume")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of requests in flight at once")
+    parser.add_argument("--per-minute", type=int, default=60, help="request limit per API key per minute (0 for none)")
+    parser.add_argument("--no-cache", action="store_true", help="always call the model, bypassing the interview cache")
+    args = parser.parse_args(argv)
+
+    counts = run_batch(
+        args.jobs,
+        args.output,
+        concurrency=max(1, args.concurrency),
+        per_minute=args.per_minute,
+        default_api_key=os.environ.get("GEMINI_API_KEY", ""),
+        use_cache=not args.no_cache,
+    )
+    print(f"Done: {counts['ok']} generated, {counts['error']} failed, {counts['skipped']} already complete")
+
+
+if __name__ == "__main__":
+    main()
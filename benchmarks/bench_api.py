@@ -0,0 +1,80 @@
+# Fires many concurrent requests at api.py backed by the local fake Gemini
+# server, to check that in-flight generations overlap instead of queueing.
+# Run from the repository root: python benchmarks/bench_api.py [--requests 500]
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import InterviewService, make_handler
+from async_gemini import AsyncGeminiClient, iter_sse, open_request
+from fake_gemini import FakeConfig, start_fake_server
+from interview_cache import InterviewCache
+from policy import CallPolicy
+
+PAIRS = [("Socrates", "Steve Jobs"), ("Krishna", "Arjuna"), ("Emperor Akbar", "Birbal"), ("Nikola Tesla", "Tony Stark")]
+
+
+async def one_request(url, n, stream):
+    c1, c2 = PAIRS[n % len(PAIRS)]
+    body = json.dumps({"character1": c1, "character2": c2, "topic": f"Topic {n}", "api_key": "fake"}).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream" if stream else "application/json"}
+    started = time.perf_counter()
+    response = await open_request(url, "POST", body, headers)
+    first = None
+    if stream:
+        events = 0
+        async for data in iter_sse(response.chunks()):
+            if first is None:
+                first = time.perf_counter() - started
+            events += 1
+        ok = response.status == 200 and events > 1 and '"error"' not in data
+    else:
+        payload = json.loads(await response.read())
+        first = time.perf_counter() - started
+        ok = response.status == 200 and bool(payload.get("turns"))
+    return ok, first, time.perf_counter() - started
+
+
+async def run(args):
+    fake = start_fake_server(FakeConfig(latency_median=args.latency_median, latency_sigma=0.2, first_token=0.2,
+                                        chunk_delay=0.0, seed=1))
+    # A fresh cache file so every request goes upstream
+    cache = InterviewCache(os.path.join(tempfile.mkdtemp(prefix="api-bench-"), "cache.sqlite3"), disk_entries=100_000)
+    service = InterviewService(AsyncGeminiClient(f"http://127.0.0.1:{fake.server_address[1]}"), CallPolicy(timeout=60),
+                               cache=cache, max_inflight=args.requests)
+    server = await asyncio.start_server(make_handler(service), "127.0.0.1", 0, backlog=4096)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1/interviews"
+
+    for stream in (False, True):
+        started = time.perf_counter()
+        results = await asyncio.gather(*[one_request(url, i + (args.requests if stream else 0), stream)
+                                         for i in range(args.requests)])
+        elapsed = time.perf_counter() - started
+        ok = [r for r in results if r[0]]
+        totals = sorted(r[2] for r in ok)
+        firsts = sorted(r[1] for r in ok)
+        print(f"{'SSE ' if stream else 'JSON'}: {len(ok)}/{args.requests} ok in {elapsed:.2f}s "
+              f"({len(ok) / elapsed:.1f} req/s), first byte p50 {statistics.median(firsts):.3f}s, "
+              f"total p50 {statistics.median(totals):.3f}s max {totals[-1]:.3f}s")
+
+    server.close()
+    await server.wait_closed()
+    fake.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency benchmark for api.py against the fake Gemini server.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency-median", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
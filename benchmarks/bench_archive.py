@@ -0,0 +1,74 @@
+# Fills a scratch archive with synthetic interviews and times history pages and searches,
+# to check they stay flat as the archive grows.
+# Run from the repository root: python benchmarks/bench_archive.py [total]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import InterviewArchive
+from fake_gemini import canned_dialogue
+from interview import TONES
+
+PAIRS = [
+    ("Socrates", "Steve Jobs"), ("Krishna", "Arjuna"), ("Emperor Akbar", "Birbal"),
+    ("Nikola Tesla", "Tony Stark"), ("Cleopatra", "Julius Caesar"), ("Rama", "Ravana"),
+]
+TOPICS = ["Innovation", "Duty", "Wisdom", "Energy", "Power & Leadership", "", "Dharma", "Art and Technology"]
+QUERIES = ["", "socrates", "wondered", "patience craft", "tesla energy", "nonexistentword"]
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def fill(archive, count, rng):
+    # Bypass add() so building the archive does not dominate the run; the rows are identical
+    db = archive._db
+    for _ in range(count):
+        c1, c2 = rng.choice(PAIRS)
+        topic = rng.choice(TOPICS)
+        text = canned_dialogue(f"between {c1} and {c2}.", rng.randint(6, 10))
+        rowid = db.execute(
+            "INSERT INTO archive (created_at, character1, character2, topic, tone, model, text, turns) "
+            "VALUES (?, ?, ?, ?, ?, 'bench', ?, '[]')",
+            (time.time(), c1, c2, topic, rng.choice(TONES), text),
+        ).lastrowid
+        db.execute("INSERT INTO archive_fts (rowid, character1, character2, topic, text) VALUES (?, ?, ?, ?, ?)",
+                   (rowid, c1, c2, topic, text))
+    db.commit()
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(prefix="archive-bench-"), "archive.sqlite3")
+    archive = InterviewArchive(path)
+    print(f"{'rows':>8} " + " ".join(f"{(q or '<all>')[:14]:>15}" for q in QUERIES) + f" {'50 pages ms':>12}")
+    size = 0
+    for step in sorted({n for n in (10_000, 50_000, 100_000) if n < total} | {total}):
+        fill(archive, step - size, rng)
+        size = step
+        timings = [best_of(lambda: archive.search(q)) * 1000 for q in QUERIES]
+
+        # Walk 50 pages deep with the keyset cursor, as the Older button does
+        def deep_page():
+            before = None
+            for _ in range(50):
+                rows, _ = archive.search("socrates", before=before)
+                before = rows[-1]["id"]
+        deep = best_of(deep_page, repeat=1) * 1000
+        print(f"{size:>8} " + " ".join(f"{t:>15.2f}" for t in timings) + f" {deep:>12.2f}")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
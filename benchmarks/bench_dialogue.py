@@ -0,0 +1,45 @@
+# Times parse + render of long transcripts to check the formatter stays linear.
+# Run from the repository root: python benchmarks/bench_dialogue.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue import parse_dialogue, render_dialogue, render_turns
+
+LINES = [
+    "**Socrates**: Tell me, what is it that you believe makes a product <great>?",
+    "Steve Jobs: Simplicity. Taking away everything that isn't essential.",
+    "*[Socrates strokes his beard thoughtfully]*",
+    "",
+    "SOCRATES (smiling): And who decides what is essential?",
+    "Jobs: The people who care enough to say no to a thousand things.",
+]
+
+
+def transcript(n_lines):
+    return "\n".join(LINES[i % len(LINES)] for i in range(n_lines))
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print(f"{'lines':>8} {'parse+render ms':>16} {'us/line':>9} {'cached us':>10}")
+    for n_lines in (1_000, 2_500, 5_000, 10_000, 20_000):
+        text = transcript(n_lines)
+        cold = best_of(lambda: render_turns(parse_dialogue.__wrapped__(text, "Socrates", "Steve Jobs")))
+        render_dialogue(text, "Socrates", "Steve Jobs")
+        warm = best_of(lambda: render_dialogue(text, "Socrates", "Steve Jobs"))
+        print(f"{n_lines:>8} {cold * 1000:>16.2f} {cold / n_lines * 1e6:>9.2f} {warm * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
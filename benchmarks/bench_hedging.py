@@ -0,0 +1,61 @@
+# Sends simulated requests with a heavy-tailed first-response latency through
+# the router, with and without hedging, and compares p50/p99 and extra calls.
+# Run from the repository root: python benchmarks/bench_hedging.py [requests]
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import summarize
+from routing import Router
+
+MODELS = ["draft-model", "fallback-model"]
+
+
+# Mostly quick responses with an occasional very slow one, like the upstream's worst p99
+def sample_latency(rng, lock):
+    with lock:
+        if rng.random() < 0.03:
+            return rng.uniform(1.0, 2.0)
+        return rng.lognormvariate(-3.0, 0.3)
+
+
+def run(router, requests, rng):
+    lock = threading.Lock()
+    calls = []
+
+    def start(attempt):
+        calls.append(attempt.model)
+        delay = sample_latency(rng, lock)
+        # Sleep in small steps so a cancelled attempt stops early, like a closed stream
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline and not attempt.cancelled.is_set():
+            time.sleep(0.005)
+        yield "line"
+
+    def one(_):
+        started = time.perf_counter()
+        for _ in router.stream(start):
+            pass
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    return summarize(latencies), len(calls) / requests
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f"{'mode':<28} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'calls/request':>14}")
+    for label, ratio in (("single model, no hedging", 0.0), ("hedged, 5% budget", 0.05), ("hedged, 10% budget", 0.1)):
+        router = Router(MODELS, percentile=95, min_samples=20, default_delay=0.5, min_delay=0.01, budget_ratio=ratio)
+        stats, calls = run(router, requests, random.Random(7))
+        print(f"{label:<28} {stats['p50'] * 1000:>8.1f} {stats['p99'] * 1000:>8.1f} {stats['mean'] * 1000:>8.1f} {calls:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Compares the tokens sent per interview by the old all-in-one prompt with the
+# system instruction plus compact prompt (with and without voice profiles).
+# Offline it estimates tokens at four characters each; with GEMINI_API_KEY set
+# it also counts them with the API and times the first streamed chunk, which
+# the fake server cannot show since its latency does not depend on the prompt.
+# Run from the repository root: python benchmarks/bench_prompts.py [runs]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gemini import estimate_tokens
+from interview import MODEL_NAME, SYSTEM_INSTRUCTION, build_prompt
+
+PAIRS = [("Socrates", "Steve Jobs", "Innovation"), ("Krishna", "Arjuna", "Duty"), ("Nikola Tesla", "Tony Stark", "")]
+PERSONAS = {
+    "Socrates": "Patient, probing questions; feigned ignorance; plain words, gentle irony.",
+    "Steve Jobs": "Terse, intense, visionary; 'insanely great'; dismissive of the mediocre.",
+    "Krishna": "Serene, playful, profound; speaks in parables and calm certainties.",
+    "Arjuna": "Earnest, troubled, questioning; a warrior's directness.",
+    "Nikola Tesla": "Formal, precise, dreamy; grand visions, faint bitterness toward rivals.",
+    "Tony Stark": "Fast, sarcastic, self-assured; pop-culture quips and tech jargon.",
+}
+
+
+# The prompt as it was before the static guidelines moved to the system instruction
+def legacy_prompt(character1, character2, topic, tone):
+    return f"""
+    Generate a creative dialogue interview between {character1} and {character2}.
+
+    Guidelines:
+    - The interview should be about {topic if topic else "any relevant topic that would be interesting for these characters"}.
+    - The tone should be {tone}.
+    - Include 8-10 exchanges between the characters.
+    - Each character should have distinct personality traits and speaking styles that reflect who they are.
+    - Format the output as a dialogue script with clear speaker indicators.
+    - Make it entertaining, insightful, and reflect the known characteristics/knowledge of these figures.
+
+    Output format example:
+    {character1}: [First line of dialogue]
+    {character2}: [Response]
+    {character1}: [Reply]
+    ...and so on.
+    """
+
+
+def variants(character1, character2, topic):
+    return [
+        ("old prompt", None, legacy_prompt(character1, character2, topic, "Humorous")),
+        ("system + prompt", SYSTEM_INSTRUCTION, build_prompt(character1, character2, topic, "Humorous")),
+        ("system + prompt + voices", SYSTEM_INSTRUCTION, build_prompt(character1, character2, topic, "Humorous", PERSONAS)),
+    ]
+
+
+def estimate():
+    print(f"{'variant':<26} {'est. tokens':>12}")
+    totals = {}
+    for character1, character2, topic in PAIRS:
+        for label, system, prompt in variants(character1, character2, topic):
+            totals[label] = totals.get(label, 0) + estimate_tokens((system or "") + prompt)
+    for label, total in totals.items():
+        print(f"{label:<26} {total / len(PAIRS):>12.0f}")
+
+
+# Counted tokens and time to first chunk against the real API
+def measure(api_key, runs):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    print(f"\n{'variant':<26} {'tokens':>8} {'first chunk ms':>15}")
+    character1, character2, topic = PAIRS[0]
+    for label, system, prompt in variants(character1, character2, topic):
+        model = genai.GenerativeModel(MODEL_NAME, system_instruction=system)
+        tokens = model.count_tokens(prompt).total_tokens
+        firsts = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = model.generate_content(prompt, stream=True)
+            for _ in response:
+                firsts.append(time.perf_counter() - started)
+                break
+            response.resolve()
+        firsts.sort()
+        print(f"{label:<26} {tokens:>8} {firsts[len(firsts) // 2] * 1000:>15.0f}")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    estimate()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key:
+        measure(api_key, runs)
+    else:
+        print("\nSet GEMINI_API_KEY to count tokens with the API and time the first chunk.")
+
+
+if __name__ == "__main__":
+    main()
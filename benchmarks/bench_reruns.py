@@ -0,0 +1,169 @@
+# Measures how long widget clicks take to rerun the page in a live session.
+#
+# Starts `streamlit run app.py` for a source tree, connects to it over the
+# websocket the browser uses, and clicks buttons by sending the same rerun
+# messages the browser would, fragment ID included. A click on a button inside
+# a fragment therefore reruns only that fragment, as it does for a real user;
+# AppTest cannot show this, since it always reruns the whole script. Each
+# click is timed from sending it until the server reports the run finished,
+# and the bytes of page updates it sent back are counted.
+#
+# Run from the repository root (no browser or API key needed):
+#   python benchmarks/bench_reruns.py                 # this tree
+#   git worktree add /tmp/before <commit>
+#   python benchmarks/bench_reruns.py /tmp/before     # an older tree, for "before" numbers
+#
+# For trees that record them, the app's own rerun_seconds per section are
+# printed too, read from its metrics endpoint.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.sync.client import connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLICKS = [
+    ("Select Pair", "btn1"),
+    ("Tone", "tone_Dramatic"),
+    ("Select Pair", "btn5"),
+    ("Tone", "tone_Creative"),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"streamlit did not start on port {port}")
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+
+
+# One browser tab: the buttons on the page, by key, with the fragment each one is in
+class Session:
+    def __init__(self, ws):
+        self.ws = ws
+        self.buttons = {}
+        self.page_script_hash = ""
+
+    # Send one rerun and read page updates until the run is over; returns (seconds, bytes received)
+    def rerun(self, widget_id=None, fragment_id=""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.fragment_id = fragment_id
+        if widget_id is not None:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            state.trigger_value = True
+        received = 0
+        started = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        while True:
+            data = self.ws.recv()
+            received += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.new_element.WhichOneof("type") == "button":
+                button = forward.delta.new_element.button
+                self.buttons[button.id.rsplit("-", 1)[-1]] = (button.id, forward.delta.fragment_id)
+            elif kind == "script_finished":
+                # A fragment that calls st.rerun() ends early and a full run follows
+                if forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return time.perf_counter() - started, received
+
+    def click(self, key):
+        widget_id, fragment_id = self.buttons[key]
+        return self.rerun(widget_id, fragment_id)
+
+
+# The app's own rerun_seconds samples by section, or {} if the tree does not serve them
+def app_rerun_seconds(metrics_port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics.jsonl", timeout=5) as response:
+            lines = response.read().decode("utf-8").splitlines()
+    except OSError:
+        return {}
+    sections = {}
+    for line in lines:
+        event = json.loads(line)
+        if event["name"] == "rerun_seconds":
+            sections.setdefault(event["labels"]["scope"], []).append(event["value"])
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time widget clicks against a live Streamlit server.")
+    parser.add_argument("tree", nargs="?", default=ROOT, help="source tree with the app.py to run (default: this one)")
+    parser.add_argument("--rounds", type=int, default=20, help="times to repeat the click sequence")
+    args = parser.parse_args()
+
+    port, metrics_port = free_port(), free_port()
+    workdir = tempfile.mkdtemp(prefix="bench-reruns-")
+    env = dict(os.environ, METRICS_PORT=str(metrics_port),
+               INTERVIEW_CACHE_PATH=os.path.join(workdir, "cache.sqlite3"),
+               INTERVIEW_ARCHIVE_PATH=os.path.join(workdir, "archive.sqlite3"),
+               PERSONA_STORE_PATH=os.path.join(workdir, "personas.sqlite3"),
+               LONGFORM_DIR=os.path.join(workdir, "episodes"))
+    server = subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+                               "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+                              cwd=args.tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None) as ws:
+            session = Session(ws)
+            first, first_bytes = session.rerun()
+            # Warm up: the first click of each kind imports and caches what later ones reuse
+            for _, key in CLICKS:
+                session.click(key)
+
+            results = {}
+            for _ in range(args.rounds):
+                for label, key in CLICKS:
+                    results.setdefault(label, []).append(session.click(key))
+        sections = app_rerun_seconds(metrics_port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(os.path.join(args.tree, "app.py"))
+    print(f"first run: {first * 1000:.1f} ms, {first_bytes / 1024:.1f} KB")
+    print(f"{'click':<14} {'median ms':>10} {'p95 ms':>8} {'KB sent':>8}")
+    for label, samples in results.items():
+        seconds = sorted(s for s, _ in samples)
+        sent = statistics.median(b for _, b in samples) / 1024
+        print(f"{label:<14} {statistics.median(seconds) * 1000:>10.1f} {percentile(seconds, 95) * 1000:>8.1f} {sent:>8.1f}")
+
+    if sections:
+        print(f"\n{'section':<16} {'runs':>5} {'median ms':>10}")
+        for scope, samples in sorted(sections.items()):
+            print(f"{scope:<16} {len(samples):>5} {statistics.median(samples) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Hammers a scratch SQLite state file from several processes at once, as
+# replicas would, and checks that no counter increment or claim is lost.
+# Run from the repository root: python benchmarks/bench_state.py [processes] [operations]
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state import SQLiteState
+
+
+# One replica: counts every operation, and claims and frees a shared key as often as it can
+def replica(path, operations):
+    state = SQLiteState(path)
+    claims = 0
+    for i in range(operations):
+        state.incr("operations")
+        if state.add("claim", os.getpid(), ttl=5.0):
+            claims += 1
+            state.incr("claims")
+            state.delete("claim", expected=os.getpid())
+        state.set(f"session:{os.getpid()}", {"step": i}, ttl=60.0)
+    state.close()
+    return claims
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    path = os.path.join(tempfile.mkdtemp(prefix="state-bench-"), "state.sqlite3")
+    SQLiteState(path).close()
+
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        claims = sum(pool.starmap(replica, [(path, operations)] * processes))
+    seconds = time.perf_counter() - started
+
+    counters = SQLiteState(path).counters()
+    expected = processes * operations
+    print(f"{processes} processes x {operations} operations in {seconds:.2f}s "
+          f"({expected * 3 / seconds:,.0f} writes/s, not counting claims)")
+    print(f"operations counted: {counters.get('operations', 0)} of {expected}")
+    print(f"claims counted:     {counters.get('claims', 0)} of {claims} won")
+    if counters.get("operations") != expected or counters.get("claims", 0) != claims:
+        sys.exit("lost updates")
+
+
+if __name__ == "__main__":
+    main()
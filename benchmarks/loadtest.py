@@ -0,0 +1,176 @@
+# End-to-end load test against the local fake Gemini server. Runs offline.
+#
+#   python benchmarks/loadtest.py --sessions 50 --concurrency 10
+#   python benchmarks/loadtest.py --latency-median 2 --error-rate 0.05 --json results.json
+#
+# Each simulated session drives app.py through Streamlit's AppTest harness:
+# select a pair, generate, render the result in a random export format, then
+# download it through the app's own lazy download callable and export cache.
+# AppTest keeps process-global state, so concurrent sessions run in worker
+# processes. Each worker is a stand-in for one app server process, and the
+# memory figures are the peak RSS of those workers.
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from exports import FORMATS
+from fake_gemini import FakeConfig, start_fake_server
+
+PAIR_BUTTONS = [f"btn{i}" for i in range(1, 10)]
+TONE_BUTTONS = ["tone_Funny", "tone_Dramatic", "tone_Philosophical", "tone_Creative"]
+
+# Deferred download callables the app registered in this worker, by file ID.
+# AppTest never serves downloads, so the harness calls them itself, as a click would.
+DOWNLOADS = {}
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+
+
+# Worker setup: a spill file of its own for the script store, which clears the
+# file when it opens it, and capture of the app's download callables
+def init_worker(workdir):
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    os.environ["INTERVIEW_STORE_SPILL_PATH"] = os.path.join(workdir, f"store-{os.getpid()}.sqlite3")
+    register = MediaFileManager.add_deferred
+
+    def add_deferred(self, data_callable, *args, **kwargs):
+        file_id = register(self, data_callable, *args, **kwargs)
+        DOWNLOADS[file_id] = data_callable
+        return file_id
+
+    MediaFileManager.add_deferred = add_deferred
+
+
+def run_session(app_path, rng):
+    # AppTest swaps the script in as __main__; put ours back so the worker can unpickle its next task
+    main_module = sys.modules["__main__"]
+    try:
+        return drive_session(app_path, rng)
+    finally:
+        sys.modules["__main__"] = main_module
+
+
+def drive_session(app_path, rng):
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+    DOWNLOADS.clear()
+    at = AppTest.from_file(app_path, default_timeout=120)
+    at.run()
+    at.text_input(key="api_key").input("fake-api-key").run()
+
+    started = time.perf_counter()
+    at.button(key=rng.choice(PAIR_BUTTONS)).click().run()
+    at.button(key=rng.choice(TONE_BUTTONS)).click().run()
+    timings["select_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    at.button(key="generate").click().run()
+    timings["generate_seconds"] = time.perf_counter() - started
+
+    interview_id = at.session_state["interview_id"] if "interview_id" in at.session_state else None
+    if at.exception or not interview_id:
+        return timings, False, peak_rss_mb()
+
+    # Rendering happens inside the generate run; picking the download format reruns the cached render path
+    started = time.perf_counter()
+    at.selectbox(key="export_format").set_value(rng.choice(list(FORMATS))).run()
+    timings["render_seconds"] = time.perf_counter() - started
+
+    # What a click on the download button runs: encode through the export cache
+    button = next(b for b in at.get("download_button") if b.proto.label == "📥 Download Script")
+    started = time.perf_counter()
+    data = DOWNLOADS[button.proto.deferred_file_id]()
+    timings["download_seconds"] = time.perf_counter() - started
+    if not data:
+        return timings, False, peak_rss_mb()
+    return timings, True, peak_rss_mb()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py against a fake Gemini server.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency-median", type=float, default=0.5)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--first-token", type=float, default=0.1)
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    server = start_fake_server(FakeConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        first_token=args.first_token,
+        chunk_chars=args.chunk_chars,
+        chunk_delay=0.0,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ))
+    workdir = tempfile.mkdtemp(prefix="interview-loadtest-")
+    os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["INTERVIEW_CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+    os.environ["LONGFORM_DIR"] = os.path.join(workdir, "episodes")
+    os.environ["INTERVIEW_ARCHIVE_PATH"] = os.path.join(workdir, "archive.sqlite3")
+    os.environ["PERSONA_STORE_PATH"] = os.path.join(workdir, "personas.sqlite3")
+    os.environ["STATE_PATH"] = os.path.join(workdir, "state.sqlite3")
+    # Every simulated session shares one fake key; measure the app, not the per-key quota
+    os.environ.setdefault("SCHEDULER_KEY_RPM", "0")
+    app_path = os.path.join(ROOT, "app.py")
+
+    rngs = [random.Random(args.seed + i) for i in range(args.sessions)]
+    started = time.perf_counter()
+    # Fresh interpreters rather than forks of this one, which runs the fake server's threads
+    with ProcessPoolExecutor(max_workers=args.concurrency, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(workdir,)) as pool:
+        results = list(pool.map(run_session, [app_path] * args.sessions, rngs))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    completed = [timings for timings, ok, _ in results if ok]
+    summary = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "completed": len(completed),
+        "failed": args.sessions - len(completed),
+        "elapsed_seconds": round(elapsed, 3),
+        "sessions_per_second": round(len(completed) / elapsed, 3) if elapsed else 0.0,
+        "worker_peak_rss_mb": round(max(rss for _, _, rss in results), 1),
+    }
+    for step in ("select_seconds", "generate_seconds", "render_seconds", "download_seconds"):
+        samples = sorted(t[step] for t in completed if step in t)
+        if samples:
+            summary[step] = {
+                "p50": round(statistics.median(samples), 4),
+                "p95": round(percentile(samples, 95), 4),
+                "p99": round(percentile(samples, 99), 4),
+            }
+
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Import-time breakdown for a cold app process, using python -X importtime.
+#
+# Run from the repository root: python benchmarks/startup_profile.py [--top 25]
+#
+# Profiles what app.py imports at startup, and separately the Gemini SDK,
+# which is now only imported when the first generation happens.
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "app startup": "import streamlit, admin, assets, clients, dialogue, interview, interview_cache, longform, metrics, policy, singleflight",
+    "first generation (Gemini SDK)": "import google.generativeai, google.ai.generativelanguage",
+}
+
+
+# Run `code` in a fresh interpreter and return [(cumulative_us, self_us, module)] plus any import error
+def profile(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    error = None
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            fields = line[len("import time:"):].split("|")
+            if fields[0].strip().isdigit():
+                # Keep the module column's indentation; it shows nesting depth
+                rows.append((int(fields[1]), int(fields[0]), fields[2][1:]))
+        elif line.strip():
+            error = line.strip()
+    return rows, (error if result.returncode else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show where cold-start import time goes.")
+    parser.add_argument("--top", type=int, default=20, help="number of modules to list per target")
+    args = parser.parse_args(argv)
+
+    for label, code in TARGETS.items():
+        rows, error = profile(code)
+        # Top-level imports are the ones without leading indentation in the module column
+        total = sum(cumulative for cumulative, _, module in rows if not module.startswith(" "))
+        print(f"== {label}: {total / 1000:.1f} ms total")
+        if error:
+            print(f"   (incomplete: {error})")
+        print(f"   {'cumulative ms':>13} {'self ms':>8}  module")
+        for cumulative, self_us, module in sorted(rows, reverse=True)[:args.top]:
+            print(f"   {cumulative / 1000:>13.1f} {self_us / 1000:>8.1f}  {module.strip()}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
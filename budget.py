@@ -0,0 +1,63 @@
+# Token and latency estimates for an interview before it is requested.
+#
+# Every finished generation adds its output tokens and seconds to counters in
+# the state backend (see state.py), per length preset at three levels of
+# detail: the character pair and tone, the tone, and the preset alone. An
+# estimate comes from the most specific level with enough runs behind it, or
+# from the preset's defaults before there are any. Counters only ever grow by
+# atomic increments, so replicas sharing a backend pool their runs.
+import os
+
+from interview import LENGTHS, SYSTEM_INSTRUCTION
+from interview_cache import normalize
+from state import MemoryState
+
+
+class BudgetEstimator:
+    def __init__(self, state=None, min_runs=3):
+        self.state = state or MemoryState()
+        self.min_runs = min_runs
+
+    # Counter prefixes from the most to the least specific; the pair is unordered
+    def scopes(self, character1, character2, tone, length):
+        pair = "|".join(sorted((normalize(character1), normalize(character2))))
+        return [("pair", f"budget:{length}:{normalize(tone)}:{pair}:"), ("tone", f"budget:{length}:{normalize(tone)}:"),
+                ("length", f"budget:{length}:")]
+
+    # Record one finished generation
+    def record(self, character1, character2, tone, length, tokens, seconds):
+        if not tokens:
+            return
+        for _, prefix in self.scopes(character1, character2, tone, length):
+            self.state.incr(prefix + "runs")
+            self.state.incr(prefix + "tokens", int(tokens))
+            self.state.incr(prefix + "ms", int(seconds * 1000))
+
+    # {"tokens", "seconds", "runs", "basis"} expected for a request; basis is
+    # the level the estimate comes from ("pair", "tone", "length" or "default")
+    def estimate(self, character1, character2, tone, length):
+        for basis, prefix in self.scopes(character1, character2, tone, length):
+            runs = self.state.counter(prefix + "runs")
+            if runs >= self.min_runs:
+                return {"tokens": self.state.counter(prefix + "tokens") // runs,
+                        "seconds": self.state.counter(prefix + "ms") / runs / 1000.0, "runs": runs, "basis": basis}
+        preset = LENGTHS[length]
+        return {"tokens": preset["tokens"], "seconds": preset["seconds"], "runs": 0, "basis": "default"}
+
+
+# Tokens for the scheduler to reserve for a request: the prompt (about four
+# characters per token) and the reply the estimate expects
+def reserve_tokens(estimate, prompt):
+    return (len(SYSTEM_INSTRUCTION) + len(prompt)) // 4 + estimate["tokens"]
+
+
+# Tokens to settle for a stream that ended early (a deadline, a validator
+# abort, a lost hedge, a rerun): usage only arrives with the last chunk, so
+# count the prompt and the `chars` of text received so far
+def streamed_tokens(prompt, chars):
+    return (len(SYSTEM_INSTRUCTION) + len(prompt) + chars) // 4
+
+
+# Build an estimator on `state` from BUDGET_MIN_RUNS
+def estimator_from_env(state=None):
+    return BudgetEstimator(state, min_runs=int(os.environ.get("BUDGET_MIN_RUNS", "3")))
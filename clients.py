@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+import time
+
+
+# Process-wide registry of Gemini models keyed by (API key, model name,
+# system instruction).
+# Each entry owns its own GenerativeServiceClient, so sessions using different
+# keys never touch the SDK's global genai.configure() state, and the
+# underlying gRPC channel is reused across requests for the same key.
+# With `endpoint` set, clients talk REST to that URL instead (e.g. the local
+# fake server in fake_gemini.py). The Gemini SDK is imported on first use, so
+# starting the app does not pay for its import.
+class ClientRegistry:
+    def __init__(self, idle_seconds=15 * 60, endpoint=None):
+        self.idle_seconds = idle_seconds
+        self.endpoint = endpoint
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key, model_name, system_instruction=None):
+        key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), model_name, system_instruction)
+        now = time.monotonic()
+        with self._lock:
+            self._close_idle(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                import google.generativeai as genai
+
+                client = self._new_client(api_key)
+                model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                model._client = client
+                entry = self._entries[key] = {"client": client, "model": model, "last_used": now}
+            entry["last_used"] = now
+            return entry["model"]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            for entry in self._entries.values():
+                _close_client(entry["client"])
+            self._entries.clear()
+
+    def _new_client(self, api_key):
+        from google.ai import generativelanguage as glm
+
+        if self.endpoint:
+            return glm.GenerativeServiceClient(
+                transport="rest",
+                client_options={"api_key": api_key, "api_endpoint": self.endpoint},
+            )
+        return glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def _close_idle(self, now):
+        for key, entry in list(self._entries.items()):
+            if now - entry["last_used"] > self.idle_seconds:
+                _close_client(entry["client"])
+                del self._entries[key]
+
+
+def _close_client(client):
+    try:
+        client.transport.close()
+    except Exception:
+        pass
+
+
+# Build a registry from GEMINI_* environment variables
+def registry_from_env():
+    return ClientRegistry(
+        idle_seconds=float(os.environ.get("GEMINI_CLIENT_IDLE_SECONDS", "900")),
+        endpoint=os.environ.get("GEMINI_API_ENDPOINT") or None,
+    )
@@ -0,0 +1,102 @@
+# Parsing and HTML rendering of generated dialogue scripts
+import html
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# One parsed line: speaker is None for narration and stage directions;
+# role is 1 or 2 for the two characters and 0 for anyone else
+Turn = namedtuple("Turn", ["speaker", "text", "role"])
+
+ROLE_COLORS = {1: "#2563EB", 2: "#DB2777", 0: "#4B5563"}
+
+# Titles the model likes to add or drop ("Emperor Akbar" vs "Akbar:")
+HONORIFICS = {
+    "emperor", "empress", "king", "queen", "prince", "princess", "lord", "lady", "sir", "dame",
+    "sri", "shri", "sree", "maharaja", "maharani", "raja", "rani", "pharaoh", "saint", "st",
+    "dr", "mr", "mrs", "ms", "miss", "prof", "professor", "president", "general", "captain", "mahatma",
+}
+
+# A colon followed by a digit is a time or a ratio ("at 10:30"), not the end of a speaker label
+LINE_RE = re.compile(r"^\s*(?:[-*>]\s+)?(?P<speaker>[^:\n]{1,60}?)\s*:(?!\d)\s*(?P<text>.*)$")
+MARKUP_RE = re.compile(r"[*_`#~]+")
+ASIDE_RE = re.compile(r"\s*[(\[][^)\]]*[)\]]\s*")
+WORD_RE = re.compile(r"[^\w\s'-]+")
+
+
+# Reduce a speaker label to the form used for lookups: no markdown, no asides, no titles, casefolded
+def normalize_speaker(name):
+    name = ASIDE_RE.sub(" ", MARKUP_RE.sub("", name))
+    words = WORD_RE.sub(" ", name).casefold().split()
+    stripped = [w for w in words if w not in HONORIFICS]
+    return " ".join(stripped or words)
+
+
+# Lookup table from every accepted spelling of the two characters to (name, role)
+class SpeakerIndex:
+    def __init__(self, character1, character2):
+        self._table = {}
+        names = [(character1, 1), (character2, 2)]
+        keys = {role: normalize_speaker(name) for name, role in names if name}
+        for name, role in names:
+            if name:
+                self._table[keys[role]] = (name, role)
+
+        # Single words ("Jobs", "Curie") only count when they identify one character
+        tokens = {}
+        for role, key in keys.items():
+            for word in key.split():
+                tokens.setdefault(word, set()).add(role)
+        for name, role in names:
+            if name:
+                for word in keys[role].split():
+                    if tokens[word] == {role}:
+                        self._table.setdefault(word, (name, role))
+
+    def lookup(self, raw_speaker):
+        found = self._table.get(normalize_speaker(raw_speaker))
+        if found:
+            return found
+        return ASIDE_RE.sub(" ", MARKUP_RE.sub("", raw_speaker)).strip(), 0
+
+    # Parse one line of the script, or return None for blank lines
+    def parse_line(self, line):
+        if not line.strip():
+            return None
+        match = LINE_RE.match(line)
+        if not match:
+            return Turn(None, MARKUP_RE.sub("", line).strip() or line.strip(), 0)
+        speaker, role = self.lookup(match.group("speaker"))
+        if not speaker:
+            return Turn(None, line.strip(), 0)
+        return Turn(speaker, match.group("text").lstrip("*_ ").strip(), role)
+
+
+# Parse a whole script in one pass. Cached, so rerunning the page with the
+# same interview string does not parse it again.
+@lru_cache(maxsize=256)
+def parse_dialogue(text, character1, character2):
+    index = SpeakerIndex(character1, character2)
+    turns = []
+    for line in text.splitlines():
+        turn = index.parse_line(line)
+        if turn is not None:
+            turns.append(turn)
+    return tuple(turns)
+
+
+def render_turn(turn):
+    if turn.speaker is None:
+        return f'<p style="font-style: italic; color: #6B7280;">{html.escape(turn.text)}</p>\n'
+    color = ROLE_COLORS[turn.role]
+    return f'<p><span style="color: {color}; font-weight: 600;">{html.escape(turn.speaker)}:</span> {html.escape(turn.text)}</p>\n'
+
+
+def render_turns(turns):
+    return "".join([render_turn(turn) for turn in turns])
+
+
+# Parse and render a whole script to HTML; cached like parse_dialogue
+@lru_cache(maxsize=256)
+def render_dialogue(text, character1, character2):
+    return render_turns(parse_dialogue(text, character1, character2))
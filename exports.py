@@ -0,0 +1,196 @@
+# Download formats for generated interviews.
+#
+# Each format is a generator of text chunks, so a script is encoded piece by
+# piece and the app only builds a file when its download is requested.
+# Encoded files are kept in a byte-bounded LRU keyed by interview ID and
+# format, so downloading the same file again costs nothing.
+import hashlib
+import html
+import io
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+
+from dialogue import Turn, parse_dialogue, render_turn
+
+# Most archived interviews a bulk zip export will include
+BULK_LIMIT = int(os.environ.get("EXPORT_BULK_LIMIT", "500"))
+
+# Seconds each subtitle stays on screen: a floor plus reading time at about 2.5 words per second
+SRT_MIN_SECONDS = 1.5
+SRT_WORDS_PER_SECOND = 2.5
+
+
+# Stable ID for one interview: the same script for the same request always gets the same ID
+def interview_id(character1, character2, topic, tone, text):
+    parts = [character1, character2, topic or "", tone, text]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()[:32]
+
+
+# Everything the encoders need, from the session's current interview or an archive record
+def export_record(character1, character2, topic, tone, text, turns=None, created_at=None):
+    if turns is None:
+        turns = parse_dialogue(text, character1, character2)
+    else:
+        turns = [Turn(**turn) if isinstance(turn, dict) else turn for turn in turns]
+    return {
+        "id": interview_id(character1, character2, topic, tone, text),
+        "character1": character1,
+        "character2": character2,
+        "topic": topic or "",
+        "tone": tone,
+        "text": text,
+        "turns": turns,
+        "created_at": created_at,
+    }
+
+
+def title(record):
+    return f"Interview between {record['character1']} and {record['character2']}"
+
+
+def iter_plain(record):
+    yield record["text"]
+
+
+def iter_markdown(record):
+    yield f"# {title(record)}\n\n"
+    yield f"**Topic:** {record['topic'] or 'General conversation'}  \n**Tone:** {record['tone']}\n\n"
+    for turn in record["turns"]:
+        if turn.speaker is None:
+            yield f"*{turn.text}*\n\n"
+        else:
+            yield f"**{turn.speaker}:** {turn.text}\n\n"
+
+
+def iter_json(record):
+    header = {k: record[k] for k in ("id", "character1", "character2", "topic", "tone", "created_at")}
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "turns": ['
+    for i, turn in enumerate(record["turns"]):
+        yield ("," if i else "") + "\n  " + json.dumps(turn._asdict(), ensure_ascii=False)
+    yield "\n]}\n"
+
+
+def iter_html(record):
+    heading = html.escape(title(record))
+    yield f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{heading}</title>
+<style>
+body {{ font-family: system-ui, sans-serif; max-width: 760px; margin: 40px auto; line-height: 1.6; color: #111827; }}
+h1 {{ color: #1E40AF; }}
+</style>
+</head>
+<body>
+<h1>{heading}</h1>
+<p><strong>Topic:</strong> {html.escape(record['topic'] or 'General conversation')} &middot; <strong>Tone:</strong> {html.escape(record['tone'])}</p>
+"""
+    for turn in record["turns"]:
+        yield render_turn(turn)
+    yield "</body>\n</html>\n"
+
+
+def srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+# One cue per turn, timed by an estimated reading speed
+def iter_srt(record):
+    start = 0.0
+    for number, turn in enumerate(record["turns"], 1):
+        duration = max(SRT_MIN_SECONDS, len(turn.text.split()) / SRT_WORDS_PER_SECOND)
+        line = turn.text if turn.speaker is None else f"{turn.speaker}: {turn.text}"
+        yield f"{number}\n{srt_time(start)} --> {srt_time(start + duration)}\n{line}\n\n"
+        start += duration
+
+
+# format: (label, file extension, MIME type, chunk generator)
+FORMATS = {
+    "txt": ("Plain text", "txt", "text/plain", iter_plain),
+    "md": ("Markdown", "md", "text/markdown", iter_markdown),
+    "json": ("JSON (turns)", "json", "application/json", iter_json),
+    "html": ("HTML page", "html", "text/html", iter_html),
+    "srt": ("Subtitles (SRT)", "srt", "application/x-subrip", iter_srt),
+}
+
+
+# Write one interview to a binary file object, chunk by chunk
+def write_export(record, fmt, out):
+    for chunk in FORMATS[fmt][3](record):
+        out.write(chunk.encode("utf-8"))
+
+
+def export_bytes(record, fmt):
+    out = io.BytesIO()
+    write_export(record, fmt, out)
+    return out.getvalue()
+
+
+def export_filename(record, fmt):
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"interview_{record['character1']}_{record['character2']}_{current_time}.{FORMATS[fmt][1]}"
+
+
+# Zip many interviews, one file each, pulling records one at a time so only
+# the current one is held in memory besides the compressed output
+def write_zip(records, fmt, out):
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for n, record in enumerate(records, 1):
+            name = f"{n:05}_{record['character1']}_{record['character2']}_{record['tone']}.{FORMATS[fmt][1]}"
+            with zf.open(name.replace("/", "-"), "w") as member:
+                write_export(record, fmt, member)
+
+
+def zip_bytes(records, fmt):
+    out = io.BytesIO()
+    write_zip(records, fmt, out)
+    return out.getvalue()
+
+
+# Byte-bounded LRU of encoded exports keyed by (interview ID, format)
+class ExportCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, record, fmt):
+        key = (record["id"], fmt)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = export_bytes(record, fmt)
+        with self._lock:
+            if key not in self._entries and len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, dropped = self._entries.popitem(last=False)
+                    self._size -= len(dropped)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+# Build an export cache from EXPORT_CACHE_BYTES
+def export_cache_from_env():
+    return ExportCache(max_bytes=int(os.environ.get("EXPORT_CACHE_BYTES", str(32 * 1024 * 1024))))
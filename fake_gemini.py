@@ -0,0 +1,261 @@
+# Local stand-in for the Gemini REST API, for load tests and offline CI.
+#
+#   python fake_gemini.py --port 8765 --latency-median 1.5 --error-rate 0.02
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8765 streamlit run app.py
+#
+# It answers generateContent and streamGenerateContent (as a JSON array or as
+# server-sent events) with canned dialogues between the two characters named
+# in the prompt. Latency, streaming chunk size, error rate and the share of
+# off-format (prose) replies are configurable, and any API key is accepted.
+# Replies longer than the request's maxOutputTokens are cut off mid-line
+# with finishReason MAX_TOKENS, like the real API.
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAIR_RE = re.compile(r"between (?P<a>.+?) and (?P<b>.+?)\.")
+EXCHANGES_RE = re.compile(r"(\d+)(?:-\d+)? exchanges")
+PERSONA_RE = re.compile(r"^Describe how (?P<name>.+?) speaks")
+
+CANNED_LINES = [
+    "I have always wondered what you would make of all this.",
+    "Then let us begin with the question nobody dares to ask.",
+    "You speak as if the answer were simple. It never is.",
+    "Simplicity is the reward for understanding, not the starting point.",
+    "And yet every great idea I know began as something small.",
+    "Small, perhaps, but never careless. Care is what separates craft from chance.",
+    "Tell me, then, what would you change if you could start again?",
+    "Nothing of substance. Only the pace, which was always too slow for me.",
+    "Patience has served me better than haste ever did.",
+    "Perhaps that is why we still have so much to say to each other.",
+]
+
+ERROR_STATUSES = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+
+class FakeConfig:
+    def __init__(self, latency_median=1.0, latency_sigma=0.5, first_token=0.3, chunk_chars=40,
+                 chunk_delay=0.02, error_rate=0.0, error_codes=(429, 503), exchanges=None, malformed_rate=0.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.first_token = first_token
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.exchanges = exchanges
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    # Lognormal total latency around the configured median
+    def sample_latency(self):
+        with self.lock:
+            if self.latency_sigma <= 0:
+                return self.latency_median
+            return self.latency_median * math.exp(self.random.gauss(0, self.latency_sigma))
+
+    def sample_error(self):
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return self.random.choice(self.error_codes)
+            return None
+
+    def sample_malformed(self):
+        with self.lock:
+            return bool(self.malformed_rate) and self.random.random() < self.malformed_rate
+
+
+def canned_dialogue(prompt, exchanges=None):
+    match = PAIR_RE.search(prompt)
+    first, second = (match.group("a"), match.group("b")) if match else ("Character 1", "Character 2")
+    if exchanges is None:
+        found = EXCHANGES_RE.search(prompt)
+        exchanges = int(found.group(1)) if found else 8
+    lines = []
+    for i in range(exchanges * 2):
+        speaker = first if i % 2 == 0 else second
+        lines.append(f"{speaker}: {CANNED_LINES[i % len(CANNED_LINES)]}")
+    return "\n".join(lines) + "\n"
+
+
+# A reply that ignores the requested format: paragraphs of prose, no speaker labels
+def canned_prose(paragraphs=8):
+    return "\n".join(" ".join(CANNED_LINES[i % len(CANNED_LINES)] for i in range(p, p + 3))
+                     for p in range(paragraphs)) + "\n"
+
+
+def response_body(text, prompt_tokens, response_tokens, finished=True, finish_reason="STOP"):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finished:
+        candidate["finishReason"] = finish_reason
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": response_tokens,
+            "totalTokenCount": prompt_tokens + response_tokens,
+        },
+    }
+
+
+# Text of the request's system instruction and contents, for token accounting
+def prompt_text(request):
+    parts = [part.get("text", "") for part in (request.get("systemInstruction") or {}).get("parts", [])]
+    for content in request.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+# Rough token estimate, good enough for load-test accounting
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            stream = ":streamGenerateContent" in self.path
+            if ":generateContent" not in self.path and not stream:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+
+            prompt = prompt_text(request)
+            latency = config.sample_latency()
+            error = config.sample_error()
+            if error:
+                time.sleep(min(latency, config.first_token))
+                self._send_json(error, {"error": {"code": error, "message": "Fake upstream error",
+                                                  "status": ERROR_STATUSES.get(error, "UNKNOWN")}})
+                return
+
+            persona = PERSONA_RE.search(prompt_text({"contents": request.get("contents", [])}))
+            if persona:
+                text = f"Plain-spoken and brisk, like {persona.group('name')}; short sentences, dry asides."
+            elif config.sample_malformed():
+                text = canned_prose()
+            else:
+                text = canned_dialogue(prompt, config.exchanges)
+            # Cut the reply at the requested output ceiling, mid-word like the real API
+            finish_reason = "STOP"
+            max_tokens = (request.get("generationConfig") or {}).get("maxOutputTokens")
+            if max_tokens and estimate_tokens(text) > max_tokens:
+                text = text[:max_tokens * 4]
+                finish_reason = "MAX_TOKENS"
+            prompt_tokens = estimate_tokens(prompt)
+            if not stream:
+                time.sleep(latency)
+                self._send_json(200, response_body(text, prompt_tokens, estimate_tokens(text), finish_reason=finish_reason))
+                return
+
+            # Stream partial responses as a JSON array (the SDK's REST transport) or as
+            # server-sent events with ?alt=sse (the async client behind api.py)
+            sse = "alt=sse" in self.path
+            chunks = [text[i:i + config.chunk_chars] for i in range(0, len(text), config.chunk_chars)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(min(latency, config.first_token))
+            # Spread the remaining latency over the chunks, on top of the fixed per-chunk delay
+            per_chunk = max(0.0, latency - config.first_token) / max(1, len(chunks)) + config.chunk_delay
+            sent = 0
+            for i, chunk in enumerate(chunks):
+                sent += len(chunk)
+                last = i == len(chunks) - 1
+                body = json.dumps(response_body(chunk, prompt_tokens, estimate_tokens(text[:sent]), finished=last,
+                                                finish_reason=finish_reason))
+                if sse:
+                    self._write_chunk(f"data: {body}\r\n\r\n")
+                else:
+                    self._write_chunk(("[" if i == 0 else ",") + body + ("]" if last else ""))
+                if not last:
+                    time.sleep(per_chunk)
+            self._write_chunk("")
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# Deep listen backlog so bursts of load-test connections are not dropped and retried by the kernel
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+# Start the fake server on a background thread; port 0 picks a free port
+def start_fake_server(config=None, port=0, host="127.0.0.1"):
+    server = FakeServer((host, port), make_handler(config or FakeConfig()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-median", type=float, default=1.0, help="median total response time in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread of the response time (0 for fixed)")
+    parser.add_argument("--first-token", type=float, default=0.3, help="delay before the first streamed chunk in seconds")
+    parser.add_argument("--chunk-chars", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="extra delay between streamed chunks in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-codes", default="429,503", help="comma-separated HTTP statuses to fail with")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies that are prose instead of dialogue")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = FakeConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        first_token=args.first_token,
+        chunk_chars=args.chunk_chars,
+        chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(",") if code],
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    server = FakeServer((args.host, args.port), make_handler(config))
+    print(f"Fake Gemini API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
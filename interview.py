@@ -0,0 +1,143 @@
+# Prompt construction and response handling shared by the Streamlit app and the headless entry points
+import os
+import time
+
+from metrics import METRICS
+
+# Models the app routes generation to, fastest first (see routing.py). The
+# first one is the model used for generation everywhere else; bump
+# PROMPT_VERSION whenever build_prompt changes so cached scripts are not reused
+MODELS = [name.strip() for name in os.environ.get("GEMINI_MODELS", "gemini-2.0-flash").split(",") if name.strip()]
+MODEL_NAME = MODELS[0]
+PROMPT_VERSION = "2"
+
+TONES = ["Funny", "Dramatic", "Philosophical", "Creative"]
+
+# Length presets: the exchanges asked for, the output-token ceiling sent with
+# the request (with room to spare, so only a runaway reply reaches it), and
+# the tokens and seconds a reply typically takes, until past runs say otherwise
+LENGTHS = {
+    "Short": {"exchanges": "4-6", "max_output_tokens": 700, "tokens": 350, "seconds": 4.0},
+    "Standard": {"exchanges": "8-10", "max_output_tokens": 1400, "tokens": 700, "seconds": 8.0},
+    "Long": {"exchanges": "14-16", "max_output_tokens": 2200, "tokens": 1100, "seconds": 13.0},
+}
+DEFAULT_LENGTH = "Standard"
+
+# Once a streamed reply has run this long it ends at the next complete line, well before the hard timeout
+SOFT_DEADLINE_SECONDS = float(os.environ.get("GENERATION_SOFT_DEADLINE_SECONDS", "45"))
+
+# Static guidelines, sent once per model as its system instruction rather than inside every prompt
+SYSTEM_INSTRUCTION = """You write fictional interviews as dialogue scripts.
+One line per turn, formatted "Name: line", the two characters alternating. No narration, headings or notes.
+Each character speaks with the voice, personality and knowledge they are known for, following any voice notes."""
+
+# Function to build the prompt sent to the model: just this request's specifics.
+# `personas` maps a character name to a short voice profile (see persona.py).
+def build_prompt(character1, character2, topic, tone, personas=None, length=DEFAULT_LENGTH):
+    lines = [
+        f"Interview between {character1} and {character2}.",
+        f"Topic: {topic if topic else 'anything these characters would find interesting'}",
+        f"Tone: {tone}",
+        f"Length: {LENGTHS[length]['exchanges']} exchanges",
+    ]
+    for name in (character1, character2):
+        profile = (personas or {}).get(name)
+        if profile:
+            lines.append(f"{name}'s voice: {profile}")
+    return "\n".join(lines)
+
+# Generation config for the SDK's generate_content
+def generation_config(length=DEFAULT_LENGTH):
+    return {"max_output_tokens": LENGTHS[length]["max_output_tokens"]}
+
+# True if the reply stopped at its output-token ceiling, mid-sentence
+def hit_token_limit(finish_reason):
+    return getattr(finish_reason, "name", finish_reason) == "MAX_TOKENS"
+
+def response_hit_token_limit(response):
+    candidates = getattr(response, "candidates", None)
+    return bool(candidates) and hit_token_limit(candidates[0].finish_reason)
+
+# Text of a complete script response; one cut off at its token ceiling
+# loses its unfinished last line, so the script ends on a whole turn
+def reply_text(response):
+    text = response.text
+    if not response_hit_token_limit(response):
+        return text
+    METRICS.increment("truncated_replies", reason="max_tokens")
+    return text[:text.rfind("\n") + 1].rstrip("\n")
+
+# Text of each chunk of a streaming response. Whatever follows the last
+# newline is held back until more arrives, so a reply cut off at its token
+# ceiling ends at its last complete line.
+def iter_text(response):
+    tail = ""
+    for chunk in response:
+        text = tail + chunk.text
+        cut = text.rfind("\n") + 1
+        tail = text[cut:]
+        if cut:
+            yield text[:cut]
+    if tail:
+        if response_hit_token_limit(response):
+            METRICS.increment("truncated_replies", reason="max_tokens")
+        else:
+            yield tail
+
+# Lines of a streamed script, ended early at a turn boundary once the reply
+# has streamed for `seconds` and at least `min_lines` non-empty lines are in;
+# closing the stream stops the upstream call. The clock starts at the first
+# line, so time spent queued or backing off before it does not count. Sets
+# status["truncated"] when it ends early: such a script is not fit to cache.
+def iter_until(lines, seconds, min_lines=6, status=None):
+    count = 0
+    deadline = None
+    try:
+        for line in lines:
+            if deadline is None:
+                deadline = time.monotonic() + seconds
+            yield line
+            if line.strip():
+                count += 1
+            if count >= min_lines and time.monotonic() > deadline:
+                METRICS.increment("truncated_replies", reason="deadline")
+                if status is not None:
+                    status["truncated"] = True
+                return
+    finally:
+        close = getattr(lines, "close", None)
+        if close is not None:
+            close()
+
+# Splits streamed text into complete lines; feed() returns the lines its piece completed
+class LineBuffer:
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, piece):
+        self.buffer += piece
+        if "\n" not in self.buffer:
+            return []
+        *lines, self.buffer = self.buffer.split("\n")
+        return lines
+
+    # Whatever is left after the stream ends, as a final line
+    def flush(self):
+        rest, self.buffer = self.buffer, ""
+        return [rest] if rest else []
+
+# Turn a stream of text pieces into complete lines, handing each out once its newline has arrived
+def iter_lines(pieces):
+    lines = LineBuffer()
+    for piece in pieces:
+        yield from lines.feed(piece)
+    yield from lines.flush()
+
+# Async version of iter_lines for the HTTP API
+async def aiter_lines(pieces):
+    lines = LineBuffer()
+    async for piece in pieces:
+        for line in lines.feed(piece):
+            yield line
+    for line in lines.flush():
+        yield line
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from interview import DEFAULT_LENGTH
+from state import MemoryState, connect, state_from_env
+
+
+# Normalize a free-text input so "  Socrates " and "socrates" share a cache entry
+def normalize(value):
+    return " ".join((value or "").split()).casefold()
+
+
+# Build the content-addressed key for one interview request. The length
+# preset is only part of keys other than the default's, so scripts cached
+# before presets existed still match.
+def make_key(character1, character2, topic, tone, model, prompt_version, length=DEFAULT_LENGTH):
+    parts = [normalize(character1), normalize(character2), normalize(topic), normalize(tone), model, prompt_version]
+    if length != DEFAULT_LENGTH:
+        parts.append(length)
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+# Two-tier interview cache: an in-process LRU in front of a SQLite file.
+# Each key can hold up to `variants` different scripts so regenerating the
+# same pair can still return something new. Several processes can share the
+# file; hit and miss counts go to `state` (see state.py) so they can be shared too.
+class InterviewCache:
+    def __init__(self, path, memory_entries=128, disk_entries=5000, ttl_seconds=7 * 24 * 3600, variants=1, state=None):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = max(1, variants)
+        self.state = state or MemoryState()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS interviews (
+                key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (key, text)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS interviews_accessed ON interviews (accessed_at)")
+        self._db.commit()
+
+    # Return a cached script for `key`, or None on a miss. When `exclude` is
+    # given (the script currently on screen) and the key still has room for
+    # more variants, this counts as a miss so a fresh script gets generated.
+    def get(self, key, exclude=None):
+        now = time.time()
+        with self._lock:
+            variants = self._memory.get(key)
+            if variants is not None:
+                variants = [(text, created) for text, created in variants if now - created < self.ttl_seconds]
+                if variants:
+                    self._memory[key] = variants
+                    self._memory.move_to_end(key)
+                else:
+                    del self._memory[key]
+                    variants = None
+            if variants is None:
+                variants = self._load(key, now)
+                if variants:
+                    self._remember(key, variants)
+
+            choices = [text for text, _ in variants or [] if text != exclude]
+            if not choices or (exclude is not None and len(variants) < self.variants):
+                self.state.incr("cache_misses")
+                return None
+
+            self.state.incr("cache_hits")
+            self._db.execute("UPDATE interviews SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return random.choice(choices)
+
+    # True if `key` has a live cached script; unlike get() this is not counted as a hit or miss
+    def peek(self, key):
+        now = time.time()
+        with self._lock:
+            variants = self._memory.get(key)
+            if variants is None:
+                variants = self._load(key, now)
+            return any(now - created < self.ttl_seconds for _, created in variants)
+
+    # Store a freshly generated script, dropping the oldest variant when the key is full
+    def put(self, key, text):
+        now = time.time()
+        with self._lock:
+            # Read and rewrite the key's variants in one write transaction, so
+            # variants another process stored meanwhile are neither lost nor kept past the limit
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                variants = [v for v in self._load(key, now) if v[0] != text]
+                variants.append((text, now))
+                dropped = variants[:-self.variants]
+                variants = variants[-self.variants:]
+
+                for old_text, _ in dropped:
+                    self._db.execute("DELETE FROM interviews WHERE key = ? AND text = ?", (key, old_text))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO interviews (key, text, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, text, now, now),
+                )
+                self._evict(now)
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._remember(key, variants)
+
+    def stats(self):
+        with self._lock:
+            disk = self._db.execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+            memory = len(self._memory)
+        counters = self.state.counters("cache_")
+        return {"hits": counters.get("cache_hits", 0), "misses": counters.get("cache_misses", 0), "memory": memory, "disk": disk}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _load(self, key, now):
+        rows = self._db.execute(
+            "SELECT text, created_at FROM interviews WHERE key = ? AND created_at > ? ORDER BY created_at",
+            (key, now - self.ttl_seconds),
+        ).fetchall()
+        return [(text, created) for text, created in rows]
+
+    def _remember(self, key, variants):
+        self._memory[key] = variants
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # Drop expired rows, then the least recently used ones beyond the size limit
+    def _evict(self, now):
+        self._db.execute("DELETE FROM interviews WHERE created_at <= ?", (now - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+        if count > self.disk_entries:
+            self._db.execute(
+                "DELETE FROM interviews WHERE rowid IN "
+                "(SELECT rowid FROM interviews ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+
+
+# Build a cache from INTERVIEW_CACHE_* environment variables, counting hits in
+# `state` (by default the backend STATE_BACKEND names)
+def cache_from_env(state=None):
+    return InterviewCache(
+        os.environ.get("INTERVIEW_CACHE_PATH", "interview_cache.sqlite3"),
+        memory_entries=int(os.environ.get("INTERVIEW_CACHE_MEMORY_ENTRIES", "128")),
+        disk_entries=int(os.environ.get("INTERVIEW_CACHE_DISK_ENTRIES", "5000")),
+        ttl_seconds=float(os.environ.get("INTERVIEW_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        variants=int(os.environ.get("INTERVIEW_CACHE_VARIANTS", "3")),
+        state=state or state_from_env(),
+    )
@@ -0,0 +1,136 @@
+# Long-form episodes generated in segments.
+#
+# Each segment prompt carries only a short rolling summary plus the last few
+# lines, so prompt size stays the same whether the episode is at exchange 10
+# or exchange 200, and only the current segment is ever held in memory.
+from collections import deque
+
+from budget import streamed_tokens
+from interview import iter_lines, iter_text
+from metrics import usage_counts
+
+SEGMENT_EXCHANGES = 10
+CONTEXT_LINES = 6
+SUMMARY_WORDS = 120
+# Hard cap on the summary carried between segments, in case the model ignores the word limit
+SUMMARY_CHARS = 1200
+
+
+def build_segment_prompt(character1, character2, topic, tone, summary, recent_lines, exchanges, first, last):
+    if first:
+        position = "This is the opening of the episode: introduce the conversation naturally."
+    elif last:
+        position = "This is the final part of the episode: bring the conversation to a satisfying close."
+    else:
+        position = "This is the middle of the episode: continue the conversation without restarting or wrapping up."
+
+    context = ""
+    if summary:
+        context += f"\n    Summary of the conversation so far:\n    {summary}\n"
+    if recent_lines:
+        recent = "\n    ".join(recent_lines)
+        context += f"\n    The last lines were:\n    {recent}\n"
+
+    return f"""
+    You are writing one part of a long dialogue interview between {character1} and {character2}.
+
+    Guidelines:
+    - The interview is about {topic if topic else "any relevant topic that would be interesting for these characters"}.
+    - The tone should be {tone}.
+    - {position}
+    - Write exactly {exchanges} exchanges, continuing directly from the last lines without repeating them.
+    - Each character should keep the distinct personality and speaking style established so far.
+    - Output only dialogue lines, with no headings or commentary.
+    {context}
+    Output format example:
+    {character1}: [Line of dialogue]
+    {character2}: [Response]
+    """
+
+
+def build_summary_prompt(character1, character2, summary, segment_lines):
+    segment = "\n".join(segment_lines)
+    return f"""
+    Update the running summary of a conversation between {character1} and {character2}.
+    Keep it under {SUMMARY_WORDS} words. Keep the main threads, positions each character has taken,
+    and any running jokes or callbacks. Reply with the summary only.
+
+    Current summary:
+    {summary if summary else "(none yet)"}
+
+    New part of the conversation:
+    {segment}
+    """
+
+
+# Generate `exchanges` exchanges, yielding (segment number, line) as each line
+# arrives. When `out` is given every line is also written and flushed to it;
+# when `policy` is given every call goes through its retries and timeouts.
+# `before_call`, if given, runs before every model call attempt (e.g. to wait
+# for a scheduler slot), and what it returns is handed to
+# `after_call(slot, tokens_used)` once that attempt is over.
+def iter_long_form(model, character1, character2, topic, tone, exchanges, segment_exchanges=SEGMENT_EXCHANGES,
+                   context_lines=CONTEXT_LINES, out=None, policy=None, before_call=None, after_call=None):
+    summary = ""
+    recent = deque(maxlen=context_lines)
+    done = 0
+    segment = 0
+    while done < exchanges:
+        count = min(segment_exchanges, exchanges - done)
+        last = done + count >= exchanges
+        prompt = build_segment_prompt(character1, character2, topic, tone, summary, list(recent), count, done == 0, last)
+
+        segment_lines = []
+        for line in iter_lines(_generate(model, prompt, policy, before_call, after_call, stream=True)):
+            if not line.strip():
+                continue
+            recent.append(line)
+            segment_lines.append(line)
+            if out is not None:
+                out.write(line + "\n")
+                out.flush()
+            yield segment, line
+
+        if not last:
+            summary_prompt = build_summary_prompt(character1, character2, summary, segment_lines)
+            response = _generate(model, summary_prompt, policy, before_call, after_call)
+            summary = " ".join(response.split())[:SUMMARY_CHARS]
+        done += count
+        segment += 1
+
+
+# Text of a model call, as one string or as streamed pieces
+def _generate(model, prompt, policy, before_call=None, after_call=None, stream=False):
+    def attempt(options):
+        slot = before_call() if before_call is not None else None
+        if stream:
+            return _stream(model, prompt, options, slot, after_call)
+        used = 0
+        try:
+            response = model.generate_content(prompt, request_options=options)
+            used = sum(usage_counts(response).values())
+            return response.text
+        finally:
+            if after_call is not None:
+                after_call(slot, used)
+
+    if policy is None:
+        return attempt({})
+    return policy.stream(attempt) if stream else policy.call(attempt)
+
+
+# Usage only arrives with the last chunk, so a stream that ends early reports
+# the prompt and the text received so far
+def _stream(model, prompt, options, slot, after_call):
+    used = 0
+    chars = 0
+    try:
+        response = model.generate_content(prompt, stream=True, request_options=options)
+        used = None
+        for text in iter_text(response):
+            chars += len(text)
+            yield text
+        used = sum(usage_counts(response).values())
+    finally:
+        if after_call is not None:
+            after_call(slot, streamed_tokens(prompt, chars) if used is None else used)
@@ -0,0 +1,130 @@
+# In-process latency and token instrumentation.
+#
+# Observations go into a fixed-size ring buffer, so recording is a deque
+# append under a lock and memory stays bounded however long the process runs.
+# METRICS is the process-wide recorder shared by every Streamlit session.
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PERCENTILES = (50, 95, 99)
+
+
+class MetricsRecorder:
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._events = deque(maxlen=capacity)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    # Record one observation, e.g. record("generation_seconds", 3.2, tone="Funny")
+    def record(self, name, value, **labels):
+        with self._lock:
+            self._events.append((time.time(), name, value, labels))
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, **labels)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    # {name: {"count", "mean", "p50", "p95", "p99"}} over the buffered observations
+    def summary(self):
+        values = {}
+        for _, name, value, _ in self.events():
+            values.setdefault(name, []).append(value)
+        return {name: summarize(v) for name, v in sorted(values.items())}
+
+    def to_jsonl(self):
+        return "".join(
+            json.dumps({"ts": ts, "name": name, "value": value, "labels": labels}) + "\n"
+            for ts, name, value, labels in self.events()
+        )
+
+    def to_prometheus(self, prefix="interview_"):
+        lines = []
+        for name, stats in self.summary().items():
+            metric = prefix + name
+            lines.append(f"# TYPE {metric} summary")
+            for p in PERCENTILES:
+                lines.append(f'{metric}{{quantile="{p / 100}"}} {stats[f"p{p}"]}')
+            lines.append(f"{metric}_count {stats['count']}")
+            lines.append(f"{metric}_sum {stats['sum']}")
+        typed = set()
+        for (name, labels), value in sorted(self.counters().items()):
+            metric = prefix + name + "_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Nearest-rank percentiles of a list of numbers
+def summarize(values):
+    ordered = sorted(values)
+    count = len(ordered)
+    stats = {"count": count, "sum": sum(ordered), "mean": sum(ordered) / count}
+    for p in PERCENTILES:
+        stats[f"p{p}"] = ordered[min(count - 1, max(0, -(-p * count // 100) - 1))]
+    return stats
+
+
+# Prompt and response token counts from a response's usage metadata, when present
+def usage_counts(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "response_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+    }
+
+
+# Serve /metrics (Prometheus text) and /metrics.jsonl on a background thread
+def start_exporter(recorder, port, host="127.0.0.1"):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = recorder.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.jsonl":
+                body, content_type = recorder.to_jsonl(), "application/x-ndjson"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+METRICS = MetricsRecorder(capacity=int(os.environ.get("METRICS_CAPACITY", "10000")))
@@ -0,0 +1,126 @@
+# Compact voice profiles for characters, built once and kept on disk.
+#
+# Instead of asking the model to work out each character's voice from scratch
+# in every interview, a profile of a dozen or so words is generated the first
+# time a character is used and added to later prompts as a voice note. Builds
+# run in the background, so a request never waits for one: a character without
+# a profile yet is simply prompted without a voice note. Processes sharing the
+# file pick up each other's profiles, and a claim in the shared state (see
+# state.py) keeps two of them from building the same one.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from interview_cache import normalize
+from metrics import METRICS
+from state import MemoryState, connect, state_from_env
+
+# Longest profile kept; anything past it is cut at a word boundary
+MAX_PROFILE_CHARS = 160
+
+# How long a claim to build a profile holds, in case its process dies mid-build
+BUILD_CLAIM_SECONDS = 120.0
+
+
+def build_persona_prompt(name):
+    return (f"Describe how {name} speaks, as a voice note for an actor playing them in a short dialogue. "
+            "At most 15 words: vocabulary, rhythm, attitude. No preamble, no quotes.")
+
+
+# Clean a model reply into a one-line profile, or None if nothing usable came back
+def clean_profile(text):
+    profile = " ".join((text or "").split()).strip(" \"'*")
+    if not profile:
+        return None
+    if len(profile) > MAX_PROFILE_CHARS:
+        profile = profile[:MAX_PROFILE_CHARS].rsplit(" ", 1)[0].rstrip(",;:") + "."
+    return profile
+
+
+class PersonaStore:
+    def __init__(self, path, workers=2, state=None):
+        self.path = path
+        self.state = state or MemoryState()
+        self._lock = threading.Lock()
+        self._db = connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS personas (
+                key TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+        # A few hundred short rows at most, so they all live in memory
+        self._profiles = dict(self._db.execute("SELECT key, profile FROM personas"))
+        self._building = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="persona")
+
+    def get(self, name):
+        with self._lock:
+            return self._profiles.get(normalize(name))
+
+    # Profiles available right now for the given names, keyed by name
+    def profiles(self, names):
+        with self._lock:
+            found = {name: self._profiles.get(normalize(name)) for name in names if name}
+        return {name: profile for name, profile in found.items() if profile}
+
+    def put(self, name, profile):
+        key = normalize(name)
+        with self._lock:
+            self._profiles[key] = profile
+            self._db.execute("INSERT OR REPLACE INTO personas (key, name, profile, created_at) VALUES (?, ?, ?, ?)",
+                             (key, name, profile, time.time()))
+            self._db.commit()
+
+    # Build the profile for `name` in the background with build(name) -> reply
+    # text, unless it exists or is already being built. A failed build is
+    # simply tried again the next time the character is used.
+    def ensure(self, name, build):
+        key = normalize(name)
+        with self._lock:
+            if not key or key in self._profiles or key in self._building:
+                return
+            self._building.add(key)
+        self._pool.submit(self._build, name, key, build)
+
+    def _build(self, name, key, build):
+        try:
+            # Another process may have built it already, or be building it now
+            with self._lock:
+                row = self._db.execute("SELECT profile FROM personas WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._profiles[key] = row[0]
+                    return
+            claim = f"persona_build:{key}"
+            if not self.state.add(claim, True, ttl=BUILD_CLAIM_SECONDS):
+                return
+            try:
+                profile = clean_profile(build(name))
+                if profile is not None:
+                    self.put(name, profile)
+            finally:
+                self.state.delete(claim)
+            METRICS.increment("persona_builds", result="ok" if profile else "empty")
+        except Exception:
+            METRICS.increment("persona_builds", result="error")
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._profiles)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Build a persona store from PERSONA_STORE_PATH, claiming builds in `state`
+# (by default the backend STATE_BACKEND names)
+def persona_store_from_env(state=None):
+    return PersonaStore(os.environ.get("PERSONA_STORE_PATH", "personas.sqlite3"), state=state or state_from_env())
@@ -0,0 +1,214 @@
+# Retry, backoff, timeout and circuit-breaker policy for Gemini calls.
+#
+# Failures come out as GenerationError subclasses so callers can tell them
+# apart from real content instead of rendering an error string as a script.
+import asyncio
+import os
+import random
+import threading
+import time
+
+
+class GenerationError(Exception):
+    user_message = "The interview could not be generated."
+    retryable = False
+
+
+class RateLimitedError(GenerationError):
+    user_message = "The Gemini API quota is exhausted right now. Please try again in a minute."
+    retryable = True
+
+
+class UpstreamUnavailableError(GenerationError):
+    user_message = "The Gemini API is having trouble right now. Please try again shortly."
+    retryable = True
+
+
+class GenerationTimeoutError(GenerationError):
+    user_message = "The Gemini API took too long to respond. Please try again."
+    retryable = True
+
+
+class InvalidRequestError(GenerationError):
+    user_message = "The request was rejected by the Gemini API. Check your API key and inputs."
+
+
+class CircuitOpenError(GenerationError):
+    user_message = "The Gemini API is failing repeatedly, so requests are paused briefly. Please try again soon."
+
+
+# Map an SDK/transport exception to a GenerationError. google.api_core
+# exceptions carry the HTTP status in `.code`; anything unknown is treated as
+# a non-retryable failure.
+def classify(exc):
+    if isinstance(exc, GenerationError):
+        return exc
+    code = getattr(exc, "code", None)
+    code = code if isinstance(code, int) else None
+    name = type(exc).__name__
+    message = str(exc) or name
+    if code == 429 or name in ("ResourceExhausted", "TooManyRequests"):
+        error = RateLimitedError(message)
+    elif code == 504 or name in ("DeadlineExceeded", "TimeoutError", "ReadTimeout"):
+        error = GenerationTimeoutError(message)
+    elif (code is not None and code >= 500) or name in ("ServiceUnavailable", "InternalServerError") or isinstance(exc, ConnectionError):
+        error = UpstreamUnavailableError(message)
+    elif code is not None and 400 <= code < 500:
+        error = InvalidRequestError(message)
+    else:
+        error = GenerationError(message)
+    error.__cause__ = exc
+    return error
+
+
+# Opens after `threshold` consecutive retryable failures and rejects calls
+# for `cooldown` seconds, then lets a single trial call through (half-open).
+class CircuitBreaker:
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = None
+        self._lock = threading.Lock()
+
+    # "open" while a trial call is still out, since no other call gets through then
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown and self._trial is None:
+                return "half-open"
+            return "open"
+
+    # Raises CircuitOpenError while open. Returns a token when this call is the
+    # half-open trial (None otherwise), to hand to end_trial() once it is over
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return None
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial is not None:
+                raise CircuitOpenError("circuit open")
+            self._trial = object()
+            return self._trial
+
+    # Free the trial slot of a call that ended without a success or failure
+    # being recorded (a stream closed early, a rerun), so the next call can try
+    def end_trial(self, trial):
+        with self._lock:
+            if trial is not None and self._trial is trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = None
+
+
+class CallPolicy:
+    def __init__(self, max_attempts=3, timeout=60.0, base_delay=1.0, max_delay=16.0, breaker=None):
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+    # Exponential backoff with full jitter
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # Call fn(request_options) until it succeeds, retrying retryable errors
+    def call(self, fn):
+        for attempt in range(self.max_attempts):
+            trial = self.breaker.before_call()
+            try:
+                result = fn({"timeout": self.timeout})
+            except Exception as e:
+                error = self._failed(e)
+                if not error.retryable or attempt == self.max_attempts - 1:
+                    raise error
+                time.sleep(self.backoff(attempt))
+                continue
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self.breaker.end_trial(trial)
+
+    # Like call() for streaming responses: fn(request_options) returns an
+    # iterable. Retries only happen before the first item arrives, since a
+    # half-delivered stream cannot be replayed without duplicating output.
+    def stream(self, fn):
+        for attempt in range(self.max_attempts):
+            trial = self.breaker.before_call()
+            started = False
+            try:
+                for item in fn({"timeout": self.timeout}):
+                    started = True
+                    yield item
+            except Exception as e:
+                error = self._failed(e)
+                if started or not error.retryable or attempt == self.max_attempts - 1:
+                    raise error
+                time.sleep(self.backoff(attempt))
+                continue
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                # Closed early by the consumer (GeneratorExit) or interrupted by a rerun
+                self.breaker.end_trial(trial)
+
+    # stream() for async iterables, used by the HTTP API; backoff sleeps without blocking the event loop
+    async def stream_async(self, fn):
+        for attempt in range(self.max_attempts):
+            trial = self.breaker.before_call()
+            started = False
+            try:
+                async for item in fn({"timeout": self.timeout}):
+                    started = True
+                    yield item
+            except Exception as e:
+                error = self._failed(e)
+                if started or not error.retryable or attempt == self.max_attempts - 1:
+                    raise error
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                # Closed early by the consumer (GeneratorExit) or interrupted by a rerun
+                self.breaker.end_trial(trial)
+
+    # A local failure (a queue timeout, a bug) says nothing about the upstream,
+    # so it leaves the breaker alone; the caller's end_trial() frees a trial slot
+    def _failed(self, exc):
+        error = classify(exc)
+        if error.retryable:
+            self.breaker.record_failure()
+        elif isinstance(error, InvalidRequestError):
+            # The upstream answered, it just rejected this request
+            self.breaker.record_success()
+        return error
+
+
+# Build a policy from GEMINI_* environment variables
+def policy_from_env():
+    return CallPolicy(
+        max_attempts=int(os.environ.get("GEMINI_MAX_ATTEMPTS", "3")),
+        timeout=float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "60")),
+        breaker=CircuitBreaker(
+            threshold=int(os.environ.get("GEMINI_BREAKER_THRESHOLD", "5")),
+            cooldown=float(os.environ.get("GEMINI_BREAKER_COOLDOWN_SECONDS", "30")),
+        ),
+    )
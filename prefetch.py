@@ -0,0 +1,178 @@
+# Speculative generation of the interview a session is about to ask for.
+#
+# When a session's inputs are complete, the app hands the Prefetcher a job
+# that generates that interview into the cache. The job starts after a short
+# delay, so inputs that are still changing cancel it before it costs
+# anything, and each session has a budget of prefetches per time window.
+# A Generate click that matches the prefetched inputs either finds the
+# script in the cache or joins the running job through single-flight.
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+
+# Raised inside a prefetch job to stop it; deliberately not a GenerationError
+class PrefetchCancelled(Exception):
+    pass
+
+
+# One speculative generation. The job sets `called` just before it calls the
+# model and should stop (raise PrefetchCancelled) once `cancelled` is set.
+# `claimed` is set once a Generate click waits on the job, which then calls
+# `on_claim` (if the job set one) to stop waiting at background priority.
+class Prefetch:
+    def __init__(self, key):
+        self.key = key
+        self.state = "pending"
+        self.cancelled = threading.Event()
+        self.claimed = threading.Event()
+        self.on_claim = None
+        self.called = False
+        self.updated = time.monotonic()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise PrefetchCancelled()
+
+
+class Prefetcher:
+    def __init__(self, budget=5, window=600.0, delay=0.75, workers=8):
+        self.budget = budget
+        self.window = window
+        self.delay = delay
+        self.counts = {"started": 0, "used": 0, "wasted": 0, "cancelled": 0, "over_budget": 0}
+        self._sessions = {}
+        self._starts = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    # Prefetch `key` for `session` by running job(prefetch) in the background.
+    # Replaces and cancels any other prefetch of the session; a repeat request
+    # for the key already being prefetched does nothing.
+    def request(self, session, key, job):
+        with self._lock:
+            self._expire(time.monotonic())
+            current = self._sessions.get(session)
+            if current is not None and current.key == key and current.state in ("pending", "running", "done", "used"):
+                return
+            if current is not None:
+                self._retire(current)
+            prefetch = self._sessions[session] = Prefetch(key)
+        self._pool.submit(self._run, session, prefetch, job)
+
+    # Stop the session's prefetch, e.g. because its inputs are no longer complete
+    def cancel(self, session):
+        with self._lock:
+            current = self._sessions.pop(session, None)
+            if current is not None:
+                self._retire(current)
+
+    # True if the session's prefetch is for `key` and has not been given up
+    def covers(self, session, key):
+        with self._lock:
+            current = self._sessions.get(session)
+            return current is not None and current.key == key and current.state in ("pending", "running", "done", "used")
+
+    # Called when the session asks for `key` for real; True if a prefetch covered it
+    def claim(self, session, key):
+        with self._lock:
+            current = self._sessions.get(session)
+            if current is None or current.key != key:
+                return False
+            if current.state == "pending":
+                # Still inside the delay: the real request goes ahead on its own
+                self._retire(current)
+                del self._sessions[session]
+                return False
+            # A finished job that never called the model (say, the script was cached) saved nothing
+            if current.state not in ("running", "done") or (current.state == "done" and not current.called):
+                return False
+            current.state = "used"
+            self._count("used")
+        # The job sets on_claim before it checks claimed, so one of the two sees the other
+        current.claimed.set()
+        on_claim = current.on_claim
+        if on_claim is not None:
+            on_claim()
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        finished = stats["used"] + stats["wasted"]
+        stats["hit_rate"] = stats["used"] / finished if finished else 0.0
+        return stats
+
+    def _run(self, session, prefetch, job):
+        # Inputs that change again within the delay cancel this job before it costs anything
+        if prefetch.cancelled.wait(self.delay):
+            return
+        with self._lock:
+            if prefetch.cancelled.is_set():
+                return
+            now = time.monotonic()
+            starts = self._starts.setdefault(session, deque())
+            while starts and now - starts[0] > self.window:
+                starts.popleft()
+            if len(starts) >= self.budget:
+                prefetch.state = "over_budget"
+                self._count("over_budget")
+                return
+            starts.append(now)
+            prefetch.state = "running"
+
+        try:
+            job(prefetch)
+            outcome = "done"
+        except PrefetchCancelled:
+            outcome = "cancelled"
+        except Exception:
+            outcome = "failed"
+        with self._lock:
+            if prefetch.called:
+                self._count("started")
+            if prefetch.state == "running":
+                # Stopped, failed or superseded after the model was called: the tokens are spent for nothing
+                if prefetch.called and (outcome != "done" or prefetch.cancelled.is_set()):
+                    self._count("wasted")
+                prefetch.state = "retired" if prefetch.cancelled.is_set() else outcome
+            prefetch.updated = time.monotonic()
+
+    # Under the lock: cancel a prefetch that is being replaced and account for its cost
+    def _retire(self, prefetch):
+        # A Generate click is waiting on a claimed prefetch, so it keeps running
+        if prefetch.state == "used":
+            return
+        prefetch.cancelled.set()
+        if prefetch.state == "pending":
+            self._count("cancelled")
+        elif prefetch.state == "done" and prefetch.called:
+            self._count("wasted")
+        # A running job is accounted for by _run when it stops
+        prefetch.state = "retired" if prefetch.state in ("pending", "done") else prefetch.state
+
+    # Under the lock: forget sessions idle for a whole window
+    def _expire(self, now):
+        for session, prefetch in list(self._sessions.items()):
+            if prefetch.state != "running" and now - prefetch.updated > self.window:
+                self._retire(prefetch)
+                del self._sessions[session]
+                self._starts.pop(session, None)
+
+    def _count(self, outcome):
+        self.counts[outcome] += 1
+        METRICS.increment("prefetch", outcome=outcome)
+
+
+# Build a prefetcher from PREFETCH_* environment variables
+def prefetcher_from_env():
+    return Prefetcher(
+        budget=int(os.environ.get("PREFETCH_BUDGET", "5")),
+        window=float(os.environ.get("PREFETCH_WINDOW_SECONDS", "600")),
+        delay=float(os.environ.get("PREFETCH_DELAY_SECONDS", "0.75")),
+        workers=int(os.environ.get("PREFETCH_WORKERS", "8")),
+    )
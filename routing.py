@@ -0,0 +1,221 @@
+# Model tiering and hedged requests for tail latency.
+#
+# A Router holds an ordered list of models, fastest first. Each request goes
+# to the first model. When it has not produced anything after a learned
+# percentile of that model's recent first-response latencies, a hedge goes to
+# the next model (or the same model if there is only one) and whichever
+# answers first wins. A losing stream is closed, which stops its upstream
+# call; a losing blocking call cannot be interrupted, so it runs to the end
+# and its result is dropped (see Attempt). If the first model fails
+# outright, the next one is tried straight away. Hedges draw on a budget that
+# grows by a fixed fraction of each request, which caps their extra cost.
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from interview import MODELS
+from metrics import METRICS
+
+
+# One model's share of a routed request, handed to the `start` callable. The
+# upstream call should stop once `cancelled` is set, and a blocking call that
+# returns after that should not record its timing as if it had counted; call
+# sent() if it had to wait (e.g. for a scheduler slot) before going upstream.
+class Attempt:
+    def __init__(self, model, tier):
+        self.model = model
+        self.tier = tier
+        self.cancelled = threading.Event()
+        self.sent_at = time.monotonic()
+
+    def sent(self):
+        self.sent_at = time.monotonic()
+
+
+# Percentile of recent first-response latencies, per model and kind of call
+class LatencyTracker:
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model, kind, seconds):
+        with self._lock:
+            samples = self._samples.get((model, kind))
+            if samples is None:
+                samples = self._samples[model, kind] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    # The `percentile`th latency, or None with fewer than `min_samples` samples
+    def percentile(self, model, kind, percentile, min_samples):
+        with self._lock:
+            samples = sorted(self._samples.get((model, kind), ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100.0))]
+
+
+# Hedges allowed so far: every request adds `ratio` of a hedge, up to `burst`
+class HedgeBudget:
+    def __init__(self, ratio=0.1, burst=5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.credit = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.credit = min(self.burst, self.credit + self.ratio)
+
+    def spend(self):
+        with self._lock:
+            if self.credit < 1.0:
+                return False
+            self.credit -= 1.0
+            return True
+
+
+class Router:
+    def __init__(self, models, percentile=95.0, min_samples=20, default_delay=8.0, min_delay=0.5,
+                 budget_ratio=0.1, budget_burst=5.0, window=200):
+        self.models = list(models)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.latency = LatencyTracker(window)
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+        self.counts = {"requests": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0, "fallbacks": 0}
+        self._lock = threading.Lock()
+
+    # Seconds to wait for the first model before hedging
+    def hedge_delay(self, kind):
+        learned = self.latency.percentile(self.models[0], kind, self.percentile, self.min_samples)
+        return self.default_delay if learned is None else max(self.min_delay, learned)
+
+    # Pieces of whichever model's stream starts first. start(attempt) runs in a
+    # thread of its own and returns an iterable of pieces from attempt.model.
+    # Once a stream has started there is no switching, so a failure after
+    # that is raised as is.
+    def stream(self, start, kind="stream"):
+        self._count("requests")
+        self.budget.earn()
+        events = queue.Queue()
+        attempts = []
+        errors = []
+        winner = None
+        hedge_at = None
+        next_tier = 0
+
+        def launch(tier):
+            attempt = Attempt(self.models[min(tier, len(self.models) - 1)], tier)
+            attempts.append(attempt)
+            threading.Thread(target=self._run, args=(attempt, start, kind, events), daemon=True,
+                             name=f"route-{attempt.model}").start()
+            return attempt
+
+        try:
+            primary = launch(next_tier)
+            next_tier += 1
+            can_hedge = self.budget.ratio > 0
+            while True:
+                timeout = None
+                if winner is None and can_hedge:
+                    hedge_at = primary.sent_at + self.hedge_delay(kind)
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    attempt, event, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    can_hedge = False
+                    if self.budget.spend():
+                        self._count("hedged")
+                        METRICS.increment("hedges", outcome="sent", model=self.models[min(next_tier, len(self.models) - 1)])
+                        launch(next_tier)
+                        next_tier += 1
+                    else:
+                        self._count("over_budget")
+                        METRICS.increment("hedges", outcome="over_budget")
+                    continue
+
+                if winner is not None and attempt is not winner:
+                    continue
+                if event == "error":
+                    if winner is attempt:
+                        raise value
+                    errors.append(value)
+                    if len(errors) == len(attempts):
+                        if next_tier >= len(self.models):
+                            raise errors[0]
+                        # Tiering: the first model failed, so the next one gets the request right away
+                        self._count("fallbacks")
+                        METRICS.increment("model_fallbacks", model=self.models[next_tier])
+                        primary = launch(next_tier)
+                        next_tier += 1
+                    continue
+                if winner is None:
+                    winner = attempt
+                    for other in attempts:
+                        if other is not attempt:
+                            other.cancelled.set()
+                    if len(attempts) > 1:
+                        won = attempt.tier > 0 and attempt is not primary
+                        if won:
+                            self._count("hedge_wins")
+                        METRICS.increment("hedges", outcome="won" if won else "lost")
+                if event == "done":
+                    return
+                yield value
+        finally:
+            # Also reached when the caller stops reading early
+            for attempt in attempts:
+                attempt.cancelled.set()
+
+    # Result of whichever model answers first; start(attempt) returns the result
+    def call(self, start):
+        for result in self.stream(lambda attempt: [start(attempt)], kind="call"):
+            return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        stats["hedge_delay"] = self.hedge_delay("stream")
+        return stats
+
+    # Thread body: feed one attempt's pieces into the router's queue until it ends or is cancelled
+    def _run(self, attempt, start, kind, events):
+        pieces = None
+        try:
+            pieces = iter(start(attempt))
+            first = True
+            for piece in pieces:
+                if attempt.cancelled.is_set():
+                    break
+                if first:
+                    self.latency.observe(attempt.model, kind, time.monotonic() - attempt.sent_at)
+                    first = False
+                events.put((attempt, "piece", piece))
+            events.put((attempt, "done", None))
+        except Exception as e:
+            events.put((attempt, "error", e))
+        finally:
+            close = getattr(pieces, "close", None)
+            if close is not None:
+                close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+
+# Build a router from GEMINI_MODELS and HEDGE_* environment variables
+def router_from_env():
+    return Router(
+        MODELS,
+        percentile=float(os.environ.get("HEDGE_PERCENTILE", "95")),
+        min_samples=int(os.environ.get("HEDGE_MIN_SAMPLES", "20")),
+        default_delay=float(os.environ.get("HEDGE_DEFAULT_DELAY_SECONDS", "8")),
+        budget_ratio=float(os.environ.get("HEDGE_BUDGET", "0.1")),
+        budget_burst=float(os.environ.get("HEDGE_BUDGET_BURST", "5")),
+    )
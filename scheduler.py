@@ -0,0 +1,248 @@
+# Fair-share admission control for Gemini calls.
+#
+# Every upstream call takes a ticket first. Tickets are dispatched in order
+# of priority (interactive before batch), then by least recently served
+# session, so one busy session cannot starve the rest. A ticket leaves the
+# queue only when the global and its API key's token buckets (requests and
+# tokens per minute) all have room, which keeps the process under quota
+# instead of running into 429s.
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import time
+
+from policy import GenerationError
+
+INTERACTIVE = 0
+BATCH = 1
+
+
+class QueueTimeoutError(GenerationError):
+    user_message = "Too many interviews are being generated right now. Please try again in a minute."
+
+
+# Continuously refilling bucket of `per_minute` units. The balance may go
+# negative when a call turns out to cost more than was reserved for it.
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    # Seconds until `amount` is available; 0 if it is available now
+    def wait_time(self, amount, now):
+        if not self.per_minute:
+            return 0.0
+        self._refill(now)
+        # A request bigger than the whole bucket only waits for a full one
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60.0 / self.per_minute)
+
+    def take(self, amount, now):
+        if self.per_minute:
+            self._refill(now)
+            self.level -= amount
+
+
+class Ticket:
+    def __init__(self, seq, api_key, session, priority, tokens):
+        self.seq = seq
+        self.key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.dispatched = None
+
+
+class Scheduler:
+    def __init__(self, global_rpm=0, global_tpm=0, key_rpm=60, key_tpm=0, estimated_tokens=1500, max_wait=120.0):
+        self.global_rpm = global_rpm
+        self.global_tpm = global_tpm
+        self.key_rpm = key_rpm
+        self.key_tpm = key_tpm
+        self.estimated_tokens = estimated_tokens
+        self.max_wait = max_wait
+        self.dispatched = 0
+        self.timeouts = 0
+        self._global = (TokenBucket(global_rpm), TokenBucket(global_tpm))
+        self._keys = {}
+        self._waiting = []
+        self._served = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    # Block until a call may go upstream and return its ticket; pass the ticket
+    # to settle() once the call is done. `on_wait(position)` is called from
+    # this thread whenever the ticket's place in line changes (1 = next), and
+    # `on_enqueue(ticket)` once the ticket is in line, e.g. to promote() it later.
+    def acquire(self, api_key, session, priority=INTERACTIVE, on_wait=None, tokens=None, on_enqueue=None):
+        ticket = self._enqueue(api_key, session, priority, tokens)
+        if on_enqueue is not None:
+            try:
+                on_enqueue(ticket)
+            except BaseException:
+                with self._cond:
+                    self._abandon(ticket)
+                raise
+        last_position = None
+        with self._cond:
+            try:
+                while True:
+                    wait = self._pump()
+                    if ticket.dispatched is not None:
+                        return ticket
+                    self._check_timeout(ticket)
+                    position = self._ordered().index(ticket) + 1
+                    if on_wait is not None and position != last_position:
+                        last_position = position
+                        # Called without the lock, since the callback may render UI
+                        self._cond.release()
+                        try:
+                            on_wait(position)
+                        finally:
+                            self._cond.acquire()
+                        continue
+                    self._cond.wait(wait)
+            except BaseException:
+                # on_wait raised (a Streamlit rerun or stop, say) or the thread was interrupted
+                self._abandon(ticket)
+                raise
+
+    # acquire() for the asyncio HTTP API; polls instead of blocking the event loop
+    async def acquire_async(self, api_key, session, priority=INTERACTIVE, tokens=None):
+        ticket = self._enqueue(api_key, session, priority, tokens)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._pump()
+                    if ticket.dispatched is not None:
+                        return ticket
+                    self._check_timeout(ticket)
+                await asyncio.sleep(min(wait, 0.25))
+        except asyncio.CancelledError:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+
+    # Move a ticket that is still waiting up to `priority`, say a batch job an
+    # interactive request has started waiting on. Its queue timeout starts over.
+    def promote(self, ticket, priority=INTERACTIVE):
+        with self._cond:
+            if ticket in self._waiting and ticket.priority > priority:
+                ticket.priority = priority
+                ticket.enqueued = time.monotonic()
+                self._cond.notify_all()
+
+    # Replace the ticket's token reservation with what the call actually used
+    def settle(self, ticket, tokens_used):
+        if ticket.dispatched is None:
+            return
+        with self._cond:
+            now = time.monotonic()
+            self._global[1].take(tokens_used - ticket.tokens, now)
+            self._buckets(ticket.key)[1].take(tokens_used - ticket.tokens, now)
+            ticket.tokens = tokens_used
+            self._cond.notify_all()
+
+    # Current place in line (1 = next), or 0 once dispatched
+    def position(self, ticket):
+        with self._cond:
+            if ticket.dispatched is not None:
+                return 0
+            return self._ordered().index(ticket) + 1
+
+    def stats(self):
+        with self._cond:
+            queued = {INTERACTIVE: 0, BATCH: 0}
+            for ticket in self._waiting:
+                queued[ticket.priority] = queued.get(ticket.priority, 0) + 1
+            return {"queued": queued[INTERACTIVE] + queued[BATCH], "queued_interactive": queued[INTERACTIVE],
+                    "queued_batch": queued[BATCH], "dispatched": self.dispatched, "timeouts": self.timeouts}
+
+    def _enqueue(self, api_key, session, priority, tokens):
+        ticket = Ticket(next(self._seq), api_key, session, priority,
+                        self.estimated_tokens if tokens is None else tokens)
+        with self._cond:
+            self._waiting.append(ticket)
+        return ticket
+
+    def _buckets(self, key):
+        if key not in self._keys:
+            self._keys[key] = (TokenBucket(self.key_rpm), TokenBucket(self.key_tpm))
+        return self._keys[key]
+
+    # Waiting tickets in dispatch order: priority, then the session served longest
+    # ago (round-robin), then arrival
+    def _ordered(self):
+        return sorted(self._waiting, key=lambda t: (t.priority, self._served.get(t.session, -1), t.seq))
+
+    # Under the lock: dispatch every waiting ticket that fits in its buckets, in
+    # line order, and return how long until the next one might fit
+    def _pump(self):
+        now = time.monotonic()
+        wait = 1.0
+        blocked_keys = set()
+        granted = False
+        for ticket in self._ordered():
+            # An earlier ticket for the same key keeps its turn, but a key at its
+            # limit does not hold up tickets for other keys
+            if ticket.key in blocked_keys:
+                continue
+            buckets = self._global + self._buckets(ticket.key)
+            amounts = (1, ticket.tokens) * 2
+            ticket_wait = max(bucket.wait_time(amount, now) for bucket, amount in zip(buckets, amounts))
+            if ticket_wait > 0:
+                blocked_keys.add(ticket.key)
+                wait = min(wait, ticket_wait)
+                continue
+            for bucket, amount in zip(buckets, amounts):
+                bucket.take(amount, now)
+            self._waiting.remove(ticket)
+            self._served[ticket.session] = ticket.seq
+            ticket.dispatched = now
+            self.dispatched += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+            if len(self._served) > 10000:
+                waiting = {t.session for t in self._waiting}
+                self._served = {s: seq for s, seq in self._served.items() if s in waiting}
+        return wait
+
+    # Under the lock: take back the ticket of a caller that gave up waiting. It
+    # leaves the queue, or, if another thread dispatched it meanwhile, gives
+    # its token reservation back, since the call will never be made.
+    def _abandon(self, ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+        elif ticket.dispatched is not None:
+            self.settle(ticket, 0)
+
+    def _check_timeout(self, ticket):
+        if time.monotonic() - ticket.enqueued > self.max_wait:
+            self._waiting.remove(ticket)
+            self.timeouts += 1
+            raise QueueTimeoutError(f"waited more than {self.max_wait:g}s for a Gemini slot")
+
+
+# Build a scheduler from SCHEDULER_* environment variables (0 means no limit);
+# keyword arguments override individual settings
+def scheduler_from_env(**overrides):
+    settings = dict(
+        global_rpm=int(os.environ.get("SCHEDULER_GLOBAL_RPM", "0")),
+        global_tpm=int(os.environ.get("SCHEDULER_GLOBAL_TPM", "0")),
+        key_rpm=int(os.environ.get("SCHEDULER_KEY_RPM", "60")),
+        key_tpm=int(os.environ.get("SCHEDULER_KEY_TPM", "0")),
+        estimated_tokens=int(os.environ.get("SCHEDULER_ESTIMATED_TOKENS", "1500")),
+        max_wait=float(os.environ.get("SCHEDULER_MAX_WAIT_SECONDS", "120")),
+    )
+    settings.update(overrides)
+    return Scheduler(**settings)
@@ -0,0 +1,179 @@
+# Shared storage for the interviews sessions are showing.
+#
+# Sessions keep only a content-hash ID in session state; the interview itself
+# (script, characters, topic and tone) is stored once per process however
+# many sessions show it. Each session references interviews by slot (e.g. the
+# result on screen, one per tone of a comparison), and an interview is
+# dropped as soon as no slot references it. Bodies beyond the memory ceiling
+# are spilled to a SQLite file, least recently used first, and read back on
+# demand. Streamlit does not say when a session ends, so sessions that have
+# not been seen for `session_ttl` seconds release their references.
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from exports import interview_id
+
+
+def record_size(record):
+    return sum(sys.getsizeof(value) for value in record.values())
+
+
+class ScriptStore:
+    def __init__(self, max_bytes=64 * 1024 * 1024, spill_path=None, session_ttl=6 * 3600.0):
+        self.max_bytes = max_bytes
+        self.session_ttl = session_ttl
+        self.spills = 0
+        self.loads = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._sizes = {}
+        self._on_disk = set()
+        self._refs = {}
+        self._sessions = {}
+        self._seen = {}
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+        if spill_path is None:
+            fd, spill_path = tempfile.mkstemp(prefix="interview-store-", suffix=".sqlite3")
+            os.close(fd)
+        self.spill_path = spill_path
+        self._db = sqlite3.connect(spill_path, check_same_thread=False)
+        # References do not outlive the process, so neither do spilled bodies
+        self._db.execute("CREATE TABLE IF NOT EXISTS spilled (id TEXT PRIMARY KEY, record TEXT NOT NULL)")
+        self._db.execute("DELETE FROM spilled")
+        self._db.commit()
+
+    # Store the interview in `record` (char1, char2, topic, tone, text) under
+    # the session's `slot`, releasing whatever the slot held before; returns its ID
+    def put(self, session, slot, record):
+        record_id = interview_id(record["char1"], record["char2"], record["topic"], record["tone"], record["text"])
+        with self._lock:
+            self._seen[session] = time.monotonic()
+            slots = self._sessions.setdefault(session, {})
+            previous = slots.get(slot)
+            if previous == record_id:
+                return record_id
+            slots[slot] = record_id
+            if record_id in self._refs:
+                self._refs[record_id] += 1
+            else:
+                self._refs[record_id] = 1
+                self._sizes[record_id] = record_size(record)
+                self._remember(record_id, dict(record))
+            if previous is not None:
+                self._release(previous)
+        return record_id
+
+    # The record for an ID, or None once nothing references it
+    def get(self, record_id):
+        with self._lock:
+            record = self._memory.get(record_id)
+            if record is not None:
+                self._memory.move_to_end(record_id)
+                return record
+            if record_id not in self._refs:
+                return None
+            # The spilled copy stays, so spilling this body again costs no write
+            row = self._db.execute("SELECT record FROM spilled WHERE id = ?", (record_id,)).fetchone()
+            record = json.loads(row[0])
+            self.loads += 1
+            self._remember(record_id, record)
+            return record
+
+    # Release the session's slots; all of them when `slots` is None
+    def release(self, session, slots=None):
+        with self._lock:
+            held = self._sessions.get(session, {})
+            for slot in list(held) if slots is None else slots:
+                record_id = held.pop(slot, None)
+                if record_id is not None:
+                    self._release(record_id)
+            if not held:
+                self._sessions.pop(session, None)
+
+    # Mark the session as alive and release the references of sessions gone quiet
+    def touch(self, session):
+        now = time.monotonic()
+        with self._lock:
+            self._seen[session] = now
+            # Sweeping is a scan over every session, so it runs at most once a minute
+            if now - self._swept < min(60.0, self.session_ttl):
+                return
+            self._swept = now
+            stale = [s for s, seen in self._seen.items() if now - seen > self.session_ttl]
+        for s in stale:
+            self.release(s)
+            with self._lock:
+                self._seen.pop(s, None)
+
+    def stats(self):
+        with self._lock:
+            return {"interviews": len(self._refs), "references": sum(self._refs.values()), "sessions": len(self._sessions),
+                    "memory_bytes": self._memory_bytes, "memory_interviews": len(self._memory),
+                    "spilled_interviews": len(self._refs) - len(self._memory), "spills": self.spills, "loads": self.loads}
+
+    # Memory each session accounts for: every interview it references, and its
+    # share of the resident ones (split evenly between the sessions holding them)
+    def session_report(self):
+        with self._lock:
+            report = []
+            for session, slots in self._sessions.items():
+                referenced = resident = 0
+                for record_id in set(slots.values()):
+                    size = self._sizes[record_id]
+                    referenced += size
+                    if record_id in self._memory:
+                        resident += size / self._refs[record_id]
+                report.append({"session": session, "slots": len(slots), "referenced_bytes": referenced,
+                               "resident_bytes": int(resident), "idle_seconds": round(time.monotonic() - self._seen.get(session, 0), 1)})
+        return sorted(report, key=lambda row: row["resident_bytes"], reverse=True)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Under the lock: keep a body in memory, spilling the least recently used ones past the ceiling
+    def _remember(self, record_id, record):
+        self._memory[record_id] = record
+        self._memory_bytes += self._sizes[record_id]
+        written = False
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            old_id, old_record = self._memory.popitem(last=False)
+            self._memory_bytes -= self._sizes[old_id]
+            self.spills += 1
+            if old_id not in self._on_disk:
+                self._db.execute("INSERT OR REPLACE INTO spilled (id, record) VALUES (?, ?)",
+                                 (old_id, json.dumps(old_record, ensure_ascii=False)))
+                self._on_disk.add(old_id)
+                written = True
+        if written:
+            self._db.commit()
+
+    # Under the lock: drop one reference, and the body with the last one
+    def _release(self, record_id):
+        self._refs[record_id] -= 1
+        if self._refs[record_id]:
+            return
+        del self._refs[record_id]
+        size = self._sizes.pop(record_id)
+        if self._memory.pop(record_id, None) is not None:
+            self._memory_bytes -= size
+        if record_id in self._on_disk:
+            self._on_disk.discard(record_id)
+            self._db.execute("DELETE FROM spilled WHERE id = ?", (record_id,))
+            self._db.commit()
+
+
+# Build a store from INTERVIEW_STORE_* environment variables
+def store_from_env():
+    return ScriptStore(
+        max_bytes=int(os.environ.get("INTERVIEW_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+        spill_path=os.environ.get("INTERVIEW_STORE_SPILL_PATH") or None,
+        session_ttl=float(os.environ.get("INTERVIEW_STORE_SESSION_TTL_SECONDS", str(6 * 3600))),
+    )
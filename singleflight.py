@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import Future
+
+
+# Coalesces identical in-flight work: the first caller for a key becomes the
+# leader and does the work, everyone else arriving before it finishes waits
+# on the same Future. Works across Streamlit sessions since they share the
+# process.
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0
+        self.saved = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    # Return (future, is_leader). A leader must call complete() or fail().
+    def begin(self, key):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.saved += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def complete(self, key, result):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def fail(self, key, exc):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(exc)
+
+    # Run fn() once per key among concurrent callers and return its result to all of them
+    def do(self, key, fn):
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+        self.complete(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"upstream": self.leaders, "saved": self.saved, "inflight": len(self._inflight)}
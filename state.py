@@ -0,0 +1,201 @@
+# Shared state for running several app processes side by side.
+#
+# A state backend is a small key-value store with expiry, atomic counters and
+# set-if-absent claims, for whatever has to be the same on every replica
+# behind a load balancer: cache hit counters, who is building which voice
+# profile, and the state of each browser session (so a reconnect that lands
+# on another replica picks up where it left off). Two backends have the same
+# methods:
+#
+#   MemoryState  - in this process only; the default for a single process
+#   SQLiteState  - a SQLite file in WAL mode that every process on the host
+#                  opens; each operation is one statement, so it stays atomic
+#                  with any number of concurrent writers
+#
+# Values are anything json.dumps accepts. connect() opens the other SQLite
+# files the app keeps (cache, archive, voice profiles) the same way, so
+# replicas can share them too.
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Open a SQLite file for use by several processes at once: WAL lets readers
+# carry on while one process writes, and writers wait up to `timeout` seconds
+# for each other instead of failing with "database is locked"
+def connect(path, timeout=30.0):
+    db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+# Expired entries are dropped when read, and by a sweep at most every
+# `sweep_interval` seconds, so keys that are never read again do not pile up
+class MemoryState:
+    # Other processes cannot see this state
+    shared = False
+
+    def __init__(self, sweep_interval=60.0):
+        self.sweep_interval = sweep_interval
+        self._values = {}
+        self._counters = {}
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+
+    # The value stored under `key`, or `default` if there is none or it expired
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return default
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._values[key]
+                return default
+            return json.loads(entry[0])
+
+    # Store `value`, for `ttl` seconds or until deleted when ttl is None
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._values[key] = (json.dumps(value), None if ttl is None else now + ttl)
+            self._sweep(now)
+
+    # Store `value` only if `key` holds nothing live; True if it was stored
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                return False
+            self._values[key] = (json.dumps(value), None if ttl is None else now + ttl)
+            self._sweep(now)
+            return True
+
+    # Remove `key`; with `expected`, only while it still holds that value
+    def delete(self, key, expected=None):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and (expected is None or json.loads(entry[0]) == expected):
+                del self._values[key]
+
+    # Add `amount` to a counter and return its new value
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+    # Current value of a counter, 0 if it was never incremented
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    # Counters whose names start with `prefix`
+    def counters(self, prefix=""):
+        with self._lock:
+            return {key: value for key, value in self._counters.items() if key.startswith(prefix)}
+
+    def close(self):
+        pass
+
+    # Under the lock: drop expired entries, at most once per sweep interval
+    def _sweep(self, now):
+        if time.monotonic() - self._swept < self.sweep_interval:
+            return
+        self._swept = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._values.items() if expires_at is not None and expires_at <= now]:
+            del self._values[key]
+
+
+class SQLiteState:
+    shared = True
+
+    def __init__(self, path, timeout=30.0, sweep_interval=60.0):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+        self._db = connect(path, timeout)
+        # Autocommit: every statement below is a transaction of its own
+        self._db.isolation_level = None
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+        """)
+        self._db.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                                   (key, time.time())).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(value), None if ttl is None else now + ttl))
+            self._sweep(now)
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            # Inserts, or takes over an expired entry, in one statement; no row changes if a live one exists
+            cursor = self._db.execute("""
+                INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                WHERE state.expires_at IS NOT NULL AND state.expires_at <= ?
+            """, (key, json.dumps(value), None if ttl is None else now + ttl, now))
+            return cursor.rowcount == 1
+
+    def delete(self, key, expected=None):
+        with self._lock:
+            if expected is None:
+                self._db.execute("DELETE FROM state WHERE key = ?", (key,))
+            else:
+                self._db.execute("DELETE FROM state WHERE key = ? AND value = ?", (key, json.dumps(expected)))
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            return self._db.execute("""
+                INSERT INTO counters (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = value + excluded.value
+                RETURNING value
+            """, (key, amount)).fetchone()[0]
+
+    def counter(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def counters(self, prefix=""):
+        with self._lock:
+            # A range over the primary key, so only the matching rows are read
+            return dict(self._db.execute("SELECT key, value FROM counters WHERE key >= ? AND key < ?",
+                                         (prefix, prefix + "\U0010ffff")))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Under the lock: drop expired entries, at most once per sweep interval
+    def _sweep(self, now):
+        if time.monotonic() - self._swept < self.sweep_interval:
+            return
+        self._swept = time.monotonic()
+        self._db.execute("DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+
+# Build a state backend from STATE_BACKEND ("memory" or "sqlite") and STATE_PATH
+def state_from_env():
+    backend = os.environ.get("STATE_BACKEND", "memory")
+    if backend == "memory":
+        return MemoryState()
+    if backend == "sqlite":
+        return SQLiteState(os.environ.get("STATE_PATH", "state.sqlite3"))
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r}; use 'memory' or 'sqlite'")
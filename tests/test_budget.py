@@ -0,0 +1,48 @@
+from budget import BudgetEstimator, reserve_tokens, streamed_tokens
+from interview import LENGTHS, SYSTEM_INSTRUCTION
+
+
+def test_falls_back_to_the_preset_without_enough_runs():
+    estimator = BudgetEstimator(min_runs=3)
+    for length, preset in LENGTHS.items():
+        estimate = estimator.estimate("Socrates", "Steve Jobs", "Funny", length)
+        assert estimate == {"tokens": preset["tokens"], "seconds": preset["seconds"], "runs": 0, "basis": "default"}
+    estimator.record("Socrates", "Steve Jobs", "Funny", "Short", 400, 5.0)
+    assert estimator.estimate("Socrates", "Steve Jobs", "Funny", "Short")["basis"] == "default"
+
+
+def test_learns_from_runs_at_the_most_specific_level():
+    estimator = BudgetEstimator(min_runs=2)
+    estimator.record("Socrates", "Steve Jobs", "Funny", "Standard", 600, 6.0)
+    estimator.record("steve jobs", " Socrates", "Funny", "Standard", 800, 10.0)
+    estimate = estimator.estimate("Socrates", "Steve Jobs", "Funny", "Standard")
+    # The pair is unordered and normalised, so both runs count for it
+    assert estimate == {"tokens": 700, "seconds": 8.0, "runs": 2, "basis": "pair"}
+
+    # Another pair in the same tone uses the tone's runs; another tone, the preset's
+    assert estimator.estimate("Marie Curie", "Akbar", "Funny", "Standard")["basis"] == "tone"
+    assert estimator.estimate("Marie Curie", "Akbar", "Dramatic", "Standard")["basis"] == "length"
+    # Other presets learn separately
+    assert estimator.estimate("Socrates", "Steve Jobs", "Funny", "Long")["basis"] == "default"
+
+
+def test_runs_without_usage_are_not_recorded():
+    estimator = BudgetEstimator(min_runs=1)
+    estimator.record("Socrates", "Steve Jobs", "Funny", "Standard", 0, 3.0)
+    assert estimator.estimate("Socrates", "Steve Jobs", "Funny", "Standard")["basis"] == "default"
+
+
+def test_replicas_sharing_a_state_pool_their_runs():
+    first = BudgetEstimator(min_runs=2)
+    second = BudgetEstimator(first.state, min_runs=2)
+    first.record("Socrates", "Steve Jobs", "Funny", "Standard", 600, 6.0)
+    second.record("Socrates", "Steve Jobs", "Funny", "Standard", 800, 10.0)
+    assert first.estimate("Socrates", "Steve Jobs", "Funny", "Standard")["runs"] == 2
+
+
+def test_reserve_and_streamed_tokens_count_the_prompt():
+    prompt = "p" * 400
+    base = (len(SYSTEM_INSTRUCTION) + len(prompt)) // 4
+    assert reserve_tokens({"tokens": 700}, prompt) == base + 700
+    assert streamed_tokens(prompt, 0) == base
+    assert streamed_tokens(prompt, 400) == base + 100
@@ -0,0 +1,49 @@
+from dialogue import SpeakerIndex, Turn, normalize_speaker, parse_dialogue, render_dialogue
+
+
+def test_normalize_speaker_drops_markup_asides_and_titles():
+    assert normalize_speaker("**Emperor Akbar** (smiling)") == "akbar"
+    assert normalize_speaker("Dr. Marie Curie") == "marie curie"
+    # A name made only of titles is kept rather than emptied
+    assert normalize_speaker("The Queen") == "the"
+    assert normalize_speaker("Queen") == "queen"
+
+
+def test_index_matches_spellings_of_both_characters():
+    index = SpeakerIndex("Socrates", "Steve Jobs")
+    assert index.lookup("SOCRATES") == ("Socrates", 1)
+    assert index.lookup("*Steve Jobs*") == ("Steve Jobs", 2)
+    assert index.lookup("Jobs") == ("Steve Jobs", 2)
+    assert index.lookup("Narrator") == ("Narrator", 0)
+
+
+def test_shared_word_does_not_pick_a_character():
+    index = SpeakerIndex("George Washington", "George Orwell")
+    assert index.lookup("George") == ("George", 0)
+    assert index.lookup("Orwell") == ("George Orwell", 2)
+
+
+def test_parse_line():
+    index = SpeakerIndex("Socrates", "Steve Jobs")
+    assert index.parse_line("   ") is None
+    assert index.parse_line("- **Socrates**: *Know thyself.*") == Turn("Socrates", "Know thyself.*", 1)
+    assert index.parse_line("Jobs: It ships at 10:30.") == Turn("Steve Jobs", "It ships at 10:30.", 2)
+    assert index.parse_line("(They shake hands.)") == Turn(None, "(They shake hands.)", 0)
+
+
+def test_time_or_ratio_in_prose_is_not_a_speaker():
+    index = SpeakerIndex("Socrates", "Steve Jobs")
+    assert index.parse_line("At 10:30 the studio lights came up.") == Turn(None, "At 10:30 the studio lights came up.", 0)
+    assert index.parse_line("The vote went 3:2 in favour.").speaker is None
+
+
+def test_parse_dialogue_skips_blank_lines_and_is_cached():
+    text = "Socrates: Hello.\n\nSteve Jobs: Hi.\n"
+    turns = parse_dialogue(text, "Socrates", "Steve Jobs")
+    assert [t.role for t in turns] == [1, 2]
+    assert parse_dialogue(text, "Socrates", "Steve Jobs") is turns
+
+
+def test_render_escapes_html():
+    html = render_dialogue("Socrates: <b>hi</b>", "Socrates", "Steve Jobs")
+    assert "&lt;b&gt;hi&lt;/b&gt;" in html and "<b>" not in html
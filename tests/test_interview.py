@@ -0,0 +1,46 @@
+import time
+
+from interview import iter_lines, iter_until
+
+
+def slow_start(stall, count=20):
+    time.sleep(stall)
+    for n in range(count):
+        yield f"A: line {n}"
+
+
+def test_time_before_the_first_line_does_not_count():
+    status = {}
+    lines = list(iter_until(slow_start(0.2), 0.1, status=status))
+    assert len(lines) == 20
+    assert "truncated" not in status
+
+
+def test_ends_at_a_whole_line_once_past_the_deadline():
+    def slow_lines():
+        for n in range(20):
+            yield f"A: line {n}"
+            time.sleep(0.01)
+
+    status = {}
+    lines = list(iter_until(slow_lines(), 0.0, min_lines=6, status=status))
+    assert lines == [f"A: line {n}" for n in range(6)]
+    assert status["truncated"] is True
+
+
+def test_closes_the_upstream_when_it_stops_early():
+    closed = []
+
+    def upstream():
+        try:
+            for n in range(20):
+                yield f"A: line {n}"
+        finally:
+            closed.append(True)
+
+    list(iter_until(upstream(), 0.0, min_lines=2))
+    assert closed == [True]
+
+
+def test_iter_lines_joins_pieces_into_lines():
+    assert list(iter_lines(["A: he", "llo\nB: hi", "\nA: bye"])) == ["A: hello", "B: hi", "A: bye"]
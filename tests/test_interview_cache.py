@@ -0,0 +1,63 @@
+import time
+
+from interview_cache import InterviewCache, make_key
+
+
+def key(**overrides):
+    request = dict(character1="Socrates", character2="Steve Jobs", topic="", tone="Funny", model="m", prompt_version="1")
+    request.update(overrides)
+    return make_key(**request)
+
+
+def test_key_ignores_spacing_and_case_but_not_length():
+    assert key(character1="  socrates ") == key()
+    assert key(length="Standard") == key()
+    assert key(length="Short") != key()
+    assert key(tone="Dramatic") != key()
+
+
+def test_hit_miss_and_counts(tmp_path):
+    cache = InterviewCache(str(tmp_path / "cache.db"))
+    assert cache.get("k") is None
+    cache.put("k", "script")
+    assert cache.get("k") == "script"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    # peek() is not counted
+    assert cache.peek("k") and not cache.peek("other")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_exclude_asks_for_a_new_variant_until_the_key_is_full(tmp_path):
+    cache = InterviewCache(str(tmp_path / "cache.db"), variants=2)
+    cache.put("k", "first")
+    # Regenerating: the one on screen is excluded and there is room for another
+    assert cache.get("k", exclude="first") is None
+    cache.put("k", "second")
+    # Full now, so the other variant is served instead of calling the model
+    assert cache.get("k", exclude="first") == "second"
+    assert cache.get("k", exclude="second") == "first"
+
+
+def test_put_drops_the_oldest_variant(tmp_path):
+    cache = InterviewCache(str(tmp_path / "cache.db"), variants=2)
+    for text in ("one", "two", "three"):
+        cache.put("k", text)
+    assert {cache.get("k") for _ in range(50)} == {"two", "three"}
+    assert cache.stats()["disk"] == 2
+
+
+def test_entries_expire(tmp_path):
+    cache = InterviewCache(str(tmp_path / "cache.db"), ttl_seconds=0.05)
+    cache.put("k", "script")
+    time.sleep(0.06)
+    assert cache.get("k") is None and not cache.peek("k")
+
+
+def test_processes_share_the_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = InterviewCache(path, variants=2), InterviewCache(path, variants=2)
+    first.put("k", "one")
+    assert second.get("k") == "one"
+    second.put("k", "two")
+    third = InterviewCache(path, variants=2)
+    assert {third.get("k") for _ in range(50)} == {"one", "two"}
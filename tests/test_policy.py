@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import pytest
+
+from policy import (CallPolicy, CircuitBreaker, CircuitOpenError, GenerationError, InvalidRequestError,
+                    UpstreamUnavailableError, classify)
+from scheduler import QueueTimeoutError
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+def failing(options):
+    raise Unavailable("down")
+
+
+# A breaker tripped by one failure whose cooldown has already run out
+def half_open_policy():
+    policy = CallPolicy(max_attempts=1, base_delay=0, breaker=CircuitBreaker(threshold=1, cooldown=0.05))
+    with pytest.raises(UpstreamUnavailableError):
+        policy.call(failing)
+    assert policy.breaker.state == "open"
+    time.sleep(0.06)
+    assert policy.breaker.state == "half-open"
+    return policy
+
+
+def test_classify():
+    assert isinstance(classify(Unavailable()), UpstreamUnavailableError)
+    error = classify(type("BadRequest", (Exception,), {"code": 400})())
+    assert isinstance(error, InvalidRequestError) and not error.retryable
+    assert type(classify(ValueError("x"))) is GenerationError
+
+
+def test_opens_after_threshold_and_rejects():
+    policy = CallPolicy(max_attempts=1, breaker=CircuitBreaker(threshold=2, cooldown=60))
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailableError):
+            policy.call(failing)
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda options: "never called")
+
+
+def test_rejected_request_does_not_trip():
+    policy = CallPolicy(max_attempts=1, breaker=CircuitBreaker(threshold=1, cooldown=60))
+
+    def rejected(options):
+        raise type("BadRequest", (Exception,), {"code": 400})()
+
+    with pytest.raises(InvalidRequestError):
+        policy.call(rejected)
+    assert policy.breaker.state == "closed"
+
+
+def test_local_error_leaves_breaker_alone():
+    policy = CallPolicy(max_attempts=1, breaker=CircuitBreaker(threshold=2, cooldown=60))
+    with pytest.raises(UpstreamUnavailableError):
+        policy.call(failing)
+
+    def local(options):
+        raise QueueTimeoutError("waited too long")
+
+    with pytest.raises(QueueTimeoutError):
+        policy.call(local)
+    with pytest.raises(GenerationError):
+        policy.call(lambda options: 1 / 0)
+    # Neither reset the failure count, so one more upstream failure opens the breaker
+    assert policy.breaker.failures == 1
+    with pytest.raises(UpstreamUnavailableError):
+        policy.call(failing)
+    assert policy.breaker.state == "open"
+
+
+def test_local_error_during_trial_frees_it_without_closing():
+    policy = half_open_policy()
+    with pytest.raises(GenerationError):
+        policy.call(lambda options: 1 / 0)
+    # Still half-open: the next call gets the trial
+    assert policy.breaker.state == "half-open"
+    assert policy.call(lambda options: "ok") == "ok"
+    assert policy.breaker.state == "closed"
+
+
+def test_retries_then_succeeds():
+    calls = []
+
+    def flaky(options):
+        calls.append(options)
+        if len(calls) < 3:
+            raise Unavailable()
+        return "ok"
+
+    policy = CallPolicy(max_attempts=3, base_delay=0, timeout=5)
+    assert policy.call(flaky) == "ok"
+    assert calls == [{"timeout": 5}] * 3
+    assert policy.breaker.state == "closed"
+
+
+def test_trial_success_closes():
+    policy = half_open_policy()
+    assert policy.call(lambda options: "ok") == "ok"
+    assert policy.breaker.state == "closed"
+
+
+def test_trial_failure_reopens():
+    policy = half_open_policy()
+    with pytest.raises(UpstreamUnavailableError):
+        policy.call(failing)
+    assert policy.breaker.state == "open"
+
+
+def test_only_one_trial_at_a_time():
+    policy = half_open_policy()
+    stream = policy.stream(lambda options: iter(["a", "b"]))
+    assert next(stream) == "a"
+    assert policy.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda options: "ok")
+    assert list(stream) == ["b"]
+    assert policy.breaker.state == "closed"
+
+
+def test_stream_closed_during_trial_frees_it():
+    policy = half_open_policy()
+    stream = policy.stream(lambda options: iter(["a", "b"]))
+    assert next(stream) == "a"
+    stream.close()
+    assert policy.breaker.state == "half-open"
+    assert policy.call(lambda options: "ok") == "ok"
+    assert policy.breaker.state == "closed"
+
+
+def test_trial_interrupted_by_base_exception_frees_it():
+    policy = half_open_policy()
+
+    class Rerun(BaseException):
+        pass
+
+    def interrupted(options):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        policy.call(interrupted)
+    assert policy.call(lambda options: "ok") == "ok"
+
+
+def test_async_stream_closed_during_trial_frees_it():
+    policy = half_open_policy()
+
+    async def items(options):
+        yield "a"
+        yield "b"
+
+    async def consume():
+        stream = policy.stream_async(items)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    asyncio.run(consume())
+    assert policy.breaker.state == "half-open"
+    assert policy.call(lambda options: "ok") == "ok"
+
+
+def test_stale_trial_token_is_ignored():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure()
+    first = breaker.before_call()
+    breaker.record_failure()
+    second = breaker.before_call()
+    breaker.end_trial(first)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.end_trial(second)
+    assert breaker.before_call() is not None
+
+
+def test_stream_does_not_retry_after_first_item():
+    calls = []
+
+    def broken(options):
+        calls.append(1)
+        yield "a"
+        raise Unavailable()
+
+    policy = CallPolicy(max_attempts=3, base_delay=0)
+    stream = policy.stream(broken)
+    assert next(stream) == "a"
+    with pytest.raises(UpstreamUnavailableError):
+        next(stream)
+    assert len(calls) == 1
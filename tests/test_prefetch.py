@@ -0,0 +1,51 @@
+import threading
+
+from prefetch import Prefetcher
+
+
+def run_until_claimed(prefetcher, session, key, job):
+    started = threading.Event()
+    release = threading.Event()
+
+    def wrapped(prefetch):
+        job(prefetch)
+        started.set()
+        release.wait(5)
+
+    prefetcher.request(session, key, wrapped)
+    assert started.wait(5)
+    return release
+
+
+def test_claim_calls_on_claim_of_a_running_job():
+    prefetcher = Prefetcher(delay=0)
+    promoted = []
+    release = run_until_claimed(prefetcher, "s", "k", lambda prefetch: setattr(prefetch, "on_claim", lambda: promoted.append(1)))
+    assert prefetcher.claim("s", "k")
+    assert promoted == [1]
+    release.set()
+
+
+def test_claim_before_the_job_has_a_ticket_is_seen_by_the_job():
+    prefetcher = Prefetcher(delay=0)
+    jobs = []
+    release = run_until_claimed(prefetcher, "s", "k", jobs.append)
+    assert prefetcher.claim("s", "k")
+    assert jobs[0].claimed.is_set()
+    release.set()
+
+
+def test_claim_for_other_inputs_does_nothing():
+    prefetcher = Prefetcher(delay=0)
+    jobs = []
+    release = run_until_claimed(prefetcher, "s", "k", jobs.append)
+    assert not prefetcher.claim("s", "other")
+    assert not jobs[0].claimed.is_set()
+    release.set()
+
+
+def test_pending_prefetch_is_cancelled_by_a_claim():
+    prefetcher = Prefetcher(delay=5)
+    prefetcher.request("s", "k", lambda prefetch: None)
+    assert not prefetcher.claim("s", "k")
+    assert prefetcher.stats()["cancelled"] == 1
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from routing import Router
+
+
+def test_call_returns_the_first_answer_and_marks_the_loser_cancelled():
+    router = Router(["slow", "fast"], default_delay=0.05, budget_ratio=1.0)
+    finished = {}
+    done = threading.Event()
+
+    def start(attempt):
+        if attempt.model == "slow":
+            time.sleep(0.3)
+            finished["slow"] = attempt.cancelled.is_set()
+            done.set()
+            return "slow"
+        return "fast"
+
+    assert router.call(start) == "fast"
+    assert done.wait(2)
+    # The blocking loser ran to the end but can tell its result is not wanted
+    assert finished["slow"] is True
+    assert router.stats()["hedge_wins"] == 1
+
+
+def test_stream_falls_back_when_the_first_model_fails():
+    router = Router(["first", "second"], budget_ratio=0)
+
+    def start(attempt):
+        if attempt.model == "first":
+            raise ConnectionError("down")
+        return iter(["a", "b"])
+
+    assert list(router.stream(start)) == ["a", "b"]
+    assert router.stats()["fallbacks"] == 1
+
+
+def test_closing_the_stream_cancels_the_attempt():
+    router = Router(["only"], budget_ratio=0)
+    seen = []
+
+    def start(attempt):
+        seen.append(attempt)
+        return iter(["a", "b", "c"])
+
+    stream = router.stream(start)
+    assert next(stream) == "a"
+    stream.close()
+    assert seen[0].cancelled.is_set()
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scheduler import BATCH, INTERACTIVE, QueueTimeoutError, Scheduler, TokenBucket
+
+
+class Rerun(BaseException):
+    pass
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.take(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == 0.0
+    # More than the whole bucket only waits for a full one
+    assert bucket.wait_time(500, now + 1) == pytest.approx(59.0)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 6, 0.0)
+    assert bucket.wait_time(10 ** 6, 0.0) == 0.0
+
+
+def test_dispatches_when_there_is_room():
+    scheduler = Scheduler(key_rpm=10)
+    ticket = scheduler.acquire("key", "a")
+    assert ticket.dispatched is not None
+    assert scheduler.position(ticket) == 0
+    assert scheduler.stats()["dispatched"] == 1
+
+
+def test_waiting_order_is_priority_then_least_recently_served():
+    scheduler = Scheduler(key_rpm=1)
+    scheduler.acquire("key", "a")
+    again = scheduler._enqueue("key", "a", INTERACTIVE, None)
+    batch = scheduler._enqueue("key", "b", BATCH, None)
+    fresh = scheduler._enqueue("key", "c", INTERACTIVE, None)
+    assert [scheduler.position(t) for t in (fresh, again, batch)] == [1, 2, 3]
+    assert scheduler.stats()["queued_interactive"] == 2
+    assert scheduler.stats()["queued_batch"] == 1
+
+
+def test_key_at_its_limit_does_not_hold_up_other_keys():
+    scheduler = Scheduler(key_rpm=1, max_wait=1.0)
+    scheduler.acquire("first", "a")
+    blocked = scheduler._enqueue("first", "a", INTERACTIVE, None)
+    assert scheduler.acquire("second", "b").dispatched is not None
+    assert blocked.dispatched is None
+
+
+def test_queue_timeout_removes_the_ticket():
+    scheduler = Scheduler(key_rpm=1, max_wait=0.1)
+    scheduler.acquire("key", "a")
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire("key", "b")
+    stats = scheduler.stats()
+    assert stats["queued"] == 0 and stats["timeouts"] == 1
+
+
+def test_on_wait_reports_place_in_line():
+    scheduler = Scheduler(key_rpm=1, max_wait=0.1)
+    scheduler.acquire("key", "a")
+    positions = []
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire("key", "b", on_wait=positions.append)
+    assert positions == [1]
+
+
+def test_raising_on_wait_removes_the_ticket():
+    scheduler = Scheduler(key_rpm=1)
+    scheduler.acquire("key", "a")
+
+    def on_wait(position):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        scheduler.acquire("key", "b", on_wait=on_wait)
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_ticket_dispatched_while_on_wait_raises_is_refunded():
+    scheduler = Scheduler(key_tpm=1000, key_rpm=0, max_wait=1.0)
+    first = scheduler.acquire("key", "a", tokens=1000)
+
+    def on_wait(position):
+        # The first call turns out to be free, and another caller's pump dispatches
+        # the waiting ticket while its own caller is not looking
+        scheduler.settle(first, 0)
+        with scheduler._cond:
+            scheduler._pump()
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        scheduler.acquire("key", "b", on_wait=on_wait, tokens=600)
+    # The abandoned ticket's 600 tokens went back into the bucket
+    assert scheduler.acquire("key", "d", tokens=900).dispatched is not None
+
+
+def test_settle_returns_unused_tokens():
+    scheduler = Scheduler(key_rpm=0, key_tpm=1000, max_wait=0.5)
+    ticket = scheduler.acquire("key", "a", tokens=1000)
+    scheduler.settle(ticket, 100)
+    assert scheduler.acquire("key", "b", tokens=800).dispatched is not None
+
+
+def test_waiter_is_woken_by_settle():
+    scheduler = Scheduler(key_rpm=0, key_tpm=1000, max_wait=5.0)
+    ticket = scheduler.acquire("key", "a", tokens=1000)
+    waited = []
+
+    def wait():
+        started = time.monotonic()
+        scheduler.acquire("key", "b", tokens=500)
+        waited.append(time.monotonic() - started)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.1)
+    scheduler.settle(ticket, 0)
+    thread.join(5)
+    assert waited and waited[0] < 1.0
+
+
+def test_cancelled_async_acquire_removes_the_ticket():
+    scheduler = Scheduler(key_rpm=1)
+    scheduler.acquire("key", "a")
+
+    async def cancel():
+        task = asyncio.ensure_future(scheduler.acquire_async("key", "b"))
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["queued"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_promote_moves_a_waiting_ticket_ahead():
+    scheduler = Scheduler(key_rpm=1)
+    scheduler.acquire("key", "a")
+    batch = scheduler._enqueue("key", "b", BATCH, None)
+    interactive = scheduler._enqueue("key", "c", INTERACTIVE, None)
+    batch.enqueued -= 100
+    scheduler.promote(batch)
+    assert batch.priority == INTERACTIVE
+    assert time.monotonic() - batch.enqueued < 1
+    # Both interactive now; neither session has been served, so arrival decides
+    assert [scheduler.position(t) for t in (batch, interactive)] == [1, 2]
+
+
+def test_on_enqueue_gets_the_ticket_before_it_waits():
+    scheduler = Scheduler(key_rpm=1, max_wait=0.1)
+    scheduler.acquire("key", "a")
+    seen = []
+
+    def on_enqueue(ticket):
+        seen.append(ticket)
+        scheduler.promote(ticket)
+
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire("key", "b", priority=BATCH, on_enqueue=on_enqueue)
+    assert seen[0].priority == INTERACTIVE
@@ -0,0 +1,79 @@
+import sqlite3
+import time
+
+from script_store import ScriptStore
+
+
+def record(text, tone="Funny"):
+    return {"char1": "Socrates", "char2": "Steve Jobs", "topic": "", "tone": tone, "text": text}
+
+
+def spilled_rows(store):
+    return sqlite3.connect(store.spill_path).execute("SELECT COUNT(*) FROM spilled").fetchone()[0]
+
+
+def test_sessions_share_one_copy_until_the_last_releases_it(tmp_path):
+    store = ScriptStore(spill_path=str(tmp_path / "spill.db"))
+    first = store.put("a", "interview", record("same script"))
+    assert store.put("b", "interview", record("same script")) == first
+    assert store.stats()["interviews"] == 1 and store.stats()["references"] == 2
+
+    store.release("a")
+    assert store.get(first)["text"] == "same script"
+    store.release("b")
+    assert store.get(first) is None
+    assert store.stats()["interviews"] == 0 and store.stats()["sessions"] == 0
+
+
+def test_putting_a_slot_again_releases_what_it_held(tmp_path):
+    store = ScriptStore(spill_path=str(tmp_path / "spill.db"))
+    old = store.put("a", "interview", record("first"))
+    new = store.put("a", "interview", record("second"))
+    assert store.get(old) is None and store.get(new)["text"] == "second"
+    # The same script again is a no-op, not a second reference
+    store.put("a", "interview", record("second"))
+    assert store.stats()["references"] == 1
+
+
+def test_release_only_the_given_slots(tmp_path):
+    store = ScriptStore(spill_path=str(tmp_path / "spill.db"))
+    shown = store.put("a", "interview", record("shown"))
+    tone = store.put("a", "tone:Funny", record("compared"))
+    store.release("a", ["tone:Funny"])
+    assert store.get(tone) is None and store.get(shown) is not None
+
+
+def test_bodies_past_the_ceiling_spill_to_disk_and_come_back(tmp_path):
+    store = ScriptStore(max_bytes=3000, spill_path=str(tmp_path / "spill.db"))
+    ids = [store.put("a", f"tone:{n}", record(f"{n} " + "x" * 1000)) for n in range(4)]
+    stats = store.stats()
+    assert stats["spilled_interviews"] >= 1 and stats["memory_bytes"] <= 3000
+    assert spilled_rows(store) == stats["spills"]
+
+    # The oldest one was spilled; reading it loads it back from the file
+    assert store.get(ids[0])["text"].startswith("0 ")
+    assert store.stats()["loads"] == 1
+
+    # Releasing a spilled body deletes its row too
+    store.release("a")
+    assert spilled_rows(store) == 0
+    assert store.stats()["memory_bytes"] == 0
+
+
+def test_spill_file_is_cleared_on_open(tmp_path):
+    path = str(tmp_path / "spill.db")
+    store = ScriptStore(max_bytes=1500, spill_path=path)
+    for n in range(3):
+        store.put("a", f"tone:{n}", record(f"{n} " + "x" * 1000))
+    assert spilled_rows(store) > 0
+    store.close()
+    assert spilled_rows(ScriptStore(spill_path=path)) == 0
+
+
+def test_quiet_sessions_release_their_references(tmp_path):
+    store = ScriptStore(spill_path=str(tmp_path / "spill.db"), session_ttl=0.05)
+    gone = store.put("gone", "interview", record("old"))
+    time.sleep(0.06)
+    store.touch("alive")
+    assert store.get(gone) is None
+    assert store.stats()["sessions"] == 0
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from state import MemoryState, SQLiteState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryState(sweep_interval=0.0)
+    else:
+        backend = SQLiteState(str(tmp_path / "state.sqlite3"), sweep_interval=0.0)
+    yield backend
+    backend.close()
+
+
+def test_get_set_delete(state):
+    assert state.get("missing", "default") == "default"
+    state.set("key", {"a": [1, 2]})
+    assert state.get("key") == {"a": [1, 2]}
+    state.delete("key", expected="something else")
+    assert state.get("key") == {"a": [1, 2]}
+    state.delete("key")
+    assert state.get("key") is None
+
+
+def test_expiry(state):
+    state.set("key", 1, ttl=0.05)
+    assert state.get("key") == 1
+    time.sleep(0.06)
+    assert state.get("key") is None
+
+
+def test_add_only_when_absent_or_expired(state):
+    assert state.add("claim", "a", ttl=0.05)
+    assert not state.add("claim", "b", ttl=0.05)
+    time.sleep(0.06)
+    assert state.add("claim", "c")
+    assert state.get("claim") == "c"
+
+
+def test_counters(state):
+    assert state.counter("hits") == 0
+    assert state.incr("hits") == 1
+    assert state.incr("hits", 4) == 5
+    state.incr("other")
+    assert state.counters("hit") == {"hits": 5}
+
+
+def test_memory_sweep_drops_unread_expired_entries():
+    state = MemoryState(sweep_interval=0.0)
+    for i in range(1000):
+        state.set(f"interview:{i}", "body", ttl=0.01)
+    time.sleep(0.02)
+    state.set("session:live", "snapshot", ttl=60)
+    assert list(state._values) == ["session:live"]
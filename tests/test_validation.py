@@ -0,0 +1,96 @@
+import pytest
+
+from metrics import METRICS
+from validation import DialogueValidator, MalformedDialogueError, call_validated, iter_validated, turn_limits, validate_text
+
+
+def script(turns):
+    return "\n".join(f"{'Socrates' if n % 2 == 0 else 'Steve Jobs'}: line {n}" for n in range(turns))
+
+
+def verdict(text, **limits):
+    try:
+        validate_text(text, "Socrates", "Steve Jobs", **limits)
+    except MalformedDialogueError as e:
+        return e.reason
+    return "ok"
+
+
+def test_well_formed_script_passes():
+    assert verdict(script(10)) == "ok"
+
+
+def test_too_short():
+    assert verdict(script(4), min_turns=6) == "too_short"
+
+
+def test_too_long():
+    assert verdict(script(12), max_turns=10) == "too_long"
+
+
+def test_single_speaker():
+    assert verdict("Socrates: one\nSocrates: two", min_turns=1) == "single_speaker"
+
+
+def test_unknown_speakers():
+    text = script(6) + "\n" + "\n".join(f"Narrator {n}: aside" for n in range(4))
+    assert verdict(text) == "unknown_speaker"
+    # A few are tolerated
+    assert verdict(script(6) + "\nNarrator: aside") == "ok"
+
+
+def test_prose():
+    assert verdict("\n".join(["It was a dark and stormy night."] * 5) + "\n" + script(6)) == "prose"
+
+
+def test_prose_with_a_time_is_prose_not_an_unknown_speaker():
+    prose = "\n".join(f"At 10:3{n} the studio lights came up." for n in range(5))
+    assert verdict(prose + "\n" + script(6)) == "prose"
+    # A stage direction or two is fine
+    assert verdict("At 10:30 the lights came up.\n" + script(6)) == "ok"
+
+
+def test_no_alternation():
+    assert verdict(script(6) + "\n" + "\n".join(["Socrates: again"] * 4)) == "no_alternation"
+
+
+def test_early_abort_counts_tokens_saved():
+    before = METRICS.counters().get(("validation_tokens_saved", ()), 0)
+    validator = DialogueValidator("Socrates", "Steve Jobs", expected_tokens=800)
+    with pytest.raises(MalformedDialogueError):
+        for _ in range(5):
+            validator.feed("It was a dark and stormy night.")
+    assert METRICS.counters()[("validation_tokens_saved", ())] > before
+
+
+def test_turn_limits_follow_the_length_preset():
+    short = turn_limits("Short")
+    assert short["min_turns"] <= 4 < turn_limits("Standard")["min_turns"] < turn_limits("Long")["min_turns"]
+    # A short reply of four turns is fine for Short but not for Standard
+    assert verdict(script(4), **short) == "ok"
+    assert verdict(script(4), **turn_limits("Standard")) == "too_short"
+
+
+def test_call_validated_retries_an_off_format_reply():
+    replies = iter(["just prose", script(8)])
+    assert call_validated(lambda: next(replies), "Socrates", "Steve Jobs", retries=1) == script(8)
+    with pytest.raises(MalformedDialogueError):
+        call_validated(lambda: "just prose", "Socrates", "Steve Jobs", retries=1)
+
+
+def test_iter_validated_closes_a_bad_stream_and_starts_over():
+    closed = []
+
+    def open_lines():
+        def lines(text):
+            try:
+                yield from text.split("\n")
+            finally:
+                closed.append(True)
+
+        return lines("\n".join(["Narrator: aside"] * 5) if not closed else script(8))
+
+    out = list(iter_validated(open_lines, "Socrates", "Steve Jobs", retries=1))
+    assert None in out
+    assert out[out.index(None) + 1:] == script(8).split("\n")
+    assert closed == [True, True]
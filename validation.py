@@ -0,0 +1,145 @@
+# Incremental checks that a streamed reply is the dialogue the prompt asked for.
+#
+# The validator reads the script line by line as it arrives and raises
+# MalformedDialogueError as soon as it is clearly off-format: prose instead
+# of dialogue, speakers other than the two characters, one character talking
+# on and on, or far more (or, at the end, far fewer) turns than requested.
+# Raising stops the stream, so the rest of a bad reply is never paid for.
+import os
+
+from dialogue import SpeakerIndex
+from interview import LENGTHS
+from metrics import METRICS
+from policy import GenerationError
+
+# Rough size of a well-formed reply, for estimating the tokens an early abort saved
+EXPECTED_TOKENS = int(os.environ.get("VALIDATION_EXPECTED_TOKENS", "800"))
+
+# Attempts after the first when a reply is off-format
+RETRIES = int(os.environ.get("VALIDATION_RETRIES", "1"))
+
+
+class MalformedDialogueError(GenerationError):
+    user_message = "The model's reply was not a dialogue between the two characters. Please try again."
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+# Turn limits for a length preset: at least one line per exchange at the low
+# end of its range, and at most six at the high end
+def turn_limits(length):
+    low, high = (int(n) for n in LENGTHS[length]["exchanges"].split("-"))
+    return {"min_turns": low, "max_turns": high * 6}
+
+
+class DialogueValidator:
+    def __init__(self, character1, character2, min_turns=6, max_turns=60, max_prose_run=4, max_unknown=3,
+                 max_same_speaker=3, expected_tokens=EXPECTED_TOKENS):
+        self.speakers = SpeakerIndex(character1, character2)
+        self.min_turns = min_turns
+        self.max_turns = max_turns
+        self.max_prose_run = max_prose_run
+        self.max_unknown = max_unknown
+        self.max_same_speaker = max_same_speaker
+        self.expected_tokens = expected_tokens
+        self.turns = 0
+        self.roles = set()
+        self.unknown = 0
+        self.prose_run = 0
+        self.last_role = None
+        self.same_speaker = 0
+        self.chars = 0
+
+    # Check one more line; raises MalformedDialogueError once the reply is clearly off
+    def feed(self, line):
+        self.chars += len(line) + 1
+        turn = self.speakers.parse_line(line)
+        if turn is None:
+            return
+        if turn.speaker is None:
+            # A title or a stage direction is fine; paragraph after paragraph is not
+            self.prose_run += 1
+            if self.prose_run > self.max_prose_run:
+                self._fail("prose", f"{self.prose_run} lines in a row without a speaker")
+            return
+        self.prose_run = 0
+
+        if turn.role == 0:
+            self.unknown += 1
+            if self.unknown > self.max_unknown:
+                self._fail("unknown_speaker", f"{self.unknown} lines by speakers other than the two characters, e.g. {turn.speaker!r}")
+            return
+
+        self.turns += 1
+        self.roles.add(turn.role)
+        if turn.role == self.last_role:
+            self.same_speaker += 1
+            if self.same_speaker > self.max_same_speaker:
+                self._fail("no_alternation", f"{turn.speaker} spoke {self.same_speaker} times in a row")
+        else:
+            self.same_speaker = 1
+            self.last_role = turn.role
+        if self.turns > self.max_turns:
+            self._fail("too_long", f"more than {self.max_turns} turns")
+
+    # Checks that need the whole reply; call once the stream has ended
+    def finish(self):
+        if len(self.roles) < 2:
+            self._fail("single_speaker", "only one of the characters spoke", early=False)
+        if self.turns < self.min_turns:
+            self._fail("too_short", f"only {self.turns} turns", early=False)
+
+    def _fail(self, reason, message, early=True):
+        METRICS.increment("validation_failures", reason=reason)
+        if early:
+            # The rest of the reply is never generated; about four characters per token
+            saved = self.expected_tokens - self.chars // 4
+            if saved > 0:
+                METRICS.increment("validation_tokens_saved", saved)
+        raise MalformedDialogueError(reason, message)
+
+
+# Check a complete script, e.g. from a non-streaming call
+def validate_text(text, character1, character2, **limits):
+    # The whole reply is already paid for, so a failure here saves nothing
+    validator = DialogueValidator(character1, character2, **dict(limits, expected_tokens=0))
+    for line in text.split("\n"):
+        validator.feed(line)
+    validator.finish()
+    return text
+
+
+# Result of `call()` once it passes validation, calling again for an off-format reply up to `retries` times
+def call_validated(call, character1, character2, retries=RETRIES, **limits):
+    for attempt in range(retries + 1):
+        try:
+            return validate_text(call(), character1, character2, **limits)
+        except MalformedDialogueError:
+            if attempt == retries:
+                raise
+            METRICS.increment("validation_retries")
+
+
+# Lines of `open_lines()`, validated as they arrive. When a reply turns out
+# off-format its stream is closed, which stops the upstream call; None is
+# yielded to tell the reader to discard the lines it has so far, and a fresh
+# attempt starts. After `retries` such retries the error is raised.
+def iter_validated(open_lines, character1, character2, retries=RETRIES, **limits):
+    for attempt in range(retries + 1):
+        validator = DialogueValidator(character1, character2, **limits)
+        lines = open_lines()
+        try:
+            for line in lines:
+                validator.feed(line)
+                yield line
+            validator.finish()
+            return
+        except MalformedDialogueError:
+            if attempt == retries:
+                raise
+            METRICS.increment("validation_retries")
+        finally:
+            lines.close()
+        yield None